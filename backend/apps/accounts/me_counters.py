@@ -0,0 +1,83 @@
+"""
+Counters and provider summary for the /me payload.
+
+Everything that is not a column on the User row is read in one aggregated
+query (follows / likes / favourite media as subqueries, the provider profile
+and its stored counters through a LEFT JOIN) and cached per user for
+ME_COUNTERS_CACHE_SECONDS (apps.core.caching, ME_COUNTERS_CACHE_NAMESPACE).
+Follow / like / provider-profile changes invalidate the affected users (see
+apps.providers.signals).
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.core.caching import get_or_build, invalidate_keys
+
+from .models import User
+
+
+ME_COUNTERS_CACHE_NAMESPACE = "accounts:me"
+
+
+def _count(qs):
+    counted = qs.order_by().values("user_id").annotate(c=Count("id")).values("c")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def _load_me_counters(user_id: int) -> dict:
+    from apps.providers.models import ProviderFollow, ProviderLike, ProviderPortfolioLike
+
+    row = (
+        User.objects.filter(pk=user_id)
+        .annotate(
+            following_count=_count(ProviderFollow.objects.filter(user_id=OuterRef("pk"))),
+            likes_count=_count(ProviderLike.objects.filter(user_id=OuterRef("pk"))),
+            favorites_media_count=_count(ProviderPortfolioLike.objects.filter(user_id=OuterRef("pk"))),
+        )
+        .values(
+            "following_count",
+            "likes_count",
+            "favorites_media_count",
+            "provider_profile__id",
+            "provider_profile__display_name",
+            "provider_profile__city",
+            "provider_profile__followers_count",
+            "provider_profile__likes_count",
+            "provider_profile__rating_avg",
+            "provider_profile__rating_count",
+        )
+        .first()
+    ) or {}
+
+    has_provider_profile = row.get("provider_profile__id") is not None
+    return {
+        "has_provider_profile": has_provider_profile,
+        "following_count": row.get("following_count") or 0,
+        "likes_count": row.get("likes_count") or 0,
+        # Source of truth for "مفضلتي" media in Interactive tab.
+        "favorites_media_count": row.get("favorites_media_count") or 0,
+        "provider_profile_id": row.get("provider_profile__id"),
+        "provider_display_name": row.get("provider_profile__display_name"),
+        "provider_city": row.get("provider_profile__city"),
+        "provider_followers_count": row.get("provider_profile__followers_count") or 0,
+        "provider_likes_received_count": row.get("provider_profile__likes_count") or 0,
+        "provider_rating_avg": row.get("provider_profile__rating_avg"),
+        "provider_rating_count": row.get("provider_profile__rating_count") or 0,
+    }
+
+
+def get_me_counters(user_id: int) -> dict:
+    return get_or_build(
+        ME_COUNTERS_CACHE_NAMESPACE,
+        (int(user_id),),
+        lambda: _load_me_counters(user_id),
+        timeout=int(getattr(settings, "ME_COUNTERS_CACHE_SECONDS", 60)),
+    )
+
+
+def invalidate_me_counters(*user_ids) -> None:
+    """Drop cached /me counters of the given users (now and after commit)."""
+    invalidate_keys(ME_COUNTERS_CACHE_NAMESPACE, *[(int(uid),) for uid in user_ids if uid])
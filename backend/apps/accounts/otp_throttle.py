@@ -0,0 +1,165 @@
+"""
+Sliding-window limits for OTP sends (no SQL).
+
+Each rule is (name, bucket key, limit, window seconds). A send is allowed only
+if every bucket has fewer than ``limit`` hits inside its window; the hit is
+then recorded in all buckets atomically.
+
+Backed by Redis sorted sets (settings.OTP_RATE_LIMIT_REDIS_URL, defaults to
+REDIS_URL) through a single Lua script, so the check is shared by every
+worker. Without Redis, or when Redis is unreachable, an in-process store with
+the same semantics is used (per-process budgets only).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+OTP_RATE_LIMIT_PREFIX = "otp:rl:"
+
+
+@dataclass(frozen=True)
+class RateRule:
+    name: str
+    key: str
+    limit: int
+    window_seconds: int
+
+
+_REDIS_HIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+  local limit = tonumber(ARGV[1 + i * 2])
+  local window = tonumber(ARGV[2 + i * 2])
+  redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+  if redis.call('ZCARD', key) >= limit then
+    return i
+  end
+end
+for i, key in ipairs(KEYS) do
+  redis.call('ZADD', key, now, ARGV[2])
+  redis.call('PEXPIRE', key, tonumber(ARGV[2 + i * 2]))
+end
+return 0
+"""
+
+
+class MemoryRateLimiter:
+    _SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._hits: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def _sweep(self, now: float, windows: dict[str, float]) -> None:
+        # مفاتيح لم تعد تُزار (أرقام/عناوين قديمة) لا يجب أن تبقى في الذاكرة
+        for key in list(self._hits):
+            bucket = self._hits[key]
+            if not bucket or bucket[-1] <= now - windows.get(key, 86400):
+                del self._hits[key]
+
+    def hit(self, rules: list[RateRule]) -> RateRule | None:
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self._SWEEP_EVERY == 0:
+                self._sweep(now, {r.key: r.window_seconds for r in rules})
+            for rule in rules:
+                bucket = self._hits.get(rule.key)
+                if bucket is None:
+                    continue
+                while bucket and bucket[0] <= now - rule.window_seconds:
+                    bucket.popleft()
+                if len(bucket) >= rule.limit:
+                    return rule
+            for rule in rules:
+                self._hits.setdefault(rule.key, deque()).append(now)
+        return None
+
+
+class RedisRateLimiter:
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_REDIS_HIT_SCRIPT)
+
+    def hit(self, rules: list[RateRule]) -> RateRule | None:
+        now_ms = int(time.time() * 1000)
+        args: list = [now_ms, f"{now_ms}-{uuid.uuid4().hex}"]
+        for rule in rules:
+            args.extend([rule.limit, rule.window_seconds * 1000])
+        blocked = int(self._script(keys=[r.key for r in rules], args=args))
+        return rules[blocked - 1] if blocked else None
+
+
+_memory_limiter = MemoryRateLimiter()
+_redis_limiter: RedisRateLimiter | None = None
+_redis_url: str | None = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis_limiter() -> RedisRateLimiter | None:
+    global _redis_limiter, _redis_url
+    url = (getattr(settings, "OTP_RATE_LIMIT_REDIS_URL", "") or "").strip()
+    if not url:
+        return None
+    if _redis_limiter is None or _redis_url != url:
+        with _redis_lock:
+            if _redis_limiter is None or _redis_url != url:
+                try:
+                    _redis_limiter = RedisRateLimiter(url)
+                    _redis_url = url
+                except Exception:
+                    logger.warning("OTP rate limiter: redis unavailable, using in-process limits", exc_info=True)
+                    return None
+    return _redis_limiter
+
+
+def check_and_record(rules: list[RateRule]) -> RateRule | None:
+    """Record one hit in every rule's bucket unless one is full. Returns the blocking rule (or None)."""
+    rules = [r for r in rules if r.limit > 0 and r.window_seconds > 0 and r.key]
+    if not rules:
+        return None
+    limiter = _get_redis_limiter()
+    if limiter is not None:
+        try:
+            return limiter.hit(rules)
+        except Exception:
+            logger.warning("OTP rate limiter: redis error, using in-process limits", exc_info=True)
+    return _memory_limiter.hit(rules)
+
+
+def otp_send_rules(phone: str, client_ip: str | None) -> list[RateRule]:
+    """Ordered budgets for one OTP send: the first full bucket decides the 429 message."""
+    cfg = settings
+    p = OTP_RATE_LIMIT_PREFIX
+    rules = [
+        RateRule("cooldown", f"{p}cd:{phone}", 1, int(getattr(cfg, "OTP_COOLDOWN_SECONDS", 60) or 0)),
+        RateRule("phone_hourly", f"{p}ph:{phone}", int(getattr(cfg, "OTP_PHONE_HOURLY_LIMIT", 0) or 0), 3600),
+        RateRule("phone_daily", f"{p}pd:{phone}", int(getattr(cfg, "OTP_PHONE_DAILY_LIMIT", 0) or 0), 86400),
+    ]
+    if client_ip:
+        rules.append(
+            RateRule("ip_hourly", f"{p}ip:{client_ip}", int(getattr(cfg, "OTP_IP_HOURLY_LIMIT", 0) or 0), 3600)
+        )
+    rules.append(
+        RateRule("global", f"{p}global", int(getattr(cfg, "OTP_GLOBAL_PER_MINUTE_LIMIT", 0) or 0), 60)
+    )
+    return rules
+
+
+def reset_otp_rate_limits() -> None:
+    """Clear the in-process buckets (tests)."""
+    global _memory_limiter
+    _memory_limiter = MemoryRateLimiter()
@@ -75,3 +75,44 @@ def test_me_view_allows_other_fields_update_while_username_locked():
 
     user = User.objects.get(phone=phone)
     assert user.username == "fixed_username_2"
+
+
+@pytest.mark.django_db
+def test_me_view_counters_are_cached_and_invalidated_by_follow(django_assert_num_queries):
+    from apps.providers.models import ProviderFollow, ProviderProfile
+
+    client = APIClient()
+    phone = "0500000813"
+    access = _login_via_otp(client, phone)
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+    _complete_registration(client, phone, "counters_user")
+    user = User.objects.get(phone=phone)
+
+    provider_user = User.objects.create_user(phone="0500000814", username="counters_provider")
+    provider = ProviderProfile.objects.create(
+        user=provider_user,
+        provider_type="individual",
+        display_name="Provider",
+        bio="bio",
+        city="Riyadh",
+    )
+
+    from apps.accounts.me_counters import get_me_counters
+
+    with django_assert_num_queries(1):
+        counters = get_me_counters(user.id)
+    assert counters["following_count"] == 0
+    with django_assert_num_queries(0):
+        get_me_counters(user.id)
+
+    first = client.get("/api/accounts/me/")
+    assert first.status_code == 200
+    assert first.json()["following_count"] == 0
+
+    ProviderFollow.objects.create(user=user, provider=provider)
+    after = client.get("/api/accounts/me/")
+    assert after.json()["following_count"] == 1
+
+    provider_me = client.get("/api/accounts/me/")
+    assert provider_me.json()["provider_profile_id"] is None
+    assert get_me_counters(provider_user.id)["provider_followers_count"] == 1
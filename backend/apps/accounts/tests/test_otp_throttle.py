@@ -0,0 +1,38 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import OTP
+from apps.accounts.otp_throttle import MemoryRateLimiter, RateRule
+
+
+def test_memory_limiter_blocks_without_recording_partial_hits():
+    limiter = MemoryRateLimiter()
+    rules = [RateRule("a", "k:a", 2, 60), RateRule("b", "k:b", 1, 60)]
+
+    assert limiter.hit(rules) is None
+    blocked = limiter.hit(rules)
+    assert blocked is not None and blocked.name == "b"
+    # the rejected call did not consume budget from "a"
+    assert limiter.hit([RateRule("a", "k:a", 2, 60)]) is None
+
+
+@pytest.mark.django_db
+def test_otp_send_cooldown_and_ip_budget_use_no_sql(settings):
+    settings.OTP_COOLDOWN_SECONDS = 60
+    settings.OTP_IP_HOURLY_LIMIT = 2
+    client = APIClient()
+
+    assert client.post("/api/accounts/otp/send/", {"phone": "0500000901"}, format="json").status_code == 200
+
+    again = client.post("/api/accounts/otp/send/", {"phone": "0500000901"}, format="json")
+    assert again.status_code == 429
+    assert OTP.objects.filter(phone="0500000901").count() == 1
+
+    assert client.post("/api/accounts/otp/send/", {"phone": "0500000902"}, format="json").status_code == 200
+    with CaptureQueriesContext(connection) as ctx:
+        blocked = client.post("/api/accounts/otp/send/", {"phone": "0500000903"}, format="json")
+    assert blocked.status_code == 429
+    assert not any(OTP._meta.db_table in q["sql"] for q in ctx.captured_queries)
+    assert not OTP.objects.filter(phone="0500000903").exists()
@@ -1,6 +1,5 @@
 from django.conf import settings
 from django.utils import timezone
-from django.utils.timezone import timedelta
 import logging
 import secrets
 from rest_framework import status
@@ -20,8 +19,10 @@ from .serializers import (
     WalletSerializer,
 )
 
+from .me_counters import get_me_counters
 from .permissions import IsAtLeastPhoneOnly
 from .otp import generate_otp_code, otp_expiry
+from .otp_throttle import check_and_record, otp_send_rules
 
 logger = logging.getLogger(__name__)
 
@@ -74,50 +75,9 @@ def _phone_candidates(phone: str) -> list[str]:
 
 
 def _me_payload(user: User) -> dict:
-    has_provider_profile = False
-    try:
-        # related_name on ProviderProfile.user is "provider_profile"
-        has_provider_profile = bool(getattr(user, "provider_profile", None))
-    except Exception:
-        has_provider_profile = False
-
-    # Counts for client-side profile (best-effort)
-    following_count = 0
-    likes_count = 0
-    favorites_media_count = 0
-    try:
-        following_count = user.provider_follows.count()
-    except Exception:
-        following_count = 0
-    try:
-        likes_count = user.provider_likes.count()
-    except Exception:
-        likes_count = 0
-    try:
-        # Source of truth for "مفضلتي" media in Interactive tab.
-        favorites_media_count = user.portfolio_likes.count()
-    except Exception:
-        favorites_media_count = 0
-
-    provider_profile_id = None
-    provider_display_name = None
-    provider_city = None
-    provider_followers_count = 0
-    provider_likes_received_count = 0
-    provider_rating_avg = None
-    provider_rating_count = 0
-    if has_provider_profile:
-        try:
-            pp = user.provider_profile
-            provider_profile_id = pp.id
-            provider_display_name = pp.display_name
-            provider_city = pp.city
-            provider_followers_count = pp.followers.count()
-            provider_likes_received_count = pp.likes.count()
-            provider_rating_avg = pp.rating_avg
-            provider_rating_count = pp.rating_count
-        except Exception:
-            pass
+    # عدادات المستخدم وملف المزود من استعلام مجمّع واحد مخزن مؤقتًا (accounts.me_counters)
+    counters = get_me_counters(user.id)
+    has_provider_profile = counters["has_provider_profile"]
 
     role_state = getattr(user, "role_state", None)
     is_provider = bool(role_state == UserRole.PROVIDER) or has_provider_profile
@@ -132,16 +92,16 @@ def _me_payload(user: User) -> dict:
         "role_state": role_state,
         "has_provider_profile": has_provider_profile,
         "is_provider": is_provider,
-        "following_count": following_count,
-        "likes_count": likes_count,
-        "favorites_media_count": favorites_media_count,
-        "provider_profile_id": provider_profile_id,
-        "provider_display_name": provider_display_name,
-        "provider_city": provider_city,
-        "provider_followers_count": provider_followers_count,
-        "provider_likes_received_count": provider_likes_received_count,
-        "provider_rating_avg": provider_rating_avg,
-        "provider_rating_count": provider_rating_count,
+        "following_count": counters["following_count"],
+        "likes_count": counters["likes_count"],
+        "favorites_media_count": counters["favorites_media_count"],
+        "provider_profile_id": counters["provider_profile_id"],
+        "provider_display_name": counters["provider_display_name"],
+        "provider_city": counters["provider_city"],
+        "provider_followers_count": counters["provider_followers_count"],
+        "provider_likes_received_count": counters["provider_likes_received_count"],
+        "provider_rating_avg": counters["provider_rating_avg"],
+        "provider_rating_count": counters["provider_rating_count"],
     }
 
 
@@ -272,6 +232,15 @@ def me_view(request):
     return Response(_me_payload(user))
 
 
+_OTP_LIMIT_MESSAGES = {
+    "cooldown": "يرجى الانتظار قبل إعادة إرسال الرمز",
+    "phone_hourly": "تم تجاوز حد إرسال الرموز لهذا الرقم مؤقتًا",
+    "phone_daily": "تم تجاوز الحد اليومي لإرسال الرموز لهذا الرقم",
+    "ip_hourly": "تم تجاوز حد إرسال الرموز من هذا الجهاز/الشبكة مؤقتًا",
+    "global": "الخدمة مشغولة حاليًا، يرجى المحاولة بعد قليل",
+}
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 @throttle_classes([ScopedRateThrottle])
@@ -282,48 +251,14 @@ def otp_send(request):
     phone = _normalize_phone_local05(s.validated_data["phone"])
     client_ip = _client_ip(request)
 
-    # Basic cooldown to prevent spam (professional default)
-    cooldown_seconds = int(getattr(settings, "OTP_COOLDOWN_SECONDS", 60))
-    last = OTP.objects.filter(phone=phone).order_by("-id").first()
-    if last and (timezone.now() - last.created_at).total_seconds() < cooldown_seconds:
+    # Cooldown + per-phone / per-IP / global budgets (Redis sliding windows, no SQL)
+    blocked = check_and_record(otp_send_rules(phone, client_ip))
+    if blocked is not None:
         return Response(
-            {"detail": "يرجى الانتظار قبل إعادة إرسال الرمز"},
+            {"detail": _OTP_LIMIT_MESSAGES[blocked.name]},
             status=status.HTTP_429_TOO_MANY_REQUESTS,
         )
 
-    # Per-phone hourly limit
-    phone_hourly_limit = int(getattr(settings, "OTP_PHONE_HOURLY_LIMIT", 0) or 0)
-    if phone_hourly_limit > 0:
-        since = timezone.now() - timedelta(hours=1)
-        cnt = OTP.objects.filter(phone=phone, created_at__gte=since).count()
-        if cnt >= phone_hourly_limit:
-            return Response(
-                {"detail": "تم تجاوز حد إرسال الرموز لهذا الرقم مؤقتًا"},
-                status=status.HTTP_429_TOO_MANY_REQUESTS,
-            )
-
-    # Per-phone daily limit
-    phone_daily_limit = int(getattr(settings, "OTP_PHONE_DAILY_LIMIT", 0) or 0)
-    if phone_daily_limit > 0:
-        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
-        cnt = OTP.objects.filter(phone=phone, created_at__gte=today_start).count()
-        if cnt >= phone_daily_limit:
-            return Response(
-                {"detail": "تم تجاوز الحد اليومي لإرسال الرموز لهذا الرقم"},
-                status=status.HTTP_429_TOO_MANY_REQUESTS,
-            )
-
-    # Per-IP hourly limit (best-effort)
-    ip_hourly_limit = int(getattr(settings, "OTP_IP_HOURLY_LIMIT", 0) or 0)
-    if ip_hourly_limit > 0 and client_ip:
-        since = timezone.now() - timedelta(hours=1)
-        cnt = OTP.objects.filter(ip_address=client_ip, created_at__gte=since).count()
-        if cnt >= ip_hourly_limit:
-            return Response(
-                {"detail": "تم تجاوز حد إرسال الرموز من هذا الجهاز/الشبكة مؤقتًا"},
-                status=status.HTTP_429_TOO_MANY_REQUESTS,
-            )
-
     # Generate a new code.
     # For staging QA only, you can force a fixed OTP via OTP_TEST_CODE (e.g. 0000)
     # but only when OTP_TEST_MODE is enabled and the secret header matches.
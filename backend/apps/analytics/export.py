@@ -1,21 +1,81 @@
 from __future__ import annotations
 
 import csv
-from django.http import HttpResponse
+import zlib
+
+from django.http import StreamingHttpResponse
 
 from apps.billing.models import Invoice
 
+from .filters import date_range_qs
+
+
+PAID_INVOICES_HEADER = ["invoice_code", "user_phone", "total", "paid_at"]
+EXPORT_CHUNK_SIZE = 2000
+# نجمع الصفوف في دفعات بهذا الحجم تقريبًا قبل إرسالها (وقبل الضغط)
+STREAM_BUFFER_BYTES = 64 * 1024
+
+
+class _Echo:
+    """ملف وهمي: csv.writer يعيد السطر بدل كتابته."""
+
+    def write(self, value):
+        return value
+
+
+def iter_paid_invoice_rows(start_date=None, end_date=None, *, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    أسطر CSV للفواتير المدفوعة (بدون حد أعلى) بذاكرة ثابتة:
+    استعلام واحد مع join للمستخدم يُقرأ بالـ iterator على دفعات.
+    """
+    qs = Invoice.objects.filter(status="paid")
+    qs = date_range_qs(qs, "paid_at", start_date, end_date)
+    rows = qs.order_by("-paid_at", "-id").values_list("code", "user__phone", "total", "paid_at")
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(PAID_INVOICES_HEADER)
+    for code, phone, total, paid_at in rows.iterator(chunk_size=chunk_size):
+        yield writer.writerow([code, phone or "", total, paid_at])
+
+
+def _buffered(lines, size: int = STREAM_BUFFER_BYTES):
+    buf = []
+    buffered = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        buf.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield b"".join(buf)
 
-def export_paid_invoices_csv():
-    qs = Invoice.objects.filter(status="paid").order_by("-paid_at")[:5000]
 
-    resp = HttpResponse(content_type="text/csv")
-    resp["Content-Disposition"] = 'attachment; filename="paid_invoices.csv"'
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
-    writer = csv.writer(resp)
-    writer.writerow(["invoice_code", "user_phone", "total", "paid_at"])
 
-    for inv in qs:
-        writer.writerow([inv.code, getattr(inv.user, "phone", ""), inv.total, inv.paid_at])
+def export_paid_invoices_csv(start_date=None, end_date=None, *, gzip: bool = False):
+    """
+    StreamingHttpResponse لتصدير الفواتير المدفوعة:
+    - start_date / end_date على paid_at (من analytics.filters.parse_dates)
+    - gzip=True يضغط أثناء الإرسال (paid_invoices.csv.gz)
+    """
+    stream = _buffered(iter_paid_invoice_rows(start_date, end_date))
+    filename = "paid_invoices.csv"
+    content_type = "text/csv; charset=utf-8"
+    if gzip:
+        stream = _gzipped(stream)
+        filename += ".gz"
+        content_type = "application/gzip"
 
+    resp = StreamingHttpResponse(stream, content_type=content_type)
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
     return resp
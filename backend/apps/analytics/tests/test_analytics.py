@@ -28,3 +28,40 @@ def test_kpis(api, admin_user):
     r = api.get("/api/analytics/kpis/")
     assert r.status_code == 200
     assert "revenue_total" in r.data
+
+
+def test_export_paid_invoices_csv_streams_with_date_filter_and_gzip(api, admin_user, django_assert_num_queries):
+    import csv
+    import gzip
+    import io
+    from datetime import datetime, timezone as dt_timezone
+
+    old = datetime(2026, 1, 5, 10, 0, tzinfo=dt_timezone.utc)
+    new = datetime(2026, 3, 5, 10, 0, tzinfo=dt_timezone.utc)
+    for when in (old, new, new):
+        Invoice.objects.create(
+            user=admin_user,
+            title="x",
+            subtotal=Decimal("10.00"),
+            total=Decimal("11.50"),
+            status="paid",
+            paid_at=when,
+        )
+    Invoice.objects.create(user=admin_user, title="draft", subtotal=Decimal("5.00"), total=Decimal("5.75"))
+
+    api.force_authenticate(user=admin_user)
+    r = api.get("/api/analytics/export/paid-invoices.csv", {"start": "2026-02-01"})
+    assert r.status_code == 200
+    assert r.streaming
+    with django_assert_num_queries(1):
+        body = b"".join(r.streaming_content).decode("utf-8")
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == ["invoice_code", "user_phone", "total", "paid_at"]
+    assert len(rows) == 3
+    assert all(row[1] == admin_user.phone for row in rows[1:])
+
+    rz = api.get("/api/analytics/export/paid-invoices.csv", {"gzip": "1"})
+    assert rz.status_code == 200
+    assert rz["Content-Disposition"].endswith('paid_invoices.csv.gz"')
+    unzipped = gzip.decompress(b"".join(rz.streaming_content)).decode("utf-8")
+    assert len(list(csv.reader(io.StringIO(unzipped)))) == 4
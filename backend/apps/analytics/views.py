@@ -54,4 +54,6 @@ class ExportPaidInvoicesCSVView(APIView):
 	permission_classes = [IsBackofficeAnalytics]
 
 	def get(self, request):
-		return export_paid_invoices_csv()
+		start_date, end_date = parse_dates(request.query_params)
+		gzip = (request.query_params.get("gzip") or "").strip().lower() in {"1", "true", "yes"}
+		return export_paid_invoices_csv(start_date, end_date, gzip=gzip)
@@ -2,15 +2,25 @@ from __future__ import annotations
 
 from django.utils.html import strip_tags
 
+from apps.core.caching import get_or_build
+
 from .models import SiteContentBlock, SiteLegalDocument, SiteLinks
 
 
+PUBLIC_CONTENT_CACHE_NAMESPACE = "content:public"
+
+
 def sanitize_text(value: str) -> str:
     cleaned = strip_tags((value or "").replace("\x00", ""))
     return " ".join(cleaned.split())
 
 
 def public_content_payload() -> dict:
+    """Blocks, active legal documents and links for the app; cached until any of them changes."""
+    return get_or_build(PUBLIC_CONTENT_CACHE_NAMESPACE, ("payload",), _build_public_content_payload)
+
+
+def _build_public_content_payload() -> dict:
     blocks_qs = SiteContentBlock.objects.filter(is_active=True).order_by("key")
     blocks = {
         b.key: {
@@ -0,0 +1,7 @@
+from apps.core.caching import invalidate_on_change
+
+from .models import SiteContentBlock, SiteLegalDocument, SiteLinks
+from .services import PUBLIC_CONTENT_CACHE_NAMESPACE
+
+
+invalidate_on_change(PUBLIC_CONTENT_CACHE_NAMESPACE, SiteContentBlock, SiteLegalDocument, SiteLinks)
@@ -38,3 +38,22 @@ def test_public_content_api_returns_blocks_docs_links(settings):
     assert res.data["blocks"]["onboarding_first_time"]["title_ar"] == block.title_ar
     assert res.data["links"]["x_url"] == "https://x.com/nawafeth"
     assert res.data["documents"]["terms"]["version"] == "1.0"
+
+
+def test_public_content_api_is_cached_until_content_changes(django_assert_num_queries):
+    block = SiteContentBlock.objects.create(
+        key="onboarding_first_time",
+        title_ar="قديم",
+        body_ar="محتوى",
+        is_active=True,
+    )
+    client = APIClient()
+    assert client.get("/api/content/public/").data["blocks"]["onboarding_first_time"]["title_ar"] == "قديم"
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/content/public/")
+    assert cached.status_code == 200
+
+    block.title_ar = "جديد"
+    block.save()
+    assert client.get("/api/content/public/").data["blocks"]["onboarding_first_time"]["title_ar"] == "جديد"
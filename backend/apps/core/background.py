@@ -0,0 +1,85 @@
+"""
+Fire-and-forget work that must not run inside the request/response cycle.
+
+run_after_commit(fn, *args, **kwargs) queues ``fn`` once the surrounding
+transaction commits and runs it on a small in-process thread pool, so the
+caller's response is not held up by fan-out work (bulk notifications, etc.).
+
+Pass only primitive arguments (ids, strings): the callable runs on another
+thread with its own DB connection and must reload what it needs.
+
+run_after_commit_in(pool, fn, ...) does the same on a named pool sized by
+settings.BACKGROUND_TASK_POOLS (e.g. CPU-bound media processing), so slow
+work there cannot starve the default pool.
+
+With settings.BACKGROUND_TASKS_EAGER the callable runs inline instead
+(tests, management commands, single-threaded debugging).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_pool_executors: dict[str, ThreadPoolExecutor] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, int(getattr(settings, "BACKGROUND_TASKS_WORKERS", 4)))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bg-task")
+    return _executor
+
+
+def _get_pool_executor(pool: str) -> ThreadPoolExecutor:
+    executor = _pool_executors.get(pool)
+    if executor is None:
+        with _executor_lock:
+            executor = _pool_executors.get(pool)
+            if executor is None:
+                size = (getattr(settings, "BACKGROUND_TASK_POOLS", {}) or {}).get(pool)
+                workers = max(1, int(size or os.cpu_count() or 1))
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bg-{pool}")
+                _pool_executors[pool] = executor
+    return executor
+
+
+def _run(fn, args, kwargs) -> None:
+    close_old_connections()
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception("background task %s failed", getattr(fn, "__name__", fn))
+    finally:
+        connections.close_all()
+
+
+def run_after_commit(fn, *args, **kwargs) -> None:
+    if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            logger.exception("background task %s failed", getattr(fn, "__name__", fn))
+        return
+
+    transaction.on_commit(lambda: _get_executor().submit(_run, fn, args, kwargs))
+
+
+def run_after_commit_in(pool: str, fn, *args, **kwargs) -> None:
+    if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+        run_after_commit(fn, *args, **kwargs)
+        return
+
+    transaction.on_commit(lambda: _get_pool_executor(pool).submit(_run, fn, args, kwargs))
@@ -0,0 +1,152 @@
+"""
+Small caching toolkit shared by the apps (backed by settings.CACHES).
+
+- Namespaces with a version token: ``versioned_key(ns, *parts)`` embeds the
+  namespace's current version, and ``bump_namespace(ns)`` replaces it, so one
+  write invalidates every key of the namespace without enumerating them.
+  ``versioned_keys(ns, parts_list)`` builds a batch of keys (get_many /
+  set_many) with a single read of the version.
+- ``invalidate_on_change(ns, *models)`` bumps the namespace on post_save /
+  post_delete of any of the models (and again after commit, so a concurrent
+  read cannot re-store data from before the write).
+- ``invalidate_keys(ns, *parts)`` drops single entries of a namespace the same
+  way (per-user caches: one user's change must not flush everybody).
+- ``get_or_build(ns, parts, build, timeout=...)`` reads through the cache with
+  stampede protection: one caller rebuilds under a short lock while the others
+  keep serving the previous value, and entries are refreshed slightly before
+  they expire so a hot key never goes cold for everybody at once. ``timeout``
+  may be a callable of the built value (data-dependent expiry, e.g. the next
+  promo or subscription boundary).
+
+Values must be picklable (the production cache is Redis).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import time
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+CACHE_VERSION_PREFIX = "cachever:"
+CACHE_LOCK_PREFIX = "cachelock:"
+
+# نسبة من المهلة يبدأ بعدها التحديث المبكر (باحتمال يزداد مع اقتراب الانتهاء)
+EARLY_REFRESH_FRACTION = 0.8
+
+
+def namespace_version(namespace: str) -> str:
+    key = f"{CACHE_VERSION_PREFIX}{namespace}"
+    version = cache.get(key)
+    if version is None:
+        version = str(time.time_ns())
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+    return version
+
+
+def _now_and_after_commit(func) -> None:
+    # مرة الآن ومرة بعد الـ commit: قراءة متزامنة قبل الحفظ لا تعيد تخزين بيانات قديمة
+    func()
+    transaction.on_commit(func)
+
+
+def bump_namespace(namespace: str) -> None:
+    """Invalidate every key of ``namespace`` (now and again after the current transaction commits)."""
+    key = f"{CACHE_VERSION_PREFIX}{namespace}"
+    _now_and_after_commit(lambda: cache.set(key, str(time.time_ns()), None))
+
+
+def _digest(parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def versioned_key(namespace: str, *parts) -> str:
+    return f"{namespace}:{namespace_version(namespace)}:{_digest(parts)}"
+
+
+def versioned_keys(namespace: str, parts_list) -> list[str]:
+    """``versioned_key`` for many ``parts`` tuples with a single read of the namespace version."""
+    version = namespace_version(namespace)
+    return [f"{namespace}:{version}:{_digest(tuple(parts))}" for parts in parts_list]
+
+
+def invalidate_keys(namespace: str, *parts_list) -> None:
+    """Drop the entries ``versioned_key(namespace, *parts)`` for each ``parts`` tuple (now and after commit)."""
+    parts_list = list(dict.fromkeys(tuple(p) for p in parts_list))
+    if parts_list:
+        keys = versioned_keys(namespace, parts_list)
+        _now_and_after_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_on_change(namespace: str, *models) -> None:
+    """Bump ``namespace`` whenever one of ``models`` is saved or deleted."""
+
+    def _receiver(sender, **kwargs):
+        bump_namespace(namespace)
+
+    for model in models:
+        uid = f"caching:{namespace}:{model._meta.label}"
+        post_save.connect(_receiver, sender=model, weak=False, dispatch_uid=f"{uid}:save")
+        post_delete.connect(_receiver, sender=model, weak=False, dispatch_uid=f"{uid}:delete")
+
+
+def _default_timeout() -> int:
+    return int(getattr(settings, "CACHE_DEFAULT_TIMEOUT_SECONDS", 300))
+
+
+def get_or_build(
+    namespace: str,
+    parts,
+    build,
+    *,
+    timeout: int | Callable[[Any], int] | None = None,
+    lock_seconds: int = 30,
+):
+    """
+    Cached ``build()`` under ``versioned_key(namespace, *parts)``.
+
+    The entry is stored for twice ``timeout`` with a soft expiry at ``timeout``:
+    past the soft expiry (or, randomly, shortly before it) a single caller
+    takes the rebuild lock and refreshes it while the rest keep the old value.
+    A callable ``timeout`` is evaluated on each freshly built value.
+    """
+    key = versioned_key(namespace, *parts)
+    now = time.time()
+    entry = cache.get(key)
+
+    if entry is not None:
+        soft_expiry, stored_at, value = entry
+        remaining = soft_expiry - now
+        early_window = (soft_expiry - stored_at) * (1 - EARLY_REFRESH_FRACTION)
+        due = remaining <= 0 or (remaining < early_window and random.random() > remaining / early_window)
+        if not due or not cache.add(f"{CACHE_LOCK_PREFIX}{key}", 1, lock_seconds):
+            return value
+    else:
+        # أول بناء: ننتظر قليلًا إن كان غيرنا يبنيه بدل أن يبني الجميع معًا
+        if not cache.add(f"{CACHE_LOCK_PREFIX}{key}", 1, lock_seconds):
+            for _ in range(10):
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry[2]
+            return build()
+
+    try:
+        value = build()
+        built_at = time.time()
+        if callable(timeout):
+            ttl = max(1, int(timeout(value)))
+        else:
+            ttl = _default_timeout() if timeout is None else int(timeout)
+        cache.set(key, (built_at + ttl, built_at, value), ttl * 2)
+        return value
+    finally:
+        cache.delete(f"{CACHE_LOCK_PREFIX}{key}")
@@ -0,0 +1,118 @@
+"""
+Periodic background jobs run by ``python manage.py run_jobs``.
+
+Each app declares its jobs in ``apps/<app>/jobs.py``:
+
+    @register_job("marketplace.expire_urgent_requests", interval_seconds=30)
+    def expire_urgent_requests(now):
+        ...
+        return next_due_at  # optional datetime hint
+
+A job runs at most every ``interval_seconds``; when it returns a datetime the
+next run is pulled forward to that moment (e.g. the next ``expires_at``), so
+work happens when it is due instead of on every API read.
+
+The schedule and a per-job lock live in the Django cache (Redis in
+production), so several workers can run side by side without running the same
+job twice. With the local-memory cache a single worker process is assumed.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+
+logger = logging.getLogger(__name__)
+
+JOBS_CACHE_PREFIX = "jobs:"
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    func: Callable[[datetime], datetime | None]
+    interval_seconds: int
+    lock_seconds: int = 300
+
+
+_registry: dict[str, Job] = {}
+
+
+def register_job(name: str, *, interval_seconds: int, lock_seconds: int = 300):
+    def decorator(func):
+        _registry[name] = Job(
+            name=name,
+            func=func,
+            interval_seconds=max(1, int(interval_seconds)),
+            lock_seconds=max(1, int(lock_seconds)),
+        )
+        return func
+
+    return decorator
+
+
+def autodiscover_jobs() -> dict[str, Job]:
+    autodiscover_modules("jobs")
+    return dict(_registry)
+
+
+def _next_key(name: str) -> str:
+    return f"{JOBS_CACHE_PREFIX}next:{name}"
+
+
+def _lock_key(name: str) -> str:
+    return f"{JOBS_CACHE_PREFIX}lock:{name}"
+
+
+def next_run_at(job: Job) -> float:
+    """Unix timestamp of the job's next scheduled run (0 = due now)."""
+    return float(cache.get(_next_key(job.name)) or 0)
+
+
+def run_job(job: Job, *, now: datetime | None = None) -> bool:
+    """
+    Run ``job`` now if no other worker holds its lock, then schedule the next run.
+    Returns False when skipped because of the lock.
+    """
+    lock_key = _lock_key(job.name)
+    if not cache.add(lock_key, "1", job.lock_seconds):
+        return False
+    now = now or timezone.now()
+    hint = None
+    try:
+        hint = job.func(now)
+    except Exception:
+        logger.exception("job %s failed", job.name)
+    finally:
+        next_at = now + timedelta(seconds=job.interval_seconds)
+        if isinstance(hint, datetime) and hint < next_at:
+            next_at = max(hint, now)
+        cache.set(_next_key(job.name), next_at.timestamp(), None)
+        cache.delete(lock_key)
+    return True
+
+
+def run_due_jobs(jobs: dict[str, Job] | None = None, *, now: datetime | None = None) -> list[str]:
+    """Run every job whose next run is due. Returns the names of the jobs that ran."""
+    jobs = _registry if jobs is None else jobs
+    now = now or timezone.now()
+    ran = []
+    for job in jobs.values():
+        if next_run_at(job) <= now.timestamp() and run_job(job, now=now):
+            ran.append(job.name)
+    return ran
+
+
+def seconds_until_next(jobs: dict[str, Job] | None = None) -> float:
+    jobs = _registry if jobs is None else jobs
+    if not jobs:
+        return 60.0
+    soonest = min(next_run_at(job) for job in jobs.values())
+    return max(0.0, soonest - time.time())
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.jobs import autodiscover_jobs, run_due_jobs, run_job, seconds_until_next
+
+
+class Command(BaseCommand):
+    help = (
+        "Run scheduled background jobs (apps/<app>/jobs.py). "
+        "Loops forever by default; use --once from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run due jobs once and exit.")
+        parser.add_argument("--job", action="append", default=[], help="Only run this job (repeatable); forces a run.")
+        parser.add_argument(
+            "--only",
+            action="append",
+            default=[],
+            help="Only schedule this job in this worker (repeatable), e.g. the one that needs this service's disk.",
+        )
+        parser.add_argument(
+            "--exclude",
+            action="append",
+            default=[],
+            help="Never run this job in this worker (repeatable), e.g. one that needs another service's disk.",
+        )
+        parser.add_argument("--max-sleep", type=float, default=30.0, help="Longest idle wait between checks (seconds).")
+        parser.add_argument("--list", action="store_true", help="List registered jobs and exit.")
+
+    def handle(self, *args, **options):
+        jobs = autodiscover_jobs()
+        unknown = [name for name in options["only"] + options["exclude"] if name not in jobs]
+        if unknown:
+            raise CommandError(f"Unknown job(s): {', '.join(unknown)}")
+        if options["only"]:
+            jobs = {name: jobs[name] for name in options["only"]}
+        for name in options["exclude"]:
+            jobs.pop(name, None)
+
+        if options["list"]:
+            for job in jobs.values():
+                self.stdout.write(f"{job.name} (every {job.interval_seconds}s)")
+            return
+
+        if options["job"]:
+            unknown = [name for name in options["job"] if name not in jobs]
+            if unknown:
+                raise CommandError(f"Unknown job(s): {', '.join(unknown)}")
+            for name in options["job"]:
+                ran = run_job(jobs[name])
+                self.stdout.write(self.style.SUCCESS(f"{name}: {'done' if ran else 'locked, skipped'}"))
+            return
+
+        if options["once"]:
+            ran = run_due_jobs(jobs)
+            self.stdout.write(self.style.SUCCESS(f"Ran jobs: {', '.join(ran) or '-'}"))
+            return
+
+        max_sleep = max(0.5, float(options["max_sleep"]))
+        self.stdout.write(f"Job worker started ({len(jobs)} job(s))")
+        try:
+            while True:
+                run_due_jobs(jobs)
+                time.sleep(min(max_sleep, max(0.5, seconds_until_next(jobs))))
+        except KeyboardInterrupt:
+            self.stdout.write("Job worker stopped")
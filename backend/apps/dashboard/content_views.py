@@ -11,7 +11,8 @@ from django.views.decorators.http import require_POST
 from apps.audit.models import AuditAction
 from apps.audit.services import log_action
 from apps.content.models import ContentBlockKey, LegalDocumentType, SiteContentBlock, SiteLegalDocument, SiteLinks
-from apps.content.services import sanitize_text
+from apps.content.services import PUBLIC_CONTENT_CACHE_NAMESPACE, sanitize_text
+from apps.core.caching import bump_namespace
 
 from .auth import dashboard_login_required
 from .views import _dashboard_allowed, dashboard_access_required
@@ -141,6 +142,7 @@ def content_doc_upload_action(request, doc_type: str):
 
     if is_active:
         SiteLegalDocument.objects.filter(doc_type=doc_type, is_active=True).exclude(id=doc.id).update(is_active=False)
+        bump_namespace(PUBLIC_CONTENT_CACHE_NAMESPACE)
 
     log_action(
         actor=request.user,
@@ -60,8 +60,7 @@ from apps.promo.models import PromoAdPrice, PromoAdType
 from apps.promo.services import quote_and_create_invoice, reject_request, activate_after_payment as activate_promo_after_payment
 from apps.extras.models import ExtraPurchase, ExtraPurchaseStatus
 from apps.extras.services import activate_extra_after_payment
-from apps.features.checks import has_feature
-from apps.features.upload_limits import user_max_upload_mb
+from apps.features.entitlements import Entitlements
 from apps.backoffice.models import AccessLevel, Dashboard, UserAccessProfile
 from apps.audit.models import AuditAction
 from apps.audit.services import log_action
@@ -4027,15 +4026,16 @@ def features_overview(request: HttpRequest) -> HttpResponse:
 
     rows = []
     for user in page_obj.object_list:
+        ent = Entitlements(user)
         rows.append(
             {
                 "user": user,
-                "verify_blue": has_feature(user, "verify_blue"),
-                "verify_green": has_feature(user, "verify_green"),
-                "promo_ads": has_feature(user, "promo_ads"),
-                "priority_support": has_feature(user, "priority_support"),
-                "extra_uploads": has_feature(user, "extra_uploads"),
-                "max_upload_mb": user_max_upload_mb(user),
+                "verify_blue": ent.has("verify_blue"),
+                "verify_green": ent.has("verify_green"),
+                "promo_ads": ent.has("promo_ads"),
+                "priority_support": ent.has("priority_support"),
+                "extra_uploads": ent.has("extra_uploads"),
+                "max_upload_mb": ent.max_upload_mb(),
             }
         )
 
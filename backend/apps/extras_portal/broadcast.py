@@ -0,0 +1,306 @@
+"""
+Bulk delivery of extras-portal scheduled messages.
+
+A scheduled message is delivered in chunks of recipients. Each chunk, in one
+transaction:
+- resolves the provider's direct thread with every recipient (one SELECT,
+  one bulk INSERT for the missing ones),
+- bulk-creates the messages,
+- moves the threads' last-message pointers and bumps/creates the recipients'
+  ThreadUserState unread counters (what messaging.signals does per message),
+- bulk-creates the "new message" notifications,
+- publishes the messages to open chat screens after commit
+  (apps.messaging.delivery, same events as any other send),
+- marks the recipients delivered and adds to delivered_count.
+
+Bulk inserts skip the per-message post_save signals, so the work above is the
+set-based equivalent of them. Recipients without delivered_at are what is
+left to do, so a crashed or interrupted delivery resumes where it stopped
+(the send_due_extras_portal_messages command / extras_portal.deliver_messages
+job pick up pending and stalled messages). A chunk that raises is rolled back
+and the message stays SENDING with its error and a retry_at (1, 2, 4, ...
+minutes, at most an hour); it only becomes FAILED after
+EXTRAS_PORTAL_BROADCAST_MAX_ATTEMPTS failed attempts.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, When
+from django.utils import timezone
+
+from apps.messaging.delivery import publish_messages
+from apps.messaging.models import Message, Thread, ThreadUserState
+from apps.notifications.models import EventType
+from apps.notifications.services import create_notifications_bulk
+
+from .models import (
+    ExtrasPortalScheduledMessage,
+    ExtrasPortalScheduledMessageRecipient,
+    ScheduledMessageStatus,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_size() -> int:
+    return max(1, int(getattr(settings, "EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE", 200)))
+
+
+def _max_attempts() -> int:
+    return max(1, int(getattr(settings, "EXTRAS_PORTAL_BROADCAST_MAX_ATTEMPTS", 5)))
+
+
+def _retry_delay(failed_attempts: int) -> timedelta:
+    return timedelta(seconds=min(60 * 2 ** (failed_attempts - 1), 3600))
+
+
+def resolve_direct_threads(sender_id: int, recipient_ids) -> dict[int, int]:
+    """{recipient_id: thread_id} of the sender's direct threads, creating the missing ones in bulk."""
+    ids = [uid for uid in dict.fromkeys(recipient_ids) if uid and uid != sender_id]
+    if not ids:
+        return {}
+
+    threads: dict[int, int] = {}
+    rows = (
+        Thread.objects.filter(is_direct=True)
+        .filter(Q(participant_1_id=sender_id, participant_2_id__in=ids) | Q(participant_2_id=sender_id, participant_1_id__in=ids))
+        .order_by("id")
+        .values_list("id", "participant_1_id", "participant_2_id")
+    )
+    for thread_id, p1, p2 in rows:
+        other = p2 if p1 == sender_id else p1
+        threads.setdefault(other, thread_id)
+
+    missing = [uid for uid in ids if uid not in threads]
+    if missing:
+        created = Thread.objects.bulk_create(
+            [Thread(is_direct=True, participant_1_id=sender_id, participant_2_id=uid) for uid in missing]
+        )
+        for thread in created:
+            threads[thread.participant_2_id] = thread.id
+    return threads
+
+
+def _record_read_state(sender_id: int, thread_by_recipient: dict[int, int], message_by_thread: dict[int, Message]):
+    thread_ids = list(message_by_thread)
+    first_new_id = min(m.id for m in message_by_thread.values())
+
+    # Last-message pointer only moves forward (same rule as messaging.signals.on_message_created)
+    Thread.objects.filter(id__in=thread_ids).filter(
+        Q(last_message_id__isnull=True) | Q(last_message_id__lt=first_new_id)
+    ).update(
+        last_message_id=Case(
+            *[When(id=tid, then=m.id) for tid, m in message_by_thread.items()],
+            output_field=IntegerField(),
+        ),
+        last_message_at=Case(*[When(id=tid, then=m.created_at) for tid, m in message_by_thread.items()]),
+    )
+
+    recipient_by_thread = {tid: uid for uid, tid in thread_by_recipient.items()}
+    state_filter = Q()
+    for tid, uid in recipient_by_thread.items():
+        state_filter |= Q(thread_id=tid, user_id=uid)
+    existing = set(ThreadUserState.objects.filter(state_filter).values_list("thread_id", flat=True))
+    if existing:
+        ThreadUserState.objects.filter(state_filter, thread_id__in=existing).update(
+            unread_count=F("unread_count") + 1
+        )
+
+    missing = [tid for tid in thread_ids if tid not in existing]
+    if missing:
+        # خيط مباشر بطرفين: غير المقروء للمستلم = كل رسائل المرسل في الخيط
+        unread = dict(
+            Message.objects.filter(thread_id__in=missing, sender_id=sender_id)
+            .values("thread_id")
+            .annotate(c=Count("id"))
+            .values_list("thread_id", "c")
+        )
+        ThreadUserState.objects.bulk_create(
+            [
+                ThreadUserState(thread_id=tid, user_id=recipient_by_thread[tid], unread_count=unread.get(tid, 1))
+                for tid in missing
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def _deliver_chunk(scheduled_id: int) -> int:
+    """Deliver the next chunk of undelivered recipients. Returns how many were delivered (0 = done)."""
+    with transaction.atomic():
+        scheduled = (
+            ExtrasPortalScheduledMessage.objects.select_for_update()
+            .select_related("provider__user")
+            .filter(id=scheduled_id)
+            .first()
+        )
+        if scheduled is None or scheduled.status not in (ScheduledMessageStatus.PENDING, ScheduledMessageStatus.SENDING):
+            return 0
+        sender_id = scheduled.provider.user_id
+
+        recipients = list(
+            ExtrasPortalScheduledMessageRecipient.objects.filter(scheduled_message_id=scheduled_id, delivered_at__isnull=True)
+            .order_by("id")
+            .values_list("id", "user_id")[: _chunk_size()]
+        )
+        if not recipients:
+            return 0
+
+        thread_by_recipient = resolve_direct_threads(sender_id, [uid for _, uid in recipients])
+        now = timezone.now()
+        messages = Message.objects.bulk_create(
+            [
+                Message(
+                    thread_id=thread_id,
+                    sender_id=sender_id,
+                    body=scheduled.body,
+                    attachment=scheduled.attachment,
+                    attachment_type="",
+                    attachment_name="",
+                    created_at=now,
+                )
+                for thread_id in dict.fromkeys(thread_by_recipient.values())
+            ]
+        )
+        message_by_thread = {m.thread_id: m for m in messages}
+        if message_by_thread:
+            _record_read_state(sender_id, thread_by_recipient, message_by_thread)
+            publish_messages(
+                messages,
+                sender=scheduled.provider.user,
+                participants={tid: [sender_id, uid] for uid, tid in thread_by_recipient.items()},
+            )
+            create_notifications_bulk(
+                user_ids=list(thread_by_recipient),
+                title="رسالة جديدة",
+                body="لديك رسالة جديدة في المحادثة.",
+                kind="message_new",
+                actor_id=sender_id,
+                event_type=EventType.MESSAGE_NEW,
+                pref_key="new_chat_message",
+                audience_mode="client",
+                per_user={
+                    uid: {
+                        "url": f"/threads/{tid}/chat",
+                        "message_id": message_by_thread[tid].id,
+                        "meta": {"thread_id": tid, "is_direct": True},
+                    }
+                    for uid, tid in thread_by_recipient.items()
+                },
+            )
+
+        # المستلم الذي هو المرسل نفسه لا يُرسل له شيء لكنه يُعلَّم كمنتهٍ
+        message_by_recipient = {
+            recipient_id: message_by_thread[thread_by_recipient[uid]].id
+            for recipient_id, uid in recipients
+            if thread_by_recipient.get(uid) in message_by_thread
+        }
+        ExtrasPortalScheduledMessageRecipient.objects.filter(id__in=[rid for rid, _ in recipients]).update(
+            delivered_at=now,
+            message_id=Case(
+                *[When(id=rid, then=mid) for rid, mid in message_by_recipient.items()],
+                default=None,
+                output_field=IntegerField(),
+            ),
+        )
+        ExtrasPortalScheduledMessage.objects.filter(id=scheduled_id).update(
+            status=ScheduledMessageStatus.SENDING,
+            delivered_count=F("delivered_count") + len(recipients),
+            retry_at=None,
+        )
+        return len(recipients)
+
+
+def _record_failure(scheduled_id: int, exc: Exception) -> None:
+    """Keep the message resumable after a failed chunk; give up only after the last attempt."""
+    with transaction.atomic():
+        scheduled = (
+            ExtrasPortalScheduledMessage.objects.select_for_update()
+            .filter(id=scheduled_id, status__in=[ScheduledMessageStatus.PENDING, ScheduledMessageStatus.SENDING])
+            .only("id", "failed_attempts")
+            .first()
+        )
+        if scheduled is None:
+            return
+        attempts = scheduled.failed_attempts + 1
+        if attempts >= _max_attempts():
+            status, retry_at = ScheduledMessageStatus.FAILED, None
+        else:
+            status, retry_at = ScheduledMessageStatus.SENDING, timezone.now() + _retry_delay(attempts)
+        ExtrasPortalScheduledMessage.objects.filter(id=scheduled_id).update(
+            status=status,
+            failed_attempts=attempts,
+            retry_at=retry_at,
+            error=str(exc)[:255],
+        )
+
+
+def deliver_scheduled_message(scheduled_id: int) -> bool:
+    """
+    Deliver every remaining recipient of a scheduled message, chunk by chunk.
+    Safe to call again after a crash (resumes) or concurrently (chunks are
+    serialized on the scheduled message row). Returns True when fully sent.
+    """
+    ExtrasPortalScheduledMessage.objects.filter(id=scheduled_id, total_count=0).update(
+        total_count=ExtrasPortalScheduledMessageRecipient.objects.filter(scheduled_message_id=scheduled_id).count()
+    )
+    try:
+        while _deliver_chunk(scheduled_id):
+            pass
+    except Exception as exc:
+        logger.exception("extras portal broadcast %s failed", scheduled_id)
+        _record_failure(scheduled_id, exc)
+        return False
+
+    if ExtrasPortalScheduledMessageRecipient.objects.filter(
+        scheduled_message_id=scheduled_id, delivered_at__isnull=True
+    ).exists():
+        return False
+    in_progress = ExtrasPortalScheduledMessage.objects.filter(
+        id=scheduled_id,
+        status__in=[ScheduledMessageStatus.PENDING, ScheduledMessageStatus.SENDING],
+    )
+    if in_progress.filter(delivered_count=0).update(status=ScheduledMessageStatus.CANCELLED, error="no recipients"):
+        return False
+    return bool(
+        in_progress.update(status=ScheduledMessageStatus.SENT, sent_at=timezone.now(), error="", retry_at=None)
+    )
+
+
+def due_scheduled_message_ids(now=None, *, stalled_after_seconds: int = 300) -> list[int]:
+    """
+    Scheduled messages that are due, immediate/in-progress ones whose worker
+    seems to have stopped, and failed sends whose retry_at has come.
+    """
+    now = now or timezone.now()
+    stalled_before = now - timedelta(seconds=stalled_after_seconds)
+    stalled = Q(
+        status__in=[ScheduledMessageStatus.PENDING, ScheduledMessageStatus.SENDING],
+        send_at__isnull=True,
+        created_at__lt=stalled_before,
+    ) | Q(status=ScheduledMessageStatus.SENDING, send_at__lt=stalled_before)
+    return list(
+        ExtrasPortalScheduledMessage.objects.filter(
+            Q(status=ScheduledMessageStatus.PENDING, send_at__isnull=False, send_at__lte=now)
+            | (stalled & Q(retry_at__isnull=True))
+            | Q(status=ScheduledMessageStatus.SENDING, retry_at__lte=now)
+        )
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def broadcast_progress(scheduled: ExtrasPortalScheduledMessage) -> dict:
+    return {
+        "id": scheduled.id,
+        "status": scheduled.status,
+        "total": scheduled.total_count,
+        "delivered": scheduled.delivered_count,
+        "sent_at": scheduled.sent_at.isoformat() if scheduled.sent_at else None,
+        "error": scheduled.error,
+        "retry_at": scheduled.retry_at.isoformat() if scheduled.retry_at else None,
+    }
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.conf import settings
+
+from apps.core.jobs import register_job
+
+from .broadcast import deliver_scheduled_message, due_scheduled_message_ids
+
+
+@register_job(
+    "extras_portal.deliver_scheduled_messages",
+    interval_seconds=getattr(settings, "EXTRAS_PORTAL_BROADCAST_JOB_INTERVAL_SECONDS", 60),
+    lock_seconds=900,
+)
+def deliver_scheduled_messages(now):
+    for scheduled_id in due_scheduled_message_ids(now):
+        deliver_scheduled_message(scheduled_id)
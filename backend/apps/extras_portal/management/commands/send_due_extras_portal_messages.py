@@ -1,78 +1,27 @@
 from __future__ import annotations
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.db.models import Q
-from django.utils import timezone
 
-from apps.messaging.models import Message, Thread
-
-from ...models import ExtrasPortalScheduledMessage, ScheduledMessageStatus
-
-
-def _get_or_create_direct_thread(user_a, user_b) -> Thread:
-    if user_a.id == user_b.id:
-        raise ValueError("cannot chat self")
-    thread = (
-        Thread.objects.filter(is_direct=True)
-        .filter(
-            Q(participant_1=user_a, participant_2=user_b)
-            | Q(participant_1=user_b, participant_2=user_a)
-        )
-        .first()
-    )
-    if thread:
-        return thread
-    return Thread.objects.create(is_direct=True, participant_1=user_a, participant_2=user_b)
+from ...broadcast import deliver_scheduled_message, due_scheduled_message_ids
 
 
 class Command(BaseCommand):
-    help = "Send due scheduled extras portal messages (bulk messaging)."
+    help = "Send due scheduled extras portal messages (bulk messaging); also resumes stalled sends."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stalled-after",
+            type=int,
+            default=300,
+            help="Resume immediate/in-progress sends untouched for this many seconds (default 300).",
+        )
 
     def handle(self, *args, **options):
-        now = timezone.now()
-        qs = (
-            ExtrasPortalScheduledMessage.objects.select_related("provider", "provider__user")
-            .prefetch_related("recipients", "recipients__user")
-            .filter(status=ScheduledMessageStatus.PENDING, send_at__isnull=False, send_at__lte=now)
-            .order_by("id")
-        )
-        count = qs.count()
-        if count == 0:
+        ids = due_scheduled_message_ids(stalled_after_seconds=options["stalled_after"])
+        if not ids:
             self.stdout.write("No due messages")
             return
 
-        self.stdout.write(f"Sending {count} due message(s)...")
-
-        for scheduled in qs:
-            provider_user = scheduled.provider.user
-            recipients = [r.user for r in scheduled.recipients.all()]
-            if not recipients:
-                scheduled.status = ScheduledMessageStatus.CANCELLED
-                scheduled.error = "no recipients"
-                scheduled.save(update_fields=["status", "error"])
-                continue
-
-            try:
-                with transaction.atomic():
-                    for u in recipients:
-                        thread = _get_or_create_direct_thread(provider_user, u)
-                        Message.objects.create(
-                            thread=thread,
-                            sender=provider_user,
-                            body=scheduled.body,
-                            attachment=scheduled.attachment,
-                            attachment_type="",
-                            attachment_name="",
-                            created_at=now,
-                        )
-                    scheduled.status = ScheduledMessageStatus.SENT
-                    scheduled.sent_at = now
-                    scheduled.error = ""
-                    scheduled.save(update_fields=["status", "sent_at", "error"])
-            except Exception as e:
-                scheduled.status = ScheduledMessageStatus.FAILED
-                scheduled.error = str(e)[:255]
-                scheduled.save(update_fields=["status", "error"])
-
-        self.stdout.write("Done")
+        self.stdout.write(f"Sending {len(ids)} due message(s)...")
+        sent = sum(1 for scheduled_id in ids if deliver_scheduled_message(scheduled_id))
+        self.stdout.write(f"Done ({sent} sent)")
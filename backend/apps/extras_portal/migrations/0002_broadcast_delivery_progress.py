@@ -0,0 +1,54 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extras_portal", "0001_initial"),
+        ("messaging", "0008_thread_user_state_read_cursor"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="extrasportalscheduledmessage",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "معلق"),
+                    ("sending", "جارٍ الإرسال"),
+                    ("sent", "تم الإرسال"),
+                    ("failed", "فشل"),
+                    ("cancelled", "ملغي"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="extrasportalscheduledmessage",
+            name="total_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="extrasportalscheduledmessage",
+            name="delivered_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="extrasportalscheduledmessagerecipient",
+            name="message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="messaging.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="extrasportalscheduledmessagerecipient",
+            name="delivered_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
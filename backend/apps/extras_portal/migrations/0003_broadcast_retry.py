@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extras_portal", "0002_broadcast_delivery_progress"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extrasportalscheduledmessage",
+            name="failed_attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="extrasportalscheduledmessage",
+            name="retry_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -48,6 +48,7 @@ class ExtrasPortalFinanceSettings(models.Model):
 
 class ScheduledMessageStatus(models.TextChoices):
     PENDING = "pending", "معلق"
+    SENDING = "sending", "جارٍ الإرسال"
     SENT = "sent", "تم الإرسال"
     FAILED = "failed", "فشل"
     CANCELLED = "cancelled", "ملغي"
@@ -77,6 +78,12 @@ class ExtrasPortalScheduledMessage(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     sent_at = models.DateTimeField(null=True, blank=True)
     error = models.CharField(max_length=255, blank=True, default="")
+    # تقدم الإرسال الجماعي (extras_portal.broadcast)
+    total_count = models.PositiveIntegerField(default=0)
+    delivered_count = models.PositiveIntegerField(default=0)
+    # خطأ عابر أثناء الإرسال: يبقى SENDING ويُعاد بعد retry_at، وFAILED بعد آخر محاولة
+    failed_attempts = models.PositiveSmallIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
 
 
 class ExtrasPortalScheduledMessageRecipient(models.Model):
@@ -91,6 +98,15 @@ class ExtrasPortalScheduledMessageRecipient(models.Model):
         related_name="extras_portal_message_recipients",
     )
     created_at = models.DateTimeField(default=timezone.now)
+    # يُملأ عند التسليم؛ المستلمون بدون delivered_at يُستأنف إرسالهم
+    message = models.ForeignKey(
+        "messaging.Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    delivered_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         constraints = [
@@ -0,0 +1,306 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.extras_portal.auth import SESSION_PORTAL_OTP_VERIFIED_KEY
+from apps.extras_portal.broadcast import (
+    _deliver_chunk,
+    deliver_scheduled_message,
+    due_scheduled_message_ids,
+)
+from apps.extras_portal.models import (
+    ExtrasPortalScheduledMessage,
+    ExtrasPortalScheduledMessageRecipient,
+    ScheduledMessageStatus,
+)
+from apps.messaging.models import Message, Thread, ThreadUserState
+from apps.notifications.models import EventLog, EventType, Notification
+from apps.providers.models import ProviderProfile
+
+
+pytestmark = pytest.mark.django_db
+
+
+def _provider(phone: str) -> ProviderProfile:
+    user = User.objects.create_user(phone=phone)
+    return ProviderProfile.objects.create(
+        user=user,
+        provider_type="individual",
+        display_name="Provider",
+        bio="bio",
+        city="Riyadh",
+    )
+
+
+def _clients(count: int) -> list[User]:
+    return [User.objects.create_user(phone=f"05700000{i:02d}") for i in range(count)]
+
+
+def _scheduled(provider: ProviderProfile, recipients, **kwargs) -> ExtrasPortalScheduledMessage:
+    scheduled = ExtrasPortalScheduledMessage.objects.create(
+        provider=provider,
+        body="عرض خاص",
+        created_by=provider.user,
+        total_count=len(recipients),
+        **kwargs,
+    )
+    ExtrasPortalScheduledMessageRecipient.objects.bulk_create(
+        [ExtrasPortalScheduledMessageRecipient(scheduled_message=scheduled, user=u) for u in recipients]
+    )
+    return scheduled
+
+
+def _portal_client(provider: ProviderProfile) -> Client:
+    client = Client()
+    client.force_login(provider.user)
+    session = client.session
+    session[SESSION_PORTAL_OTP_VERIFIED_KEY] = True
+    session.save()
+    return client
+
+
+def test_broadcast_is_delivered_in_chunks(settings):
+    settings.EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = 2
+    provider = _provider("0560000001")
+    clients = _clients(5)
+    scheduled = _scheduled(provider, clients)
+
+    assert deliver_scheduled_message(scheduled.id) is True
+
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.SENT
+    assert scheduled.sent_at is not None
+    assert scheduled.delivered_count == 5
+    assert Message.objects.filter(sender=provider.user).count() == 5
+    for client_user in clients:
+        thread = Thread.objects.get(is_direct=True, participant_1=provider.user, participant_2=client_user)
+        message = Message.objects.get(thread=thread)
+        assert thread.last_message_id == message.id
+        state = ThreadUserState.objects.get(thread=thread, user=client_user)
+        assert state.unread_count == 1
+        recipient = ExtrasPortalScheduledMessageRecipient.objects.get(scheduled_message=scheduled, user=client_user)
+        assert recipient.delivered_at is not None
+        assert recipient.message_id == message.id
+
+
+def test_broadcast_reuses_existing_thread_and_bumps_unread(settings):
+    settings.EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = 2
+    provider = _provider("0560000002")
+    existing_client, *others = _clients(3)
+    # الخيط القديم بطرفين معكوسين: العميل بدأ المحادثة
+    thread = Thread.objects.create(is_direct=True, participant_1=existing_client, participant_2=provider.user)
+    old = Message.objects.create(thread=thread, sender=provider.user, body="مرحبا")
+    ThreadUserState.objects.filter(thread=thread, user=existing_client).delete()
+    ThreadUserState.objects.create(thread=thread, user=existing_client, unread_count=1)
+    scheduled = _scheduled(provider, [existing_client, *others])
+
+    assert deliver_scheduled_message(scheduled.id) is True
+
+    assert Thread.objects.filter(is_direct=True, participant_1=existing_client).count() == 1
+    thread.refresh_from_db()
+    new = Message.objects.filter(thread=thread).exclude(id=old.id).get()
+    assert thread.last_message_id == new.id
+    assert ThreadUserState.objects.get(thread=thread, user=existing_client).unread_count == 2
+
+
+def test_broadcast_notifies_each_recipient_with_its_thread(settings):
+    settings.EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = 2
+    provider = _provider("0560000003")
+    clients = _clients(3)
+    scheduled = _scheduled(provider, clients)
+
+    deliver_scheduled_message(scheduled.id)
+
+    for client_user in clients:
+        recipient = ExtrasPortalScheduledMessageRecipient.objects.select_related("message").get(
+            scheduled_message=scheduled, user=client_user
+        )
+        thread_id = recipient.message.thread_id
+        notif = Notification.objects.get(user=client_user, kind="message_new")
+        assert notif.url == f"/threads/{thread_id}/chat"
+        assert notif.audience_mode == "client"
+        event = EventLog.objects.get(target_user=client_user, event_type=EventType.MESSAGE_NEW)
+        assert event.message_id == recipient.message_id
+        assert event.meta == {"thread_id": thread_id, "is_direct": True}
+    assert not Notification.objects.filter(user=provider.user).exists()
+
+
+def test_interrupted_broadcast_resumes_without_duplicates(settings):
+    settings.EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = 2
+    provider = _provider("0560000004")
+    clients = _clients(5)
+    scheduled = _scheduled(provider, clients)
+
+    # العامل توقف بعد أول دفعة
+    assert _deliver_chunk(scheduled.id) == 2
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.SENDING
+    assert scheduled.delivered_count == 2
+
+    assert deliver_scheduled_message(scheduled.id) is True
+
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.SENT
+    assert scheduled.delivered_count == 5
+    assert Message.objects.filter(sender=provider.user).count() == 5
+    assert Notification.objects.filter(kind="message_new").count() == 5
+    assert not ExtrasPortalScheduledMessageRecipient.objects.filter(
+        scheduled_message=scheduled, delivered_at__isnull=True
+    ).exists()
+
+
+def test_failed_chunk_is_retried_with_backoff_and_resumes(settings, mocker):
+    settings.EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = 2
+    provider = _provider("0560000011")
+    clients = _clients(5)
+    scheduled = _scheduled(provider, clients)
+
+    from apps.extras_portal import broadcast
+
+    real_notify = broadcast.create_notifications_bulk
+    calls = []
+
+    def notify_then_fail(**kwargs):
+        # الدفعة الأولى تنجح، والثانية تصطدم بخطأ عابر
+        calls.append(kwargs)
+        if len(calls) > 1:
+            raise RuntimeError("redis down")
+        return real_notify(**kwargs)
+
+    mocker.patch.object(broadcast, "create_notifications_bulk", side_effect=notify_then_fail)
+
+    assert deliver_scheduled_message(scheduled.id) is False
+
+    scheduled.refresh_from_db()
+    # الدفعة الثانية أُلغيت كاملة؛ الرسالة تبقى قابلة للاستئناف
+    assert scheduled.status == ScheduledMessageStatus.SENDING
+    assert scheduled.delivered_count == 2
+    assert scheduled.failed_attempts == 1
+    assert scheduled.error == "redis down"
+    assert scheduled.retry_at is not None
+    assert Message.objects.filter(sender=provider.user).count() == 2
+    assert scheduled.id not in due_scheduled_message_ids(scheduled.retry_at - timedelta(seconds=1))
+    assert scheduled.id in due_scheduled_message_ids(scheduled.retry_at)
+
+    mocker.stopall()
+    assert deliver_scheduled_message(scheduled.id) is True
+
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.SENT
+    assert scheduled.delivered_count == 5
+    assert scheduled.retry_at is None
+    assert Message.objects.filter(sender=provider.user).count() == 5
+
+
+def test_broadcast_fails_after_the_last_attempt(settings, mocker):
+    settings.EXTRAS_PORTAL_BROADCAST_MAX_ATTEMPTS = 2
+    provider = _provider("0560000012")
+    clients = _clients(2)
+    scheduled = _scheduled(provider, clients)
+
+    from apps.extras_portal import broadcast
+
+    mocker.patch.object(broadcast, "create_notifications_bulk", side_effect=RuntimeError("boom"))
+
+    assert deliver_scheduled_message(scheduled.id) is False
+    scheduled.refresh_from_db()
+    first_retry_at = scheduled.retry_at
+    assert scheduled.status == ScheduledMessageStatus.SENDING
+
+    assert deliver_scheduled_message(scheduled.id) is False
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.FAILED
+    assert scheduled.failed_attempts == 2
+    assert scheduled.retry_at is None
+    assert scheduled.id not in due_scheduled_message_ids(first_retry_at + timedelta(days=1))
+    assert not Message.objects.filter(sender=provider.user).exists()
+
+
+def test_broadcast_without_recipients_is_cancelled():
+    provider = _provider("0560000005")
+    scheduled = _scheduled(provider, [])
+
+    assert deliver_scheduled_message(scheduled.id) is False
+
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.CANCELLED
+
+
+def test_due_ids_pick_up_scheduled_and_stalled_messages():
+    provider = _provider("0560000006")
+    (client_user,) = _clients(1)
+    now = timezone.now()
+    old = now - timedelta(minutes=10)
+
+    due = _scheduled(provider, [client_user], send_at=now - timedelta(minutes=1))
+    future = _scheduled(provider, [client_user], send_at=now + timedelta(hours=1))
+    stalled_immediate = _scheduled(provider, [client_user], created_at=old, status=ScheduledMessageStatus.SENDING)
+    fresh_immediate = _scheduled(provider, [client_user], status=ScheduledMessageStatus.SENDING)
+    stalled_scheduled = _scheduled(provider, [client_user], send_at=old, status=ScheduledMessageStatus.SENDING)
+    sent = _scheduled(provider, [client_user], created_at=old, status=ScheduledMessageStatus.SENT)
+
+    ids = due_scheduled_message_ids(now, stalled_after_seconds=300)
+
+    assert ids == [due.id, stalled_immediate.id, stalled_scheduled.id]
+    assert future.id not in ids
+    assert fresh_immediate.id not in ids
+    assert sent.id not in ids
+
+
+def test_send_due_command_resumes_stalled_message(settings):
+    settings.EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = 2
+    provider = _provider("0560000007")
+    clients = _clients(3)
+    scheduled = _scheduled(provider, clients, created_at=timezone.now() - timedelta(minutes=10))
+    _deliver_chunk(scheduled.id)
+
+    call_command("send_due_extras_portal_messages")
+
+    scheduled.refresh_from_db()
+    assert scheduled.status == ScheduledMessageStatus.SENT
+    assert scheduled.delivered_count == 3
+    assert Message.objects.filter(sender=provider.user).count() == 3
+
+
+def test_portal_clients_post_sends_immediately():
+    provider = _provider("0560000008")
+    clients = _clients(2)
+    client = _portal_client(provider)
+
+    res = client.post(
+        "/portal/extras/clients/",
+        {"body": "خصم الأسبوع", "client_ids": [str(u.id) for u in clients] + [str(provider.user_id)]},
+    )
+
+    assert res.status_code == 302
+    scheduled = ExtrasPortalScheduledMessage.objects.get(provider=provider)
+    assert scheduled.total_count == 2
+    assert scheduled.status == ScheduledMessageStatus.SENT
+    assert scheduled.delivered_count == 2
+    assert Message.objects.filter(sender=provider.user, body="خصم الأسبوع").count() == 2
+
+
+def test_portal_message_progress():
+    provider = _provider("0560000009")
+    other = _provider("0560000010")
+    clients = _clients(3)
+    scheduled = _scheduled(provider, clients)
+    foreign = _scheduled(other, clients)
+    _deliver_chunk(scheduled.id)
+    client = _portal_client(provider)
+
+    res = client.get(f"/portal/extras/clients/messages/{scheduled.id}/progress/")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["id"] == scheduled.id
+    assert data["status"] == ScheduledMessageStatus.SENDING
+    assert data["total"] == 3
+    assert data["delivered"] == 3
+    assert data["sent_at"] is None
+
+    res = client.get(f"/portal/extras/clients/messages/{foreign.id}/progress/")
+    assert res.status_code == 404
@@ -17,6 +17,7 @@ urlpatterns = [
     path("reports/export/xlsx/", views.portal_reports_export_xlsx, name="reports_export_xlsx"),
 
     path("clients/", views.portal_clients, name="clients"),
+    path("clients/messages/<int:message_id>/progress/", views.portal_message_progress, name="message_progress"),
 
     path("finance/", views.portal_finance, name="finance"),
     path("finance/export/pdf/", views.portal_finance_export_pdf, name="finance_export_pdf"),
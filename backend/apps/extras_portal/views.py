@@ -5,15 +5,16 @@ from datetime import timedelta
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.db.models import Q, Sum
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
 
 from apps.accounts.models import OTP, User
 from apps.accounts.otp import generate_otp_code, otp_expiry
+from apps.core.background import run_after_commit
 from apps.dashboard.exports import pdf_response, xlsx_response
 from apps.marketplace.models import RequestStatus, ServiceRequest
-from apps.messaging.models import Message, Thread
+from apps.messaging.models import Message
 from apps.providers.models import ProviderFollow, ProviderPortfolioLike, ProviderProfile
 
 from .auth import (
@@ -22,6 +23,7 @@ from .auth import (
     SESSION_PORTAL_OTP_VERIFIED_KEY,
     extras_portal_login_required,
 )
+from .broadcast import broadcast_progress, deliver_scheduled_message
 from .forms import BulkMessageForm, FinanceSettingsForm, PortalLoginForm, PortalOTPForm
 from .models import (
     ExtrasPortalFinanceSettings,
@@ -49,22 +51,6 @@ def _get_provider_or_403(request: HttpRequest) -> ProviderProfile:
     return user.provider_profile
 
 
-def _get_or_create_direct_thread(user_a: User, user_b: User) -> Thread:
-    if user_a.id == user_b.id:
-        raise ValueError("cannot chat self")
-    thread = (
-        Thread.objects.filter(is_direct=True)
-        .filter(
-            Q(participant_1=user_a, participant_2=user_b)
-            | Q(participant_1=user_b, participant_2=user_a)
-        )
-        .first()
-    )
-    if thread:
-        return thread
-    return Thread.objects.create(is_direct=True, participant_1=user_a, participant_2=user_b)
-
-
 def portal_home(request: HttpRequest) -> HttpResponse:
     if getattr(getattr(request, "user", None), "is_authenticated", False) and bool(
         request.session.get(SESSION_PORTAL_OTP_VERIFIED_KEY)
@@ -252,7 +238,6 @@ def portal_reports_export_pdf(request: HttpRequest) -> HttpResponse:
 @extras_portal_login_required
 def portal_clients(request: HttpRequest) -> HttpResponse:
     provider = _get_provider_or_403(request)
-    provider_user = provider.user
 
     clients_qs = (
         User.objects.filter(requests__provider=provider)
@@ -270,7 +255,7 @@ def portal_clients(request: HttpRequest) -> HttpResponse:
             messages.error(request, "اختر عميل واحد على الأقل")
             return redirect("extras_portal:clients")
 
-        recipients = list(User.objects.filter(id__in=recipient_ids))
+        recipients = list(User.objects.filter(id__in=recipient_ids).exclude(id=provider.user_id).values_list("id", flat=True))
         if not recipients:
             messages.error(request, "لا يوجد عملاء صالحون")
             return redirect("extras_portal:clients")
@@ -282,42 +267,23 @@ def portal_clients(request: HttpRequest) -> HttpResponse:
             attachment=form.cleaned_data.get("attachment"),
             send_at=send_at,
             created_by=request.user,
+            total_count=len(recipients),
         )
         ExtrasPortalScheduledMessageRecipient.objects.bulk_create(
             [
                 ExtrasPortalScheduledMessageRecipient(
                     scheduled_message=scheduled,
-                    user=u,
+                    user_id=user_id,
                 )
-                for u in recipients
+                for user_id in recipients
             ],
             ignore_conflicts=True,
         )
 
-        # If no schedule, send immediately.
+        # If no schedule, send immediately (in the background: threads/messages/notifications in bulk chunks).
         if not send_at:
-            now = timezone.now()
-            try:
-                for u in recipients:
-                    thread = _get_or_create_direct_thread(provider_user, u)
-                    Message.objects.create(
-                        thread=thread,
-                        sender=provider_user,
-                        body=scheduled.body,
-                        attachment=scheduled.attachment,
-                        attachment_type="",
-                        attachment_name="",
-                        created_at=now,
-                    )
-                scheduled.status = "sent"
-                scheduled.sent_at = now
-                scheduled.save(update_fields=["status", "sent_at"])
-                messages.success(request, "تم إرسال الرسالة")
-            except Exception as e:
-                scheduled.status = "failed"
-                scheduled.error = str(e)[:255]
-                scheduled.save(update_fields=["status", "error"])
-                messages.error(request, "تعذر إرسال الرسالة")
+            run_after_commit(deliver_scheduled_message, scheduled.id)
+            messages.success(request, "جارٍ إرسال الرسالة")
         else:
             messages.success(request, "تمت جدولة الرسالة")
 
@@ -334,6 +300,15 @@ def portal_clients(request: HttpRequest) -> HttpResponse:
     )
 
 
+@extras_portal_login_required
+def portal_message_progress(request: HttpRequest, message_id: int) -> JsonResponse:
+    provider = _get_provider_or_403(request)
+    scheduled = ExtrasPortalScheduledMessage.objects.filter(id=message_id, provider=provider).first()
+    if scheduled is None:
+        return JsonResponse({"detail": "not found"}, status=404)
+    return JsonResponse(broadcast_progress(scheduled))
+
+
 @extras_portal_login_required
 def portal_finance(request: HttpRequest) -> HttpResponse:
     provider = _get_provider_or_403(request)
@@ -4,18 +4,17 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from .checks import has_feature
-from .upload_limits import user_max_upload_mb
+from .entitlements import Entitlements
 
 
 class MyFeaturesView(APIView):
     def get(self, request):
-        user = request.user
+        ent = Entitlements.for_request(request)
         data = {
-            "verify_blue": has_feature(user, "verify_blue"),
-            "verify_green": has_feature(user, "verify_green"),
-            "promo_ads": has_feature(user, "promo_ads"),
-            "priority_support": has_feature(user, "priority_support"),
-            "max_upload_mb": user_max_upload_mb(user),
+            "verify_blue": ent.has("verify_blue"),
+            "verify_green": ent.has("verify_green"),
+            "promo_ads": ent.has("promo_ads"),
+            "priority_support": ent.has("priority_support"),
+            "max_upload_mb": ent.max_upload_mb(),
         }
         return Response(data, status=status.HTTP_200_OK)
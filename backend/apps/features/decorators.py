@@ -4,14 +4,14 @@ from functools import wraps
 from django.contrib import messages
 from django.shortcuts import redirect
 
-from .checks import has_feature
+from .entitlements import Entitlements
 
 
 def require_feature(feature_key: str, redirect_to: str = "home"):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped(request, *args, **kwargs):
-            if not has_feature(request.user, feature_key):
+            if not Entitlements.for_request(request).has(feature_key):
                 messages.error(request, "هذه الميزة غير متاحة في باقتك الحالية.")
                 return redirect(redirect_to)
             return view_func(request, *args, **kwargs)
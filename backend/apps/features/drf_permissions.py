@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from rest_framework.permissions import BasePermission
-from .checks import has_feature
+from .entitlements import Entitlements
 
 
 class HasFeature(BasePermission):
@@ -21,4 +21,4 @@ class HasFeature(BasePermission):
     def has_permission(self, request, view):
         if not self.feature_key:
             return False
-        return has_feature(request.user, self.feature_key)
+        return Entitlements.for_request(request).has(self.feature_key)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.extras.models import ExtraPurchase, ExtraPurchaseStatus, ExtraType
+from apps.subscriptions.models import Subscription, SubscriptionStatus
+
+
+# mapping feature -> sku_prefix (Extras/Add-ons fallback)
+FEATURE_EXTRA_PREFIX = {
+    "promo_ads": "promo_",
+    "extra_uploads": "uploads_",
+    "priority_support": "vip_support_",
+    "verify_blue": "verify_blue_",
+    "verify_green": "verify_green_",
+}
+
+
+def plan_tier_level(code: str, title: str, features) -> int:
+    """
+    1=basic, 2=leading, 3=professional حسب رمز/عنوان/ميزات الخطة
+    """
+    code = (code or "").strip().upper()
+    title = (title or "").strip()
+    features = set(features or [])
+    if (
+        "PROFESSIONAL" in code
+        or "احتراف" in title
+        or "advanced_analytics" in features
+    ):
+        return 3
+    if "PRO" in code or "رائد" in title or "priority_support" in features:
+        return 2
+    return 1
+
+
+def user_tier_levels(user_ids) -> dict[int, int]:
+    """
+    مستوى الباقة لعدة مستخدمين باستعلام واحد (الافتراضي 1 لمن لا اشتراك نشط له).
+    """
+    ids = {int(uid) for uid in user_ids if uid}
+    levels = {uid: 1 for uid in ids}
+    if not ids:
+        return levels
+    seen: set[int] = set()
+    subs = (
+        Subscription.objects.filter(user_id__in=ids, status=SubscriptionStatus.ACTIVE)
+        .select_related("plan")
+        .order_by("user_id", "-id")
+    )
+    for sub in subs:
+        if sub.user_id in seen:
+            continue
+        seen.add(sub.user_id)
+        levels[sub.user_id] = plan_tier_level(sub.plan.code, sub.plan.title, sub.plan.features)
+    return levels
+
+
+class Entitlements:
+    """
+    صلاحيات المستخدم (ميزات الباقة + الإضافات الفعالة) محمّلة مرة واحدة:
+    - استعلام للاشتراك النشط وخطته
+    - استعلام للإضافات الفعالة (فقط عند الحاجة)
+    ثم يُجاب عن كل أسئلة الميزات/الحدود من الذاكرة.
+
+    للاستخدام داخل طلب واحد عبر for_request() حتى لا يتكرر التحميل.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._plan_loaded = False
+        self._plan_code = ""
+        self._plan_title = ""
+        self._features: frozenset[str] = frozenset()
+        self._extra_skus: tuple[str, ...] | None = None
+
+    @property
+    def is_authenticated(self) -> bool:
+        return bool(self.user and getattr(self.user, "is_authenticated", False))
+
+    @classmethod
+    def for_request(cls, request) -> "Entitlements":
+        """
+        نسخة واحدة لكل طلب (DRF Request أو HttpRequest).
+        """
+        holder = getattr(request, "_request", request)
+        user = getattr(request, "user", None)
+        ent = getattr(holder, "_entitlements", None)
+        if ent is None or ent.user is not user:
+            ent = cls(user)
+            holder._entitlements = ent
+        return ent
+
+    def _load_plan(self) -> None:
+        if self._plan_loaded:
+            return
+        self._plan_loaded = True
+        if not self.is_authenticated:
+            return
+        active = (
+            Subscription.objects.filter(user=self.user, status=SubscriptionStatus.ACTIVE)
+            .select_related("plan")
+            .order_by("-id")
+            .first()
+        )
+        if not active:
+            return
+        self._plan_code = (active.plan.code or "").strip().upper()
+        self._plan_title = (active.plan.title or "").strip()
+        self._features = frozenset(active.plan.features or [])
+
+    def _load_extras(self) -> tuple[str, ...]:
+        if self._extra_skus is not None:
+            return self._extra_skus
+        skus: list[str] = []
+        if self.is_authenticated:
+            now = timezone.now()
+            # الفعالة فقط تُجلب (نافذة زمنية جارية أو رصيد متبقٍ) فلا حاجة لسقف يُسقط بادئات
+            skus = list(
+                ExtraPurchase.objects.filter(user=self.user, status=ExtraPurchaseStatus.ACTIVE)
+                .filter(
+                    Q(extra_type=ExtraType.TIME_BASED, start_at__lte=now, end_at__gt=now)
+                    | (~Q(extra_type=ExtraType.TIME_BASED) & Q(credits_used__lt=F("credits_total")))
+                )
+                .values_list("sku", flat=True)
+                .distinct()
+            )
+        self._extra_skus = tuple(skus)
+        return self._extra_skus
+
+    @property
+    def plan_features(self) -> frozenset[str]:
+        self._load_plan()
+        return self._features
+
+    def has_extra(self, sku_prefix: str) -> bool:
+        """
+        فحص وجود Add-on فعال (زمني أو credits) حسب بادئة sku
+        """
+        if not self.is_authenticated:
+            return False
+        return any(sku.startswith(sku_prefix) for sku in self._load_extras())
+
+    def has(self, feature_key: str) -> bool:
+        """
+        الميزة من الاشتراك، أو من Extras كخيار بديل.
+        """
+        if not self.is_authenticated:
+            return False
+        if feature_key in self.plan_features:
+            return True
+        sku_prefix = FEATURE_EXTRA_PREFIX.get(feature_key)
+        if sku_prefix:
+            return self.has_extra(sku_prefix)
+        return False
+
+    def max_upload_mb(self) -> int:
+        """
+        حدود مبدئية:
+        - Basic: 10MB
+        - Pro: 50MB
+        - Extra Uploads: 100MB
+        """
+        if not self.is_authenticated:
+            return 10
+        if self.has("extra_uploads"):
+            return 100
+        if self.has("promo_ads") or self.has("verify_blue"):
+            return 50
+        return 10
+
+    @property
+    def tier_level(self) -> int:
+        """
+        1=basic, 2=leading, 3=professional (من خطة الاشتراك النشط)
+        """
+        self._load_plan()
+        return plan_tier_level(self._plan_code, self._plan_title, self._features)
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
 from apps.subscriptions.models import Subscription
-from apps.subscriptions.services import refresh_subscription_status
+from apps.subscriptions.services import (
+    get_subscription_state,
+    invalidate_subscription_state,
+    refresh_subscription_status,
+    subscription_transition_due,
+)
 
 
 class SubscriptionRefreshMiddleware:
     """
     تحديث حالة الاشتراك بشكل خفيف عند كل Request
+
+    الحالة تُقرأ من لقطة مخزنة مؤقتًا (بدون قفل أو استعلام)،
+    ولا يُفتح refresh_subscription_status إلا إذا حان موعد انتقال فعلي.
     """
 
     def __init__(self, get_response):
@@ -15,11 +23,14 @@ class SubscriptionRefreshMiddleware:
     def __call__(self, request):
         user = getattr(request, "user", None)
         if user and user.is_authenticated:
-            sub = Subscription.objects.filter(user=user).order_by("-id").first()
-            if sub:
-                try:
-                    refresh_subscription_status(sub=sub)
-                except Exception:
-                    pass
+            try:
+                state = get_subscription_state(user)
+                if subscription_transition_due(state):
+                    sub = Subscription.objects.filter(pk=state["id"]).first()
+                    if sub:
+                        refresh_subscription_status(sub=sub)
+                    invalidate_subscription_state(user.id)
+            except Exception:
+                pass
 
         return self.get_response(request)
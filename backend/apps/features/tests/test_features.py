@@ -39,3 +39,75 @@ def test_my_features(api, user):
     r = api.get("/api/features/my/")
     assert r.status_code == 200
     assert r.data["promo_ads"] is True
+
+
+def test_entitlements_answer_all_checks_from_two_queries(user, django_assert_num_queries):
+    from django.utils import timezone
+    from datetime import timedelta
+
+    from apps.extras.models import ExtraPurchase, ExtraPurchaseStatus
+    from apps.features.entitlements import Entitlements
+
+    plan = SubscriptionPlan.objects.create(
+        code="PRO_MONTH",
+        title="Pro",
+        period=PlanPeriod.MONTH,
+        price=Decimal("10.00"),
+        features=["verify_blue", "priority_support"],
+    )
+    Subscription.objects.create(user=user, plan=plan, status=SubscriptionStatus.ACTIVE)
+    now = timezone.now()
+    ExtraPurchase.objects.create(
+        user=user,
+        sku="uploads_10gb_month",
+        title="10GB",
+        status=ExtraPurchaseStatus.ACTIVE,
+        start_at=now - timedelta(days=1),
+        end_at=now + timedelta(days=1),
+    )
+
+    ent = Entitlements(user)
+    with django_assert_num_queries(2):
+        assert ent.has("verify_blue") is True
+        assert ent.has("promo_ads") is False
+        assert ent.has("extra_uploads") is True
+        assert ent.max_upload_mb() == 100
+        assert ent.tier_level == 2
+
+
+def test_entitlements_see_every_prefix_with_many_extras(user):
+    from django.utils import timezone
+    from datetime import timedelta
+
+    from apps.extras.models import ExtraPurchase, ExtraPurchaseStatus
+    from apps.features.entitlements import Entitlements
+
+    now = timezone.now()
+    window = {"status": ExtraPurchaseStatus.ACTIVE, "start_at": now - timedelta(days=1), "end_at": now + timedelta(days=1)}
+    ExtraPurchase.objects.create(user=user, sku="uploads_10gb_month", title="10GB", **window)
+    ExtraPurchase.objects.bulk_create(
+        [ExtraPurchase(user=user, sku=f"promo_boost_{i}", title="Boost", **window) for i in range(120)]
+    )
+
+    ent = Entitlements(user)
+    assert ent.has("promo_ads") is True
+    assert ent.has("extra_uploads") is True
+    assert ent.max_upload_mb() == 100
+
+
+def test_my_features_max_upload_from_plan(api, user):
+    plan = SubscriptionPlan.objects.create(
+        code="BLUE",
+        title="Blue",
+        period=PlanPeriod.MONTH,
+        price=Decimal("10.00"),
+        features=["verify_blue"],
+    )
+    Subscription.objects.create(user=user, plan=plan, status=SubscriptionStatus.ACTIVE)
+
+    api.force_authenticate(user=user)
+    r = api.get("/api/features/my/")
+    assert r.status_code == 200
+    assert r.data["verify_blue"] is True
+    assert r.data["promo_ads"] is False
+    assert r.data["max_upload_mb"] == 50
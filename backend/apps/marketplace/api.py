@@ -9,7 +9,7 @@ import logging
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
@@ -17,11 +17,13 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.providers.geo import nearest_providers
 from apps.providers.models import ProviderCategory, ProviderProfile
 from apps.notifications.models import EventType
-from apps.notifications.services import create_notification
+from apps.notifications.services import create_notification, create_notifications_bulk
 
 from apps.accounts.permissions import IsAtLeastClient
+from apps.core.background import run_after_commit
 
 from .models import (
 	Offer,
@@ -47,11 +49,11 @@ from .serializers import (
 )
 
 from .services.actions import execute_action
+from .services.expiry import expire_urgent_request, with_effective_status
 
 from .views import (
 	_normalize_status_group,
 	_status_group_to_statuses,
-	_expire_urgent_requests,
 )
 
 
@@ -62,38 +64,60 @@ logger = logging.getLogger(__name__)
 # Helpers (internal to API layer)
 # ────────────────────────────────────────────────
 
-def _notify_urgent_request_to_matching_providers(service_request: ServiceRequest) -> None:
-	if service_request.request_type != RequestType.URGENT:
+def _notify_urgent_request_to_matching_providers(request_id: int) -> None:
+	"""
+	Fan out an urgent request to matching providers with bulk notification inserts.
+	Requests with a location target providers within URGENT_DISPATCH_RADIUS_KM
+	(geohash-cell lookup) plus same-city providers without coordinates (the
+	location is optional on profiles); otherwise the request city is matched.
+	"""
+	service_request = ServiceRequest.objects.filter(id=request_id).first()
+	if service_request is None or service_request.request_type != RequestType.URGENT:
 		return
 
-	provider_ids = ProviderCategory.objects.filter(
-		subcategory_id=service_request.subcategory_id
-	).values_list("provider_id", flat=True)
-
-	qs = ProviderProfile.objects.select_related("user").filter(
-		id__in=provider_ids,
+	qs = ProviderProfile.objects.filter(
+		Exists(
+			ProviderCategory.objects.filter(
+				provider=OuterRef("pk"),
+				subcategory_id=service_request.subcategory_id,
+			)
+		),
 		accepts_urgent=True,
+		user_id__isnull=False,
 	)
 	city = (service_request.city or "").strip()
-	if city:
-		qs = qs.filter(city=city)
-
-	for provider in qs:
-		if not provider.user_id:
-			continue
-		create_notification(
-			user=provider.user,
-			title="طلب خدمة عاجلة جديد",
-			body=f"يوجد طلب عاجل جديد في تخصصك: {service_request.title}",
-			kind="urgent_request",
-			url=f"/requests/{service_request.id}",
-			actor=service_request.client,
-			event_type=EventType.REQUEST_CREATED,
-			pref_key="urgent_request",
-			request_id=service_request.id,
-			is_urgent=True,
-			audience_mode="provider",
+	if service_request.lat is not None and service_request.lng is not None:
+		nearby = nearest_providers(
+			qs.only("id", "user_id", "lat", "lng"),
+			lat=float(service_request.lat),
+			lng=float(service_request.lng),
+			radius_km=float(getattr(settings, "URGENT_DISPATCH_RADIUS_KM", 25)),
 		)
+		user_ids = [p.user_id for p in nearby]
+		if city:
+			# مزودون بلا إحداثيات لا تصلهم المطابقة الجغرافية: تبقى لهم مطابقة المدينة
+			user_ids += list(
+				qs.filter(Q(lat__isnull=True) | Q(lng__isnull=True), city=city).values_list("user_id", flat=True)
+			)
+		user_ids = list(dict.fromkeys(user_ids))
+	else:
+		if city:
+			qs = qs.filter(city=city)
+		user_ids = qs.values_list("user_id", flat=True)
+
+	create_notifications_bulk(
+		user_ids=user_ids,
+		title="طلب خدمة عاجلة جديد",
+		body=f"يوجد طلب عاجل جديد في تخصصك: {service_request.title}",
+		kind="urgent_request",
+		url=f"/requests/{service_request.id}",
+		actor_id=service_request.client_id,
+		event_type=EventType.REQUEST_CREATED,
+		pref_key="urgent_request",
+		request_id=service_request.id,
+		is_urgent=True,
+		audience_mode="provider",
+	)
 
 
 # ────────────────────────────────────────────────
@@ -152,7 +176,8 @@ class ServiceRequestCreateView(generics.CreateAPIView):
 				audience_mode="provider",
 			)
 		if is_urgent and dispatch_mode in {"all", "nearest"}:
-			_notify_urgent_request_to_matching_providers(service_request)
+			# Off the request path: runs after commit on the background pool.
+			run_after_commit(_notify_urgent_request_to_matching_providers, service_request.id)
 
 
 class MyClientRequestsView(generics.ListAPIView):
@@ -160,8 +185,7 @@ class MyClientRequestsView(generics.ListAPIView):
 	serializer_class = ServiceRequestListSerializer
 
 	def get_queryset(self):
-		_expire_urgent_requests()
-		qs = (
+		qs = with_effective_status(
 			ServiceRequest.objects.select_related("provider", "review", "subcategory", "subcategory__category")
 			.filter(client=self.request.user)
 			.order_by("-created_at")
@@ -169,13 +193,13 @@ class MyClientRequestsView(generics.ListAPIView):
 
 		group_value = _normalize_status_group(self.request.query_params.get("status_group") or "")
 		if group_value:
-			qs = qs.filter(status__in=_status_group_to_statuses(group_value))
+			qs = qs.filter(effective_status__in=_status_group_to_statuses(group_value))
 
 		status_value = (self.request.query_params.get("status") or "").strip()
 		if status_value:
 			allowed = {c.value for c in RequestStatus}
 			if status_value in allowed:
-				qs = qs.filter(status=status_value)
+				qs = qs.filter(effective_status=status_value)
 
 		type_value = (self.request.query_params.get("type") or "").strip()
 		if type_value:
@@ -272,7 +296,6 @@ class UrgentRequestAcceptView(APIView):
 	permission_classes = [permissions.IsAuthenticated, IsProviderPermission]
 
 	def post(self, request):
-		_expire_urgent_requests()
 		serializer = UrgentRequestAcceptSerializer(data=request.data)
 		serializer.is_valid(raise_exception=True)
 
@@ -300,8 +323,7 @@ class UrgentRequestAcceptView(APIView):
 
 			now = timezone.now()
 			if service_request.expires_at and service_request.expires_at < now:
-				service_request.status = RequestStatus.CANCELLED
-				service_request.save(update_fields=["status"])
+				expire_urgent_request(service_request, now=now)
 				return Response(
 					{"detail": "انتهت صلاحية الطلب"},
 					status=status.HTTP_400_BAD_REQUEST,
@@ -363,7 +385,6 @@ class AvailableUrgentRequestsView(generics.ListAPIView):
 	serializer_class = ServiceRequestListSerializer
 
 	def get_queryset(self):
-		_expire_urgent_requests()
 		provider = self.request.user.provider_profile
 
 		provider_subcats = ProviderCategory.objects.filter(provider=provider).values_list(
@@ -426,9 +447,8 @@ class MyProviderRequestsView(generics.ListAPIView):
 	serializer_class = ServiceRequestListSerializer
 
 	def get_queryset(self):
-		_expire_urgent_requests()
 		provider = self.request.user.provider_profile
-		qs = (
+		qs = with_effective_status(
 			ServiceRequest.objects.select_related("client", "review", "subcategory", "subcategory__category")
 			.filter(provider=provider)
 			.order_by("-created_at")
@@ -436,7 +456,7 @@ class MyProviderRequestsView(generics.ListAPIView):
 
 		group_value = _normalize_status_group(self.request.query_params.get("status_group") or "")
 		if group_value:
-			qs = qs.filter(status__in=_status_group_to_statuses(group_value))
+			qs = qs.filter(effective_status__in=_status_group_to_statuses(group_value))
 
 		client_user_id = (self.request.query_params.get("client_user_id") or "").strip()
 		if client_user_id.isdigit():
@@ -496,7 +516,6 @@ class ProviderAssignedRequestAcceptView(APIView):
 
 	def post(self, request, request_id: int):
 		try:
-			_expire_urgent_requests()
 			provider = request.user.provider_profile
 
 			with transaction.atomic():
@@ -516,6 +535,7 @@ class ProviderAssignedRequestAcceptView(APIView):
 				if sr.request_type == RequestType.COMPETITIVE:
 					return Response({"detail": "هذا الطلب تنافسي ويتم التعامل معه عبر العروض"}, status=status.HTTP_400_BAD_REQUEST)
 
+				expire_urgent_request(sr)
 				if sr.status != RequestStatus.NEW:
 					return Response({"detail": "لا يمكن قبول الطلب في هذه الحالة"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -543,7 +563,6 @@ class ProviderAssignedRequestRejectView(APIView):
 	permission_classes = [permissions.IsAuthenticated, IsProviderPermission]
 
 	def post(self, request, request_id: int):
-		_expire_urgent_requests()
 		provider = request.user.provider_profile
 		s = ProviderRejectSerializer(data=request.data)
 		s.is_valid(raise_exception=True)
@@ -568,6 +587,7 @@ class ProviderAssignedRequestRejectView(APIView):
 			if sr.request_type == RequestType.COMPETITIVE:
 				return Response({"detail": "هذا الطلب تنافسي ويتم التعامل معه عبر العروض"}, status=status.HTTP_400_BAD_REQUEST)
 
+			expire_urgent_request(sr)
 			if sr.status != RequestStatus.NEW:
 				return Response({"detail": "لا يمكن رفض الطلب في هذه الحالة"}, status=status.HTTP_400_BAD_REQUEST)
 
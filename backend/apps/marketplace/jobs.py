@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.conf import settings
+
+from apps.core.jobs import register_job
+
+from .services.expiry import expire_due_urgent_requests, next_urgent_expiry
+
+
+@register_job(
+	"marketplace.expire_urgent_requests",
+	interval_seconds=getattr(settings, "URGENT_EXPIRY_JOB_INTERVAL_SECONDS", 30),
+)
+def expire_urgent_requests(now):
+	expire_due_urgent_requests(now=now)
+	return next_urgent_expiry(now=now)
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0009_unify_lifecycle_and_quote_deadline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="servicerequest",
+            name="lat",
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name="servicerequest",
+            name="lng",
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+    ]
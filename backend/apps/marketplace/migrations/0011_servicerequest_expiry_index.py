@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0010_servicerequest_location"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="servicerequest",
+            index=models.Index(fields=["request_type", "status", "expires_at"], name="sr_type_status_expires_idx"),
+        ),
+    ]
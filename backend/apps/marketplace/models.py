@@ -52,6 +52,9 @@ class ServiceRequest(models.Model):
 	)
 
 	city = models.CharField(max_length=100)
+	# موقع الطلب (اختياري) لتوجيه الطلبات العاجلة حسب المسافة بدل مطابقة اسم المدينة
+	lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+	lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
 	is_urgent = models.BooleanField(default=False)
 
 	created_at = models.DateTimeField(auto_now_add=True)
@@ -69,6 +72,12 @@ class ServiceRequest(models.Model):
 	provider_inputs_decided_at = models.DateTimeField(null=True, blank=True)
 	provider_inputs_decision_note = models.CharField(max_length=255, blank=True)
 
+	class Meta:
+		indexes = [
+			# مهمة marketplace.expire_urgent_requests (الطلبات العاجلة المنتهية)
+			models.Index(fields=["request_type", "status", "expires_at"], name="sr_type_status_expires_idx"),
+		]
+
 	def accept(self, provider: ProviderProfile) -> None:
 		if self.status != RequestStatus.NEW:
 			raise ValidationError("لا يمكن قبول الطلب الآن")
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 
 from .models import Offer, RequestStatusLog, ServiceRequest, ServiceRequestAttachment
@@ -27,6 +29,8 @@ class ServiceRequestCreateSerializer(serializers.ModelSerializer):
     )
     audio = serializers.FileField(required=False, write_only=True)
     quote_deadline = serializers.DateField(required=False, allow_null=True)
+    lat = serializers.FloatField(required=False, allow_null=True, min_value=-90, max_value=90)
+    lng = serializers.FloatField(required=False, allow_null=True, min_value=-180, max_value=180)
 
     class Meta:
         model = ServiceRequest
@@ -38,6 +42,8 @@ class ServiceRequestCreateSerializer(serializers.ModelSerializer):
             "description",
             "request_type",
             "city",
+            "lat",
+            "lng",
             "dispatch_mode",
             "images",
             "videos",
@@ -59,6 +65,14 @@ class ServiceRequestCreateSerializer(serializers.ModelSerializer):
         subcategory = attrs.get("subcategory")
         attrs["city"] = city
 
+        # الموقع اختياري، لكن يُرسل الإحداثيان معًا
+        lat, lng = attrs.get("lat"), attrs.get("lng")
+        if (lat is None) != (lng is None):
+            raise serializers.ValidationError({"lat": "يجب إرسال خط العرض وخط الطول معًا"})
+        if lat is not None:
+            attrs["lat"] = Decimal(str(round(lat, 6)))
+            attrs["lng"] = Decimal(str(round(lng, 6)))
+
         # City is optional only for urgent broadcasts sent to all providers.
         # For all other flows, keep city required.
         if not city and not (request_type == "urgent" and dispatch_mode == "all"):
@@ -148,6 +162,7 @@ class ServiceRequestListSerializer(serializers.ModelSerializer):
     client_name = serializers.SerializerMethodField()
     provider_name = serializers.CharField(source="provider.display_name", read_only=True)
     provider_phone = serializers.CharField(source="provider.user.phone", read_only=True)
+    status = serializers.SerializerMethodField()
     status_group = serializers.SerializerMethodField()
     status_label = serializers.SerializerMethodField()
     review_id = serializers.SerializerMethodField()
@@ -171,8 +186,12 @@ class ServiceRequestListSerializer(serializers.ModelSerializer):
             return "cancelled"
         return "new"
 
+    def get_status(self, obj):
+        # effective_status (services.expiry.with_effective_status): عاجل منتهٍ لم يصله job الإنهاء بعد
+        return getattr(obj, "effective_status", None) or obj.status
+
     def get_status_group(self, obj):
-        return self._status_group_value(getattr(obj, "status", ""))
+        return self._status_group_value(self.get_status(obj))
 
     def get_status_label(self, obj):
         group = self.get_status_group(obj)
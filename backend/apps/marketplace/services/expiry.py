@@ -0,0 +1,133 @@
+"""
+Expiry of urgent requests whose ``expires_at`` has passed.
+
+Runs from the ``marketplace.expire_urgent_requests`` job (apps/marketplace/jobs.py)
+instead of on every list request: due rows are cancelled in batches with one
+UPDATE and one bulk insert of RequestStatusLog per batch. Until the job has run
+(or when no worker runs, e.g. in development), read endpoints see due rows as
+cancelled: the available-urgent list excludes them and the "my requests" lists
+annotate ``effective_status`` (with_effective_status). Write endpoints expire
+the single row they lock.
+"""
+from __future__ import annotations
+
+from django.db import connection, transaction
+from django.db.models import Case, CharField, F, Min, Value, When
+from django.utils import timezone
+
+from apps.marketplace.models import RequestStatus, RequestStatusLog, RequestType, ServiceRequest
+
+
+URGENT_EXPIRED_NOTE = "انتهت مهلة الطلب العاجل"
+
+
+def _due_urgent_requests(now):
+    return ServiceRequest.objects.filter(
+        request_type=RequestType.URGENT,
+        status=RequestStatus.NEW,
+        expires_at__isnull=False,
+        expires_at__lt=now,
+    )
+
+
+def is_urgent_expired(sr: ServiceRequest, *, now=None) -> bool:
+    now = now or timezone.now()
+    return (
+        sr.request_type == RequestType.URGENT
+        and sr.status == RequestStatus.NEW
+        and sr.expires_at is not None
+        and sr.expires_at < now
+    )
+
+
+def with_effective_status(qs, *, now=None):
+    """
+    Annotate ``effective_status``: the stored status, or CANCELLED for urgent
+    requests still NEW past their expires_at that the job has not reached yet.
+    """
+    now = now or timezone.now()
+    return qs.annotate(
+        effective_status=Case(
+            When(
+                request_type=RequestType.URGENT,
+                status=RequestStatus.NEW,
+                expires_at__isnull=False,
+                expires_at__lt=now,
+                then=Value(RequestStatus.CANCELLED),
+            ),
+            default=F("status"),
+            output_field=CharField(),
+        )
+    )
+
+
+def expire_urgent_request(sr: ServiceRequest, *, now=None) -> bool:
+    """
+    إنهاء طلب عاجل واحد (مقفل مسبقًا بـ select_for_update) إن انتهت مهلته.
+    """
+    now = now or timezone.now()
+    if not is_urgent_expired(sr, now=now):
+        return False
+    old = sr.status
+    sr.status = RequestStatus.CANCELLED
+    sr.canceled_at = now
+    sr.cancel_reason = URGENT_EXPIRED_NOTE
+    sr.save(update_fields=["status", "canceled_at", "cancel_reason"])
+    RequestStatusLog.objects.create(
+        request=sr,
+        actor=None,
+        from_status=old,
+        to_status=sr.status,
+        note=URGENT_EXPIRED_NOTE,
+    )
+    return True
+
+
+def expire_due_urgent_requests(*, now=None, batch_size: int = 500) -> int:
+    """
+    إلغاء كل الطلبات العاجلة المنتهية مهلتها على دفعات، مع سجل حالة لكل طلب.
+    """
+    now = now or timezone.now()
+    lock_kwargs = {"skip_locked": True} if connection.features.has_select_for_update_skip_locked else {}
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                _due_urgent_requests(now)
+                .select_for_update(**lock_kwargs)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            ServiceRequest.objects.filter(id__in=ids).update(
+                status=RequestStatus.CANCELLED,
+                canceled_at=now,
+                cancel_reason=URGENT_EXPIRED_NOTE,
+            )
+            RequestStatusLog.objects.bulk_create(
+                [
+                    RequestStatusLog(
+                        request_id=request_id,
+                        actor=None,
+                        from_status=RequestStatus.NEW,
+                        to_status=RequestStatus.CANCELLED,
+                        note=URGENT_EXPIRED_NOTE,
+                    )
+                    for request_id in ids
+                ]
+            )
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+    return total
+
+
+def next_urgent_expiry(*, now=None):
+    """أقرب expires_at قادم لطلب عاجل جديد (أو None)."""
+    now = now or timezone.now()
+    return ServiceRequest.objects.filter(
+        request_type=RequestType.URGENT,
+        status=RequestStatus.NEW,
+        expires_at__gte=now,
+    ).aggregate(next_at=Min("expires_at"))["next_at"]
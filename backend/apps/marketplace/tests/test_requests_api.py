@@ -425,3 +425,74 @@ def test_create_urgent_creates_urgent_notifications_for_matching_providers_only(
     n_other = Notification.objects.filter(user=provider_user_other, kind="urgent_request").first()
     assert n_other is None
 
+
+
+@pytest.mark.django_db
+def test_create_urgent_with_location_targets_providers_by_distance():
+    from apps.accounts.models import User, UserRole
+
+    cat = Category.objects.create(name="خدمات", is_active=True)
+    sub = SubCategory.objects.create(category=cat, name="كهرباء", is_active=True)
+
+    def provider(phone, city, lat, lng):
+        user = User.objects.create(phone=phone, username=f"prov_{phone}")
+        profile = ProviderProfile.objects.create(
+            user=user,
+            provider_type="individual",
+            display_name=f"مزود {phone}",
+            bio="bio",
+            city=city,
+            accepts_urgent=True,
+            lat=lat,
+            lng=lng,
+        )
+        ProviderCategory.objects.get_or_create(provider=profile, subcategory=sub)
+        return user
+
+    # نفس الحي لكن باسم مدينة مكتوب بشكل مختلف
+    near_user = provider("0507778001", "Riyadh", "24.720000", "46.680000")
+    # نفس المدينة نصًا لكن على بعد ~80 كم
+    far_user = provider("0507778002", "الرياض", "24.000000", "46.900000")
+    # بلا إحداثيات: تبقى لهم مطابقة المدينة
+    city_only_user = provider("0507778003", "الرياض", None, None)
+    other_city_user = provider("0507778004", "جدة", None, None)
+
+    client_user = User.objects.create(phone="0507778000", username="client_geo", role_state=UserRole.CLIENT)
+    api = APIClient()
+    api.force_authenticate(user=client_user)
+    res = api.post(
+        "/api/marketplace/requests/create/",
+        {
+            "subcategory": sub.id,
+            "title": "عاجل كهرباء",
+            "description": "أحتاج كهربائي الآن",
+            "request_type": "urgent",
+            "city": "الرياض",
+            "dispatch_mode": "nearest",
+            "lat": 24.7136123,
+            "lng": 46.6753456,
+        },
+        format="json",
+    )
+    assert res.status_code == 201, res.content
+
+    sr = ServiceRequest.objects.get(title="عاجل كهرباء")
+    assert float(sr.lat) == pytest.approx(24.713612)
+    assert Notification.objects.filter(user=near_user, kind="urgent_request").exists()
+    assert not Notification.objects.filter(user=far_user, kind="urgent_request").exists()
+    assert Notification.objects.filter(user=city_only_user, kind="urgent_request").count() == 1
+    assert not Notification.objects.filter(user=other_city_user, kind="urgent_request").exists()
+
+    bad = api.post(
+        "/api/marketplace/requests/create/",
+        {
+            "subcategory": sub.id,
+            "title": "عاجل",
+            "description": "وصف",
+            "request_type": "urgent",
+            "city": "الرياض",
+            "lat": 24.7,
+        },
+        format="json",
+    )
+    assert bad.status_code == 400
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.core.jobs import autodiscover_jobs, next_run_at
+from apps.marketplace.models import RequestStatus, RequestStatusLog, RequestType, ServiceRequest
+
+
+pytestmark = pytest.mark.django_db
+
+
+def _urgent(client_user, subcategory, expires_in: timedelta) -> ServiceRequest:
+    return ServiceRequest.objects.create(
+        client=client_user,
+        subcategory=subcategory,
+        title="عاجل",
+        description="desc",
+        request_type=RequestType.URGENT,
+        status=RequestStatus.NEW,
+        city="الرياض",
+        is_urgent=True,
+        expires_at=timezone.now() + expires_in,
+    )
+
+
+def test_run_jobs_expires_due_urgent_requests_with_status_logs(client_user, subcategory):
+    expired = [_urgent(client_user, subcategory, timedelta(minutes=-1)) for _ in range(3)]
+    pending = _urgent(client_user, subcategory, timedelta(minutes=5))
+
+    out = StringIO()
+    call_command("run_jobs", "--job", "marketplace.expire_urgent_requests", stdout=out)
+
+    assert set(
+        ServiceRequest.objects.filter(status=RequestStatus.CANCELLED).values_list("id", flat=True)
+    ) == {sr.id for sr in expired}
+    pending.refresh_from_db()
+    assert pending.status == RequestStatus.NEW
+    logs = RequestStatusLog.objects.filter(request__in=expired)
+    assert logs.count() == 3
+    assert set(logs.values_list("to_status", flat=True)) == {RequestStatus.CANCELLED}
+
+    # الجولة التالية مجدولة عند أقرب expires_at لا بعد الفاصل الكامل
+    job = autodiscover_jobs()["marketplace.expire_urgent_requests"]
+    assert next_run_at(job) <= pending.expires_at.timestamp()
+
+
+
+def test_my_request_lists_show_due_urgent_requests_as_cancelled_before_the_job(
+    client_user, provider_profile, subcategory
+):
+    from rest_framework.test import APIClient
+
+    from apps.accounts.models import UserRole
+
+    client_user.role_state = UserRole.CLIENT
+    client_user.save(update_fields=["role_state"])
+    expired = _urgent(client_user, subcategory, timedelta(minutes=-1))
+    pending = _urgent(client_user, subcategory, timedelta(minutes=5))
+    ServiceRequest.objects.filter(id__in=[expired.id, pending.id]).update(provider=provider_profile)
+
+    api = APIClient()
+    api.force_authenticate(user=client_user)
+    rows = {row["id"]: row for row in api.get("/api/marketplace/client/requests/").json()}
+    assert (rows[expired.id]["status"], rows[expired.id]["status_group"]) == ("cancelled", "cancelled")
+    assert rows[pending.id]["status"] == "new"
+    new_ids = [row["id"] for row in api.get("/api/marketplace/client/requests/", {"status_group": "new"}).json()]
+    assert new_ids == [pending.id]
+
+    api.force_authenticate(user=provider_profile.user)
+    new_ids = [row["id"] for row in api.get("/api/marketplace/provider/requests/", {"status_group": "new"}).json()]
+    assert new_ids == [pending.id]
+
+    # الصف نفسه لم يتغير بعد: الإنهاء الفعلي عمل الـ job
+    expired.refresh_from_db()
+    assert expired.status == RequestStatus.NEW
+
+
+def test_run_jobs_only_and_exclude_select_the_scheduled_jobs():
+    out = StringIO()
+    call_command("run_jobs", "--list", "--only", "providers.process_pending_media", stdout=out)
+    assert out.getvalue().splitlines() == ["providers.process_pending_media (every 60s)"]
+
+    out = StringIO()
+    call_command("run_jobs", "--list", "--exclude", "providers.process_pending_media", stdout=out)
+    listed = out.getvalue()
+    assert "marketplace.expire_urgent_requests" in listed
+    assert "providers.process_pending_media" not in listed
@@ -10,7 +10,6 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.utils import timezone
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_POST
@@ -20,7 +19,6 @@ from apps.providers.models import ProviderCategory, ProviderProfile
 
 from .models import (
 	RequestStatus,
-	RequestType,
 	ServiceRequest,
 )
 
@@ -64,17 +62,6 @@ def _status_group_to_statuses(group: str) -> list[str]:
 	}[group]
 
 
-def _expire_urgent_requests() -> None:
-	now = timezone.now()
-	ServiceRequest.objects.filter(
-		request_type=RequestType.URGENT,
-		status=RequestStatus.NEW,
-		expires_at__isnull=False,
-		expires_at__lt=now,
-	).update(status=RequestStatus.CANCELLED)
-
-
-
 # ────────────────────────────────────────────────
 # Django template views (HTML dashboard)
 # ────────────────────────────────────────────────
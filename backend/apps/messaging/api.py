@@ -8,6 +8,7 @@ import logging
 import mimetypes
 import os
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from asgiref.sync import async_to_sync
@@ -22,9 +23,21 @@ from apps.marketplace.models import ServiceRequest
 from apps.providers.models import ProviderProfile
 from apps.support.models import SupportTicket, SupportTicketType, SupportPriority
 
-from .models import Message, MessageRead, Thread, ThreadUserState
-from .pagination import MessagePagination
+from .delivery import deliver_message
+from .models import Message, Thread, ThreadUserState
+from .pagination import InboxCursorPagination, MessagePagination
 from .permissions import IsRequestParticipant, IsThreadParticipant
+from .services import (
+	get_or_create_thread_state,
+	mark_thread_read,
+	mark_thread_unread,
+	message_changes,
+	read_watermarks,
+	record_message_tombstone,
+	thread_mode_q,
+	thread_participant_ids,
+	total_unread_count,
+)
 from .serializers import (
 	MessageCreateSerializer,
 	MessageListSerializer,
@@ -37,7 +50,6 @@ from .views import (
 	_active_context_mode_from_request,
 	_can_access_request,
 	_thread_participant_users,
-	_unarchive_for_participants,
 	_is_blocked_by_other,
 	_infer_attachment_type,
 )
@@ -71,13 +83,61 @@ class ThreadMessagesListView(generics.ListAPIView):
 	def get_queryset(self):
 		request_id = self.kwargs["request_id"]
 		thread = get_object_or_404(Thread, request_id=request_id)
+		self.thread = thread
 		return (
 			Message.objects.select_related("sender")
-			.prefetch_related("reads")
 			.filter(thread=thread)
 			.order_by("-id")
 		)
 
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		thread = getattr(self, "thread", None)
+		if thread is not None:
+			context["read_watermarks"] = read_watermarks(thread.id)
+		return context
+
+
+def _messages_sync_response(request, thread: Thread) -> Response:
+	"""
+	Incremental sync: ?since_id=<last message id held>&since_deleted_id=<cursor>&limit=.
+	Returns newer messages (oldest first), deleted ids and read watermarks;
+	the returned cursors are passed back on the next call.
+	"""
+	try:
+		since_id = max(0, int(request.query_params.get("since_id") or 0))
+		since_deleted_id = max(0, int(request.query_params.get("since_deleted_id") or 0))
+		limit = min(max(1, int(request.query_params.get("limit") or MessagePagination.max_limit)), MessagePagination.max_limit)
+	except (TypeError, ValueError):
+		return Response({"detail": "معاملات غير صحيحة"}, status=status.HTTP_400_BAD_REQUEST)
+
+	changes = message_changes(thread.id, since_id=since_id, since_deleted_id=since_deleted_id, limit=limit)
+	messages = MessageListSerializer(
+		changes["messages"],
+		many=True,
+		context={"request": request, "read_watermarks": changes["read_watermarks"]},
+	).data
+	return Response(
+		{
+			"thread_id": thread.id,
+			"messages": messages,
+			"has_more": changes["has_more"],
+			"deleted_ids": changes["deleted_ids"],
+			"read_watermarks": {str(uid): last for uid, last in changes["read_watermarks"].items()},
+			"since_id": changes["since_id"],
+			"since_deleted_id": changes["since_deleted_id"],
+		},
+		status=status.HTTP_200_OK,
+	)
+
+
+class ThreadMessagesSyncView(APIView):
+	permission_classes = [IsAtLeastPhoneOnly, IsRequestParticipant]
+
+	def get(self, request, request_id):
+		thread = get_object_or_404(Thread, request_id=request_id)
+		return _messages_sync_response(request, thread)
+
 
 class SendMessageView(APIView):
 	permission_classes = [IsAtLeastPhoneOnly, IsRequestParticipant]
@@ -100,16 +160,16 @@ class SendMessageView(APIView):
 		attachment_name = ""
 		if attachment:
 			attachment_name = os.path.basename(getattr(attachment, "name", "") or "").strip()
-		message = Message.objects.create(
-			thread=thread,
+		message = deliver_message(
+			thread_id=thread.id,
 			sender=request.user,
 			body=serializer.validated_data["body"],
+			request_id=thread.request_id,
+			participant_ids=thread_participant_ids(thread),
 			attachment=attachment,
 			attachment_type=attachment_type,
 			attachment_name=attachment_name,
-			created_at=timezone.now(),
 		)
-		_unarchive_for_participants(thread)
 
 		return Response(
 			{"ok": True, "message_id": message.id},
@@ -123,19 +183,7 @@ class MarkThreadReadView(APIView):
 	def post(self, request, request_id):
 		thread = get_object_or_404(Thread, request_id=request_id)
 
-		message_ids = list(
-			Message.objects.filter(thread=thread)
-			.exclude(reads__user=request.user)
-			.values_list("id", flat=True)
-		)
-
-		MessageRead.objects.bulk_create(
-			[
-				MessageRead(message_id=mid, user=request.user, read_at=timezone.now())
-				for mid in message_ids
-			],
-			ignore_conflicts=True,
-		)
+		message_ids = mark_thread_read(thread.id, request.user.id)
 
 		return Response(
 			{
@@ -204,13 +252,31 @@ class DirectThreadMessagesListView(generics.ListAPIView):
 		if not thread.is_participant(self.request.user):
 			from rest_framework.exceptions import PermissionDenied
 			raise PermissionDenied("غير مصرح")
+		self.thread = thread
 		return (
 			Message.objects.select_related("sender")
-			.prefetch_related("reads")
 			.filter(thread=thread)
 			.order_by("-id")
 		)
 
+	def get_serializer_context(self):
+		context = super().get_serializer_context()
+		thread = getattr(self, "thread", None)
+		if thread is not None:
+			context["read_watermarks"] = read_watermarks(thread.id)
+		return context
+
+
+class DirectThreadMessagesSyncView(APIView):
+	"""Incremental sync of a direct thread (see _messages_sync_response)."""
+	permission_classes = [IsAtLeastPhoneOnly]
+
+	def get(self, request, thread_id):
+		thread = get_object_or_404(Thread, id=thread_id, is_direct=True)
+		if not thread.is_participant(request.user):
+			return Response({"error": "غير مصرح"}, status=status.HTTP_403_FORBIDDEN)
+		return _messages_sync_response(request, thread)
+
 
 class DirectThreadSendMessageView(APIView):
 	"""Send a message in a direct thread."""
@@ -235,14 +301,15 @@ class DirectThreadSendMessageView(APIView):
 		attachment_name = ""
 		if attachment:
 			attachment_name = os.path.basename(getattr(attachment, "name", "") or "").strip()
-		message = Message.objects.create(
-			thread=thread,
+		message = deliver_message(
+			thread_id=thread.id,
 			sender=request.user,
 			body=serializer.validated_data["body"],
+			request_id=thread.request_id,
+			participant_ids=thread_participant_ids(thread),
 			attachment=attachment,
 			attachment_type=attachment_type,
 			attachment_name=attachment_name,
-			created_at=timezone.now(),
 		)
 
 		return Response(
@@ -260,19 +327,7 @@ class DirectThreadMarkReadView(APIView):
 		if not thread.is_participant(request.user):
 			return Response({"error": "غير مصرح"}, status=status.HTTP_403_FORBIDDEN)
 
-		message_ids = list(
-			Message.objects.filter(thread=thread)
-			.exclude(reads__user=request.user)
-			.values_list("id", flat=True)
-		)
-
-		MessageRead.objects.bulk_create(
-			[
-				MessageRead(message_id=mid, user=request.user, read_at=timezone.now())
-				for mid in message_ids
-			],
-			ignore_conflicts=True,
-		)
+		message_ids = mark_thread_read(thread.id, request.user.id)
 
 		return Response(
 			{
@@ -286,11 +341,20 @@ class DirectThreadMarkReadView(APIView):
 
 
 class MyDirectThreadsListView(APIView):
-	"""List all direct threads for the current user."""
+	"""List all direct threads for the current user.
+
+	Built in a constant number of queries: the last message comes from the
+	denormalized Thread.last_message pointer, peer provider profiles are joined,
+	and unread counts are read from the per-user ThreadUserState counters.
+
+	Pass ``cursor`` or ``limit`` to get a cursor-paginated envelope
+	(``next`` / ``previous`` / ``results``); without them the legacy flat list
+	is returned for older app builds.
+	"""
 	permission_classes = [IsAtLeastPhoneOnly]
 
 	def get(self, request):
-		from django.db.models import Q, Max
+		from django.db.models import Q
 		me = request.user
 		mode = _active_context_mode_from_request(request)
 
@@ -300,16 +364,32 @@ class MyDirectThreadsListView(APIView):
 		threads = (
 			threads
 			.filter(Q(participant_1=me) | Q(participant_2=me))
-			.select_related("participant_1", "participant_2")
-			.annotate(last_message_at=Max("messages__created_at"))
-			.order_by("-last_message_at")
+			.select_related(
+				"participant_1",
+				"participant_1__provider_profile",
+				"participant_2",
+				"participant_2__provider_profile",
+				"last_message",
+			)
+			.order_by("-last_message_at", "-id")
 		)
 
+		paginator = None
+		if "cursor" in request.query_params or "limit" in request.query_params:
+			paginator = InboxCursorPagination()
+			page = paginator.paginate_queryset(threads, request, view=self)
+		else:
+			page = list(threads)
+
+		unread_by_thread = dict(
+			ThreadUserState.objects.filter(user=me, thread_id__in=[t.id for t in page])
+			.values_list("thread_id", "unread_count")
+		) if page else {}
+
 		result = []
-		for t in threads:
+		for t in page:
 			peer = t.participant_2 if t.participant_1_id == me.id else t.participant_1
-			last_msg = t.messages.order_by("-id").first()
-			unread = t.messages.exclude(sender=me).exclude(reads__user=me).count()
+			last_msg = t.last_message
 
 			# Get provider profile for peer if exists
 			peer_provider = getattr(peer, "provider_profile", None)
@@ -325,9 +405,11 @@ class MyDirectThreadsListView(APIView):
 				"peer_phone": getattr(peer, "phone", ""),
 				"last_message": last_msg.body if last_msg else "",
 				"last_message_at": last_msg.created_at.isoformat() if last_msg else t.created_at.isoformat(),
-				"unread_count": unread,
+				"unread_count": unread_by_thread.get(t.id, 0),
 			})
 
+		if paginator is not None:
+			return paginator.get_paginated_response(result)
 		return Response(result, status=status.HTTP_200_OK)
 
 
@@ -335,33 +417,23 @@ class MyDirectThreadsListView(APIView):
 # Thread state management
 # ────────────────────────────────────────────────
 
+class MyUnreadCountView(APIView):
+	"""Total unread messages across the user's threads, served from ThreadUserState counters."""
+	permission_classes = [IsAtLeastPhoneOnly]
+
+	def get(self, request):
+		mode = _active_context_mode_from_request(request)
+		return Response({"unread_count": total_unread_count(request.user, mode)}, status=status.HTTP_200_OK)
+
+
 class MyThreadStatesListView(APIView):
 	permission_classes = [IsAtLeastPhoneOnly]
 
 	def get(self, request):
-		from django.db.models import Q
 		me = request.user
 		mode = _active_context_mode_from_request(request)
 
-		q = Q()
-		if mode in {"client", "provider"}:
-			q |= (
-				(Q(is_direct=True, participant_1=me) | Q(is_direct=True, participant_2=me))
-				& Q(context_mode=mode)
-			)
-			if mode == "client":
-				q |= Q(request__client=me)
-			else:
-				q |= Q(request__provider__user=me)
-		else:
-			q |= (
-				Q(is_direct=True, participant_1=me)
-				| Q(is_direct=True, participant_2=me)
-				| Q(request__client=me)
-				| Q(request__provider__user=me)
-			)
-
-		thread_ids = list(Thread.objects.filter(q).values_list("id", flat=True))
+		thread_ids = list(Thread.objects.filter(thread_mode_q(me, mode)).values_list("id", flat=True))
 
 		states = ThreadUserState.objects.filter(user=me, thread_id__in=thread_ids)
 		return Response(ThreadUserStateSerializer(states, many=True).data, status=status.HTTP_200_OK)
@@ -371,7 +443,7 @@ class ThreadStateDetailView(APIView):
 	permission_classes = [IsAtLeastPhoneOnly, IsThreadParticipant]
 
 	def get(self, request, thread_id: int):
-		obj, _ = ThreadUserState.objects.get_or_create(thread_id=thread_id, user=request.user)
+		obj, _ = get_or_create_thread_state(thread_id, request.user.id)
 		thread = (
 			Thread.objects.select_related(
 				"request",
@@ -393,7 +465,7 @@ class ThreadFavoriteView(APIView):
 
 	def post(self, request, thread_id: int):
 		action = (request.data.get("action") or "").strip().lower()
-		obj, _ = ThreadUserState.objects.get_or_create(thread_id=thread_id, user=request.user)
+		obj, _ = get_or_create_thread_state(thread_id, request.user.id)
 		if action == "remove":
 			obj.is_favorite = False
 			obj.favorite_label = ""
@@ -408,7 +480,7 @@ class ThreadArchiveView(APIView):
 
 	def post(self, request, thread_id: int):
 		action = (request.data.get("action") or "").strip().lower()
-		obj, _ = ThreadUserState.objects.get_or_create(thread_id=thread_id, user=request.user)
+		obj, _ = get_or_create_thread_state(thread_id, request.user.id)
 
 		if action == "remove":
 			obj.is_archived = False
@@ -427,7 +499,7 @@ class ThreadBlockView(APIView):
 	def post(self, request, thread_id: int):
 		channel_layer = get_channel_layer()
 		action = (request.data.get("action") or "").strip().lower()
-		obj, _ = ThreadUserState.objects.get_or_create(thread_id=thread_id, user=request.user)
+		obj, _ = get_or_create_thread_state(thread_id, request.user.id)
 
 		if action == "remove":
 			obj.is_blocked = False
@@ -538,12 +610,7 @@ class ThreadMarkUnreadView(APIView):
 	def post(self, request, thread_id: int):
 		thread = get_object_or_404(Thread, id=thread_id)
 
-		last_peer_message = (
-			Message.objects.filter(thread=thread)
-			.exclude(sender=request.user)
-			.order_by("-created_at", "-id")
-			.first()
-		)
+		last_peer_message, was_read = mark_thread_unread(thread.id, request.user.id)
 
 		if not last_peer_message:
 			return Response(
@@ -551,13 +618,13 @@ class ThreadMarkUnreadView(APIView):
 				status=status.HTTP_200_OK,
 			)
 
-		deleted, _ = MessageRead.objects.filter(message=last_peer_message, user=request.user).delete()
 		return Response(
 			{
 				"ok": True,
 				"marked": 1,
 				"message_id": last_peer_message.id,
-				"deleted": deleted,
+				# عدد إيصالات القراءة التي أُلغيت (كما في الاستجابة السابقة): 1 إن كانت مقروءة
+				"deleted": int(was_read),
 			},
 			status=status.HTTP_200_OK,
 		)
@@ -577,7 +644,9 @@ class ThreadDeleteMessageView(APIView):
 				status=status.HTTP_403_FORBIDDEN,
 			)
 
-		message.delete()
+		with transaction.atomic():
+			record_message_tombstone(message, deleted_by_id=request.user.id)
+			message.delete()
 
 		# Best-effort realtime sync for active chat screens.
 		try:
@@ -614,7 +683,7 @@ class ThreadFavoriteLabelView(APIView):
 				{"detail": f"قيمة label غير صحيحة. القيم المقبولة: {', '.join(self.VALID_LABELS - {''})}"},
 				status=status.HTTP_400_BAD_REQUEST,
 			)
-		obj, _ = ThreadUserState.objects.get_or_create(thread_id=thread_id, user=request.user)
+		obj, _ = get_or_create_thread_state(thread_id, request.user.id)
 		obj.favorite_label = label
 		# Setting a label auto-marks as favorite
 		if label:
@@ -639,7 +708,7 @@ class ThreadClientLabelView(APIView):
 				{"detail": f"قيمة label غير صحيحة. القيم المقبولة: {', '.join(self.VALID_LABELS - {''})}"},
 				status=status.HTTP_400_BAD_REQUEST,
 			)
-		obj, _ = ThreadUserState.objects.get_or_create(thread_id=thread_id, user=request.user)
+		obj, _ = get_or_create_thread_state(thread_id, request.user.id)
 		obj.client_label = label
 		obj.save(update_fields=["client_label", "updated_at"])
 		return Response(
@@ -1,6 +1,10 @@
 import json
 import logging
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qs
 
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -9,7 +13,17 @@ from django.utils import timezone
 from django.utils.html import strip_tags
 
 from apps.marketplace.models import ServiceRequest
-from .models import Thread, Message, MessageRead, ThreadUserState
+from . import services
+from .delivery import deliver_message
+from .presence import (
+    presence_connect,
+    presence_disconnect,
+    presence_heartbeat,
+    presence_refresh_seconds,
+    presence_snapshot,
+    typing_coalescer,
+)
+from .models import Thread, Message, ThreadUserState
 
 
 logger = logging.getLogger(__name__)
@@ -39,7 +53,7 @@ def get_or_create_thread(sr: ServiceRequest):
 
 
 @database_sync_to_async
-def create_message(thread: Thread, sender_id: int, body: str):
+def create_message(thread: Thread, sender, body: str):
     body = (body or "").strip()
     if not body:
         raise ValueError("empty_body")
@@ -47,55 +61,28 @@ def create_message(thread: Thread, sender_id: int, body: str):
         raise ValueError("too_long")
 
     # Blocked by peer?
-    t = (
-        Thread.objects.select_related(
-            "request",
-            "request__client",
-            "request__provider__user",
-            "participant_1",
-            "participant_2",
-        )
-        .filter(id=thread.id)
-        .first()
-    )
+    t = Thread.objects.select_related("request__provider").filter(id=thread.id).first()
+    participant_ids = []
     if t:
-        participant_ids = []
-        if t.is_direct:
-            participant_ids = [pid for pid in [t.participant_1_id, t.participant_2_id] if pid]
-        elif t.request_id and t.request:
-            participant_ids = [t.request.client_id]
-            if getattr(t.request, "provider_id", None) and getattr(t.request.provider, "user_id", None):
-                participant_ids.append(t.request.provider.user_id)
-
-        other_ids = [pid for pid in participant_ids if pid and pid != sender_id]
+        participant_ids = services.thread_participant_ids(t)
+        other_ids = [pid for pid in participant_ids if pid != sender.id]
         if other_ids and ThreadUserState.objects.filter(thread_id=t.id, user_id__in=other_ids, is_blocked=True).exists():
             raise ValueError("blocked")
 
-    msg = Message.objects.create(thread=thread, sender_id=sender_id, body=body)
-
-    # Unarchive for participants when a new message arrives
-    if t and participant_ids:
-        ThreadUserState.objects.filter(thread_id=t.id, user_id__in=participant_ids, is_archived=True).update(
-            is_archived=False,
-            archived_at=None,
-        )
-    return msg
+    # الحفظ والنشر لمجموعتي الخيط والطلب (ومنه لهذا الاتصال) عبر خدمة التسليم الموحدة
+    return deliver_message(
+        thread_id=thread.id,
+        sender=sender,
+        body=body,
+        request_id=thread.request_id,
+        participant_ids=participant_ids,
+    )
 
 
 @database_sync_to_async
 def mark_thread_read(thread: Thread, reader_id: int):
-    # اقرأ كل الرسائل غير المقروءة (عدا رسائل القارئ)
-    unread_ids = (
-        Message.objects.filter(thread=thread)
-        .exclude(sender_id=reader_id)
-        .exclude(reads__user_id=reader_id)
-        .values_list("id", flat=True)
-    )
-    now = timezone.now()
-    rows = [MessageRead(message_id=mid, user_id=reader_id, read_at=now) for mid in unread_ids]
-    if rows:
-        MessageRead.objects.bulk_create(rows, ignore_conflicts=True)
-    return list(unread_ids)
+    # اقرأ كل الرسائل غير المقروءة (عدا رسائل القارئ) بتحديث مؤشر القراءة
+    return services.mark_thread_read(thread.id, reader_id)
 
 
 class RequestChatConsumer(AsyncWebsocketConsumer):
@@ -147,7 +134,7 @@ class RequestChatConsumer(AsyncWebsocketConsumer):
             body = payload.get("body", "")
             try:
                 thread, _ = await get_or_create_thread(self.sr)
-                msg = await create_message(thread, user.id, body)
+                await create_message(thread, user, body)
             except ValueError as e:
                 code = str(e)
                 if code == "blocked":
@@ -158,17 +145,7 @@ class RequestChatConsumer(AsyncWebsocketConsumer):
             except Exception:
                 await self.send_json({"type": "error", "code": "server_error"})
                 return
-
-            event = {
-                "type": "message",
-                "id": msg.id,
-                "sender_id": user.id,
-                "body": msg.body,
-                "created_at": msg.created_at.isoformat(),
-            }
-            await self.channel_layer.group_send(
-                self.group_name, {"type": "broadcast", "event": event}
-            )
+            # البث يتم من deliver_message بعد الحفظ
             return
 
         # 2) typing
@@ -226,8 +203,17 @@ def _get_thread_with_request(thread_id: int):
     )
 
 
+@dataclass(frozen=True)
+class ThreadAccess:
+    """What ThreadConsumer needs per frame, resolved once on connect."""
+
+    thread_id: int
+    participant_ids: tuple[int, ...]
+    request_id: int | None = None
+
+
 @database_sync_to_async
-def _assert_thread_access(thread_id: int, user) -> Thread:
+def _assert_thread_access(thread_id: int, user) -> ThreadAccess:
     if not user or user.is_anonymous:
         raise PermissionDenied("anon")
 
@@ -245,18 +231,17 @@ def _assert_thread_access(thread_id: int, user) -> Thread:
     if not thread:
         raise PermissionDenied("not_found")
 
+    participant_ids = services.thread_participant_ids(thread)
+    access = ThreadAccess(
+        thread_id=thread.id,
+        participant_ids=tuple(participant_ids),
+        request_id=thread.request_id,
+    )
+
     if getattr(user, "is_staff", False):
-        return thread
+        return access
 
     # If the other participant blocked this thread, forbid WS access
-    participant_ids = []
-    if thread.is_direct:
-        participant_ids = [pid for pid in [thread.participant_1_id, thread.participant_2_id] if pid]
-    elif thread.request_id and thread.request:
-        participant_ids = [thread.request.client_id]
-        if getattr(thread.request, "provider_id", None) and getattr(thread.request.provider, "user_id", None):
-            participant_ids.append(thread.request.provider.user_id)
-
     other_ids = [pid for pid in participant_ids if pid and pid != user.id]
     if other_ids and ThreadUserState.objects.filter(thread_id=thread.id, user_id__in=other_ids, is_blocked=True).exists():
         raise PermissionDenied("blocked")
@@ -264,7 +249,7 @@ def _assert_thread_access(thread_id: int, user) -> Thread:
     # Direct thread: check participant_1 / participant_2
     if thread.is_direct:
         if user.id in (thread.participant_1_id, thread.participant_2_id):
-            return thread
+            return access
         raise PermissionDenied("not_participant")
 
     # Request-based thread
@@ -276,62 +261,33 @@ def _assert_thread_access(thread_id: int, user) -> Thread:
     if not (is_client or is_provider):
         raise PermissionDenied("not_participant")
 
-    return thread
+    return access
 
 
 @database_sync_to_async
-def _create_message_for_thread(thread_id: int, sender_id: int, body: str) -> Message:
-    body = (body or "").strip()
-    if not body:
-        raise ValueError("empty_body")
-    if len(body) > MAX_MESSAGE_LEN:
-        raise ValueError("too_long")
-
-    thread = Thread.objects.select_related(
-        "request",
-        "request__client",
-        "request__provider__user",
-        "participant_1",
-        "participant_2",
-    ).get(id=thread_id)
-
-    participant_ids = []
-    if thread.is_direct:
-        participant_ids = [pid for pid in [thread.participant_1_id, thread.participant_2_id] if pid]
-    elif thread.request_id and thread.request:
-        participant_ids = [thread.request.client_id]
-        if getattr(thread.request, "provider_id", None) and getattr(thread.request.provider, "user_id", None):
-            participant_ids.append(thread.request.provider.user_id)
-
-    other_ids = [pid for pid in participant_ids if pid and pid != sender_id]
-    if other_ids and ThreadUserState.objects.filter(thread_id=thread.id, user_id__in=other_ids, is_blocked=True).exists():
-        raise ValueError("blocked")
-
-    msg = Message.objects.create(thread=thread, sender_id=sender_id, body=body)
-
-    if participant_ids:
-        ThreadUserState.objects.filter(thread_id=thread.id, user_id__in=participant_ids, is_archived=True).update(
-            is_archived=False,
-            archived_at=None,
-        )
-
-    return msg
+def _insert_message(access: ThreadAccess, sender, body: str, client_id=None) -> Message:
+    # الصلاحية وحالة الحظر محفوظة في الاتصال (ThreadConsumer.access)؛ هنا الإدراج والنشر فقط
+    return deliver_message(
+        thread_id=access.thread_id,
+        sender=sender,
+        body=body,
+        request_id=access.request_id,
+        participant_ids=access.participant_ids,
+        client_id=client_id,
+    )
 
 
 @database_sync_to_async
 def _mark_thread_read_by_thread_id(thread_id: int, reader_id: int):
-    thread = Thread.objects.get(id=thread_id)
-    unread_ids = (
-        Message.objects.filter(thread=thread)
-        .exclude(sender_id=reader_id)
-        .exclude(reads__user_id=reader_id)
-        .values_list("id", flat=True)
-    )
-    now = timezone.now()
-    rows = [MessageRead(message_id=mid, user_id=reader_id, read_at=now) for mid in unread_ids]
-    if rows:
-        MessageRead.objects.bulk_create(rows, ignore_conflicts=True)
-    return list(unread_ids)
+    return services.mark_thread_read(thread_id, reader_id)
+
+
+# Redis / in-process presence: not DB work, keep it off the thread-sensitive DB executor
+_presence_connect = sync_to_async(presence_connect, thread_sensitive=False)
+_presence_disconnect = sync_to_async(presence_disconnect, thread_sensitive=False)
+_presence_heartbeat = sync_to_async(presence_heartbeat, thread_sensitive=False)
+_presence_snapshot = sync_to_async(presence_snapshot, thread_sensitive=False)
+_monotonic = time.monotonic
 
 
 class ThreadConsumer(AsyncJsonWebsocketConsumer):
@@ -341,7 +297,7 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
         self.group_name = f"thread_{self.thread_id}"
 
         try:
-            await _assert_thread_access(self.thread_id, self.user)
+            self.access = await _assert_thread_access(self.thread_id, self.user)
         except PermissionDenied as e:
             # Map common cases to codes
             if str(e) == "anon":
@@ -356,21 +312,67 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
             await self.close(code=1011)
             return
 
+        # blocked_by_other يتغير فقط عبر أحداث broadcast_blocked / broadcast_unblocked
+        self.blocked_by_other = False
+        # أحداث الحضور (presence) لمن طلبها فقط: ?presence=1
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        self.presence_events = (query.get("presence") or [""])[0] in {"1", "true"}
+
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        came_online = await _presence_connect(self.user.id, self.channel_name)
+        self.presence_refreshed_at = _monotonic()
 
         # Optional: confirm connected
-        await self.send_json({"type": "connected", "thread_id": self.thread_id})
+        await self.send_json(
+            {
+                "type": "connected",
+                "thread_id": self.thread_id,
+                "presence": await self._peer_presence(),
+            }
+        )
+        if came_online:
+            await self._broadcast_presence(online=True)
 
     async def disconnect(self, close_code):
         try:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
         except Exception:
             logger.exception("WS disconnect error")
+        if getattr(self, "access", None) is None:
+            return
+        try:
+            if await _presence_disconnect(self.user.id, self.channel_name):
+                await self._broadcast_presence(online=False)
+        except Exception:
+            logger.exception("WS presence disconnect error")
+
+    async def _peer_presence(self) -> dict:
+        peers = [pid for pid in self.access.participant_ids if pid != self.user.id]
+        return await _presence_snapshot(peers)
+
+    async def _broadcast_presence(self, *, online: bool):
+        await self.channel_layer.group_send(
+            self.group_name,
+            {
+                "type": "broadcast.presence",
+                "user_id": self.user.id,
+                "online": online,
+                "last_seen": None if online else timezone.now().isoformat(),
+            },
+        )
+
+    async def _refresh_presence(self, *, force: bool = False) -> None:
+        # كل إطار وارد يُبقي الاتصال حيًا، لا الـ ping وحده؛ بحد أقصى مرة كل ثلث المهلة
+        now = _monotonic()
+        if force or now - self.presence_refreshed_at >= presence_refresh_seconds():
+            self.presence_refreshed_at = now
+            await _presence_heartbeat(self.user.id, self.channel_name)
 
     async def receive_json(self, content, **kwargs):
         try:
             msg_type = content.get("type")
+            await self._refresh_presence(force=msg_type == "ping")
 
             if msg_type == "typing":
                 await self._handle_typing(content)
@@ -384,6 +386,14 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
                 await self._handle_message(content)
                 return
 
+            if msg_type == "ping":
+                await self.send_json({"type": "pong"})
+                return
+
+            if msg_type == "presence":
+                await self.send_json({"type": "presence", "presence": await self._peer_presence()})
+                return
+
             await self.send_json({"type": "error", "error": "نوع غير مدعوم"})
         except PermissionDenied:
             await self.send_json({"type": "error", "error": "غير مصرح"})
@@ -391,20 +401,20 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
             logger.exception("WS receive_json error")
             await self.send_json({"type": "error", "error": "حدث خطأ غير متوقع"})
 
+    def _check_access(self) -> None:
+        # بلا قاعدة بيانات: الصلاحية حُسبت عند الاتصال وتُحدَّث بأحداث الحظر
+        if getattr(self, "access", None) is None:
+            raise PermissionDenied("not_connected")
+        if self.blocked_by_other:
+            raise PermissionDenied("blocked")
+
     async def _handle_typing(self, content):
-        await _assert_thread_access(self.thread_id, self.user)
-        is_typing = bool(content.get("is_typing"))
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                "type": "broadcast.typing",
-                "user_id": self.user.id,
-                "is_typing": is_typing,
-            },
-        )
+        self._check_access()
+        # مُجمَّع لكل خيط: بث واحد كل 1/TYPING_BROADCASTS_PER_SECOND ثانية كحد أقصى
+        typing_coalescer.submit(self.channel_layer, self.group_name, self.user.id, bool(content.get("is_typing")))
 
     async def _handle_read(self, content):
-        await _assert_thread_access(self.thread_id, self.user)
+        self._check_access()
         marked_ids = await _mark_thread_read_by_thread_id(self.thread_id, self.user.id)
         await self.channel_layer.group_send(
             self.group_name,
@@ -418,7 +428,7 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
         )
 
     async def _handle_message(self, content):
-        await _assert_thread_access(self.thread_id, self.user)
+        self._check_access()
 
         text = (content.get("text") or "").strip()
         client_id = content.get("client_id")  # قد يكون None
@@ -431,53 +441,39 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
             return
 
         try:
-            msg = await _create_message_for_thread(self.thread_id, self.user.id, text)
-        except ValueError as e:
-            code = str(e)
-            if code == "empty_body":
-                await self.send_json({"type": "error", "error": "الرسالة فارغة"})
-            elif code == "too_long":
-                await self.send_json({"type": "error", "error": "الرسالة طويلة جدًا"})
-            elif code == "blocked":
-                await self.send_json({"type": "error", "code": "blocked", "error": "تم حظرك من الطرف الآخر"})
-            else:
-                await self.send_json({"type": "error", "error": "بيانات غير صالحة"})
-            return
+            # deliver_message ينشر الرسالة على مجموعة الخيط بعد الحفظ (ومنها تصل لهذا الاتصال أيضًا)
+            await _insert_message(self.access, self.user, text, client_id)
         except Exception:
             logger.exception("WS create_message error")
             await self.send_json({"type": "error", "error": "حدث خطأ غير متوقع"})
             return
 
-        get_full_name = getattr(self.user, "get_full_name", None)
-        if callable(get_full_name):
-            sender_name = get_full_name() or ""
-        else:
-            sender_name = ""
-        sender_name = sender_name or getattr(self.user, "phone", "") or str(self.user)
-
-        payload = {
-            "type": "broadcast.message",
-            "message": {
-                "id": msg.id,
-                "text": msg.body,
-                "sender_id": msg.sender_id,
-                "sender_name": sender_name,
-                "sent_at": msg.created_at.isoformat(),
-                "client_id": client_id,
-            },
-        }
-        await self.channel_layer.group_send(self.group_name, payload)
-
     async def broadcast_message(self, event):
         # event["message"] is a dict
         await self.send_json({"type": "message", **event["message"]})
 
     async def broadcast_typing(self, event):
+        changes = event.get("changes")
+        if changes is None:
+            changes = [{"user_id": event["user_id"], "is_typing": event["is_typing"]}]
+        for change in changes:
+            await self.send_json(
+                {
+                    "type": "typing",
+                    "user_id": change["user_id"],
+                    "is_typing": change["is_typing"],
+                }
+            )
+
+    async def broadcast_presence(self, event):
+        if not self.presence_events or event.get("user_id") == getattr(self.user, "id", None):
+            return
         await self.send_json(
             {
-                "type": "typing",
+                "type": "presence",
                 "user_id": event["user_id"],
-                "is_typing": event["is_typing"],
+                "online": event["online"],
+                "last_seen": event.get("last_seen"),
             }
         )
 
@@ -496,10 +492,16 @@ class ThreadConsumer(AsyncJsonWebsocketConsumer):
         blocked_by = event.get("blocked_by")
         # Close connections for the other participant immediately
         if blocked_by and self.user and getattr(self.user, "id", None) != blocked_by:
+            if not getattr(self.user, "is_staff", False):
+                # frames already queued before the close must not slip through
+                self.blocked_by_other = True
             await self.send_json({"type": "error", "code": "blocked", "error": "تم حظرك من الطرف الآخر"})
             await self.close(code=4403)
 
     async def broadcast_unblocked(self, event):
+        unblocked_by = event.get("unblocked_by")
+        if unblocked_by and self.user and getattr(self.user, "id", None) != unblocked_by:
+            self.blocked_by_other = False
         # Inform clients; they may choose to re-enable UI
         await self.send_json({"type": "unblocked"})
 
@@ -0,0 +1,160 @@
+"""
+One path for every new chat message: persist, then publish to WebSockets.
+
+REST sends, both consumers, the dashboard fallback POST and the extras
+portal broadcaster all go through deliver_message / publish_messages, so a
+message reaches open chat screens the same way whatever sent it:
+
+- ``thread_{id}``        → ThreadConsumer ("broadcast.message")
+- ``chat_request_{id}``  → RequestChatConsumer ("broadcast"), request threads only
+- ``user_{id}``          → MeConsumer inbox update for every participant
+
+Publishing runs on transaction commit (never for a rolled-back message) and
+is best-effort: a channel-layer outage does not fail the send, clients still
+see the message on their next history fetch.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notifications.realtime import push_inbox_messages, send_to_groups
+
+from .models import Message, ThreadUserState
+from .services import participant_modes
+
+
+logger = logging.getLogger(__name__)
+
+
+def thread_group_name(thread_id: int) -> str:
+	return f"thread_{thread_id}"
+
+
+def request_group_name(request_id: int) -> str:
+	return f"chat_request_{request_id}"
+
+
+def sender_display_name(user) -> str:
+	get_full_name = getattr(user, "get_full_name", None)
+	name = (get_full_name() or "") if callable(get_full_name) else ""
+	return name or getattr(user, "phone", "") or str(user)
+
+
+def _attachment_url(message: Message) -> str | None:
+	if not message.attachment:
+		return None
+	try:
+		return message.attachment.url
+	except Exception:
+		return None
+
+
+def message_event(message: Message, *, sender_name: str = "", client_id=None) -> dict:
+	"""The ThreadConsumer "message" payload (also returned by the dashboard POST fallback)."""
+	return {
+		"id": message.id,
+		"thread_id": message.thread_id,
+		"text": message.body,
+		"sender_id": message.sender_id,
+		"sender_name": sender_name,
+		"sent_at": message.created_at.isoformat(),
+		"client_id": client_id,
+		"attachment_url": _attachment_url(message),
+		"attachment_type": message.attachment_type,
+		"attachment_name": message.attachment_name,
+	}
+
+
+def _group_messages(messages, sender_name: str, client_id, request_ids: dict) -> list[tuple[str, dict]]:
+	groups = []
+	for message in messages:
+		event = message_event(message, sender_name=sender_name, client_id=client_id)
+		groups.append((thread_group_name(message.thread_id), {"type": "broadcast.message", "message": event}))
+		request_id = request_ids.get(message.thread_id)
+		if request_id:
+			groups.append(
+				(
+					request_group_name(request_id),
+					{
+						"type": "broadcast",
+						"event": {
+							"type": "message",
+							"id": message.id,
+							"sender_id": message.sender_id,
+							"body": message.body,
+							"created_at": event["sent_at"],
+							"attachment_url": event["attachment_url"],
+							"attachment_type": message.attachment_type,
+							"attachment_name": message.attachment_name,
+						},
+					},
+				)
+			)
+	return groups
+
+
+def publish_messages(
+	messages,
+	*,
+	sender=None,
+	client_id=None,
+	request_ids: dict[int, int] | None = None,
+	participants: dict[int, list[int]] | None = None,
+) -> None:
+	"""
+	Publish already-saved messages to their groups once the current transaction
+	commits. ``request_ids`` = {thread_id: request_id} for request threads;
+	``participants`` = {thread_id: [user_id, ...]} also updates those users'
+	inbox over ws/me/ (apps.notifications.realtime), tagged with the mode each
+	of them sees the thread in.
+	"""
+	messages = [m for m in messages if m.pk]
+	if not messages:
+		return
+	groups = _group_messages(messages, sender_display_name(sender) if sender else "", client_id, request_ids or {})
+	transaction.on_commit(lambda: send_to_groups(groups))
+	if participants:
+		push_inbox_messages(messages, participants, participant_modes(participants))
+
+
+def deliver_message(
+	*,
+	thread_id: int,
+	sender,
+	body: str,
+	request_id: int | None = None,
+	participant_ids=(),
+	attachment=None,
+	attachment_type: str = "",
+	attachment_name: str = "",
+	client_id=None,
+) -> Message:
+	"""
+	Create a message (access and block checks are the caller's job), unarchive
+	the thread for its participants and publish it after commit.
+	"""
+	with transaction.atomic():
+		message = Message.objects.create(
+			thread_id=thread_id,
+			sender=sender,
+			body=body,
+			attachment=attachment,
+			attachment_type=attachment_type or "",
+			attachment_name=attachment_name or "",
+			created_at=timezone.now(),
+		)
+		if participant_ids:
+			ThreadUserState.objects.filter(
+				thread_id=thread_id,
+				user_id__in=list(participant_ids),
+				is_archived=True,
+			).update(is_archived=False, archived_at=None)
+		publish_messages(
+			[message],
+			sender=sender,
+			client_id=client_id,
+			request_ids={thread_id: request_id} if request_id else None,
+			participants={thread_id: list(participant_ids)},
+		)
+	return message
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_message(apps, schema_editor):
+    Thread = apps.get_model("messaging", "Thread")
+    Message = apps.get_model("messaging", "Message")
+    latest = Message.objects.filter(thread_id=OuterRef("pk")).order_by("-id")
+    Thread.objects.update(
+        last_message_id=Subquery(latest.values("id")[:1]),
+        last_message_at=Coalesce(Subquery(latest.values("created_at")[:1]), F("created_at")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messaging", "0006_thread_context_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="thread",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="messaging.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="thread",
+            name="last_message_at",
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="thread",
+            index=models.Index(fields=["participant_1", "-last_message_at"], name="messaging_thread_p1_last_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="thread",
+            index=models.Index(fields=["participant_2", "-last_message_at"], name="messaging_thread_p2_last_idx"),
+        ),
+    ]
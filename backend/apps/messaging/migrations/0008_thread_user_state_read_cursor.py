@@ -0,0 +1,78 @@
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def backfill_read_cursors(apps, schema_editor):
+    Thread = apps.get_model("messaging", "Thread")
+    Message = apps.get_model("messaging", "Message")
+    MessageRead = apps.get_model("messaging", "MessageRead")
+    ThreadUserState = apps.get_model("messaging", "ThreadUserState")
+
+    watermarks = {
+        (row["message__thread_id"], row["user_id"]): row["last"]
+        for row in MessageRead.objects.values("message__thread_id", "user_id").annotate(last=Max("message_id"))
+    }
+
+    threads = Thread.objects.select_related("request", "request__provider").order_by("id")
+    for thread in threads.iterator(chunk_size=500):
+        if thread.is_direct:
+            participants = [pid for pid in (thread.participant_1_id, thread.participant_2_id) if pid]
+        elif thread.request_id:
+            participants = [thread.request.client_id]
+            if thread.request.provider_id:
+                participants.append(thread.request.provider.user_id)
+        else:
+            participants = []
+        if not participants:
+            continue
+
+        messages = list(Message.objects.filter(thread_id=thread.id).values_list("id", "sender_id"))
+        states = {s.user_id: s for s in ThreadUserState.objects.filter(thread_id=thread.id, user_id__in=participants)}
+        for user_id in set(participants):
+            watermark = watermarks.get((thread.id, user_id), 0) or 0
+            unread = sum(1 for mid, sender_id in messages if mid > watermark and sender_id != user_id)
+            state = states.get(user_id)
+            if state is None:
+                ThreadUserState.objects.create(
+                    thread_id=thread.id,
+                    user_id=user_id,
+                    last_read_message_id=watermark,
+                    unread_count=unread,
+                    created_at=timezone.now(),
+                )
+            else:
+                ThreadUserState.objects.filter(pk=state.pk).update(
+                    last_read_message_id=watermark,
+                    unread_count=unread,
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messaging", "0007_thread_last_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="threaduserstate",
+            name="last_read_message_id",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="threaduserstate",
+            name="last_read_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="threaduserstate",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="threaduserstate",
+            index=models.Index(fields=["user", "unread_count"], name="messaging_tus_user_unread_idx"),
+        ),
+        migrations.RunPython(backfill_read_cursors, migrations.RunPython.noop),
+    ]
@@ -31,9 +31,19 @@ class Thread(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Denormalized inbox pointer (maintained by messaging.signals on Message create/delete).
+    # last_message_at falls back to created_at so inbox ordering is total and index-backed.
+    last_message = models.ForeignKey(
+        "Message", on_delete=models.SET_NULL, related_name="+",
+        null=True, blank=True,
+    )
+    last_message_at = models.DateTimeField(default=timezone.now, db_index=True)
+
     class Meta:
         indexes = [
             models.Index(fields=["participant_1", "participant_2"]),
+            models.Index(fields=["participant_1", "-last_message_at"], name="messaging_thread_p1_last_idx"),
+            models.Index(fields=["participant_2", "-last_message_at"], name="messaging_thread_p2_last_idx"),
         ]
 
     def __str__(self):
@@ -65,12 +75,38 @@ class Message(models.Model):
 
     class Meta:
         ordering = ("id",)
+        indexes = [
+            # Keyset history (before_id / after_id / sync) walks this index.
+            models.Index(fields=["thread", "id"], name="messaging_msg_thread_id_idx"),
+        ]
 
     def __str__(self):
         return f"Msg #{self.id} by {self.sender_id}"
 
 
+class MessageTombstone(models.Model):
+    """A deleted message id, so incremental sync can tell clients to drop it."""
+
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name="message_tombstones")
+    message_id = models.BigIntegerField()
+    deleted_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        related_name="+", null=True, blank=True,
+    )
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["thread", "id"], name="messaging_tombstone_thread_idx"),
+        ]
+
+    def __str__(self):
+        return f"Deleted msg #{self.message_id} in thread #{self.thread_id}"
+
+
 class MessageRead(models.Model):
+    # Legacy per-message receipts. Read state now lives on ThreadUserState
+    # (last_read_message_id / unread_count); kept for historical rows.
     message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name="reads")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="message_reads")
     read_at = models.DateTimeField(default=timezone.now)
@@ -123,6 +159,12 @@ class ThreadUserState(models.Model):
     blocked_at = models.DateTimeField(null=True, blank=True)
     archived_at = models.DateTimeField(null=True, blank=True)
 
+    # Read cursor: every message with id <= last_read_message_id is read by this user.
+    # unread_count is maintained atomically by messaging.services on create/read/delete.
+    last_read_message_id = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -132,6 +174,7 @@ class ThreadUserState(models.Model):
             models.Index(fields=["user", "is_favorite"], name="messaging_t_user_id_439020_idx"),
             models.Index(fields=["user", "is_archived"], name="messaging_t_user_id_a56866_idx"),
             models.Index(fields=["user", "is_blocked"], name="messaging_t_user_id_b28302_idx"),
+            models.Index(fields=["user", "unread_count"], name="messaging_tus_user_unread_idx"),
         ]
 
     def __str__(self) -> str:
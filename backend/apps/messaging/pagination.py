@@ -1,6 +1,88 @@
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
-class MessagePagination(LimitOffsetPagination):
+class MessageOffsetPagination(LimitOffsetPagination):
     default_limit = 30
     max_limit = 100
+
+
+class MessagePagination(BasePagination):
+    """
+    Keyset pagination for thread history on the (thread_id, id) index.
+
+    - default / ``before_id=N``: newest first, messages older than N
+    - ``after_id=N``: oldest first, messages newer than N (catch-up)
+
+    ``next`` links the following page in the same direction. Requests that
+    still send ``offset`` get the old limit/offset response.
+    """
+
+    default_limit = 30
+    max_limit = 100
+
+    def _int_param(self, request, name):
+        raw = request.query_params.get(name)
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            return None
+        return value if value >= 0 else None
+
+    def get_limit(self, request) -> int:
+        limit = self._int_param(request, "limit")
+        if not limit:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.offset_paginator = None
+        if "offset" in request.query_params:
+            self.offset_paginator = MessageOffsetPagination()
+            return self.offset_paginator.paginate_queryset(queryset, request, view)
+
+        limit = self.get_limit(request)
+        after_id = self._int_param(request, "after_id")
+        before_id = self._int_param(request, "before_id")
+        if after_id is not None:
+            self.cursor_param = "after_id"
+            queryset = queryset.filter(id__gt=after_id).order_by("id")
+        else:
+            self.cursor_param = "before_id"
+            if before_id is not None:
+                queryset = queryset.filter(id__lt=before_id)
+            queryset = queryset.order_by("-id")
+
+        rows = list(queryset[: limit + 1])
+        self.has_more = len(rows) > limit
+        self.page = rows[:limit]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_more or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "after_id" if self.cursor_param == "before_id" else "before_id")
+        return replace_query_param(url, self.cursor_param, self.page[-1].id)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "has_more": self.has_more,
+                "results": data,
+            }
+        )
+
+
+class InboxCursorPagination(CursorPagination):
+    """Keyset pagination for the inbox over the denormalized Thread.last_message_at."""
+
+    page_size = 30
+    page_size_query_param = "limit"
+    max_page_size = 100
+    ordering = ("-last_message_at", "-id")
@@ -0,0 +1,305 @@
+"""
+Presence and typing for the realtime consumers.
+
+Presence
+    Every open socket (ThreadConsumer, MeConsumer) registers its channel name
+    under its user with an expiry that pings and, on thread sockets, any
+    inbound frame extend (at most every presence_refresh_seconds()), so a
+    user is online while at least one unexpired connection exists, and a
+    crashed worker's sockets simply age out. Going offline stores a last-seen
+    timestamp. Backed by Redis (settings.PRESENCE_REDIS_URL, defaults to
+    REDIS_URL) with atomic Lua scripts; without Redis, or when it is
+    unreachable, an in-process store with the same semantics is used
+    (per-process presence only).
+
+Typing
+    TypingCoalescer collects typing frames per thread group and sends at most
+    TYPING_BROADCASTS_PER_SECOND group messages per thread and process, each
+    carrying every change since the previous one. Repeated "still typing"
+    frames are dropped until TYPING_REFRESH_SECONDS have passed.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_PREFIX = "presence:"
+
+
+def _connection_ttl() -> int:
+    return max(10, int(getattr(settings, "PRESENCE_CONNECTION_TTL_SECONDS", 90)))
+
+
+def presence_refresh_seconds() -> float:
+    """How often a live socket should extend its expiry: a third of the TTL, so one missed refresh is harmless."""
+    return _connection_ttl() / 3
+
+
+def _last_seen_ttl() -> int:
+    return int(getattr(settings, "PRESENCE_LAST_SEEN_TTL_SECONDS", 30 * 86400))
+
+
+# KEYS[1] = connections zset, ARGV = now, member, expires_at → live connection count
+_REDIS_CONNECT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[2])
+redis.call('PEXPIREAT', KEYS[1], math.floor(tonumber(ARGV[3]) * 1000))
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# KEYS[1] = connections zset, KEYS[2] = last-seen key, ARGV = now, member, last-seen ttl
+_REDIS_DISCONNECT_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local left = redis.call('ZCARD', KEYS[1])
+if left == 0 then
+  redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[3])
+end
+return left
+"""
+
+
+class MemoryPresenceStore:
+    def __init__(self):
+        self._connections: dict[int, dict[str, float]] = {}
+        self._last_seen: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, user_id: int, now: float) -> dict[str, float]:
+        conns = self._connections.get(user_id, {})
+        for conn_id in [c for c, expires_at in conns.items() if expires_at <= now]:
+            del conns[conn_id]
+        if not conns:
+            if user_id in self._connections:
+                # انتهت كل الاتصالات بلا disconnect (عملية توقفت): آخر ظهور = لحظة اكتشاف ذلك
+                self._last_seen[user_id] = now
+            self._connections.pop(user_id, None)
+        return conns
+
+    def connect(self, user_id: int, conn_id: str, now: float, ttl: int) -> int:
+        with self._lock:
+            conns = self._live(user_id, now)
+            conns[conn_id] = now + ttl
+            self._connections[user_id] = conns
+            return len(conns)
+
+    def disconnect(self, user_id: int, conn_id: str, now: float) -> int:
+        with self._lock:
+            conns = self._live(user_id, now)
+            conns.pop(conn_id, None)
+            if not conns:
+                self._connections.pop(user_id, None)
+                self._last_seen[user_id] = now
+            return len(conns)
+
+    def snapshot(self, user_ids: list[int], now: float) -> dict[int, tuple[bool, float | None]]:
+        with self._lock:
+            return {uid: (bool(self._live(uid, now)), self._last_seen.get(uid)) for uid in user_ids}
+
+
+class RedisPresenceStore:
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._connect = self._client.register_script(_REDIS_CONNECT_SCRIPT)
+        self._disconnect = self._client.register_script(_REDIS_DISCONNECT_SCRIPT)
+
+    @staticmethod
+    def _conns_key(user_id: int) -> str:
+        return f"{PRESENCE_PREFIX}conns:{int(user_id)}"
+
+    @staticmethod
+    def _seen_key(user_id: int) -> str:
+        return f"{PRESENCE_PREFIX}seen:{int(user_id)}"
+
+    def connect(self, user_id: int, conn_id: str, now: float, ttl: int) -> int:
+        return int(self._connect(keys=[self._conns_key(user_id)], args=[now, conn_id, now + ttl]))
+
+    def disconnect(self, user_id: int, conn_id: str, now: float) -> int:
+        return int(
+            self._disconnect(
+                keys=[self._conns_key(user_id), self._seen_key(user_id)],
+                args=[now, conn_id, _last_seen_ttl()],
+            )
+        )
+
+    def snapshot(self, user_ids: list[int], now: float) -> dict[int, tuple[bool, float | None]]:
+        pipe = self._client.pipeline(transaction=False)
+        for uid in user_ids:
+            pipe.zcount(self._conns_key(uid), f"({now}", "+inf")
+        pipe.mget([self._seen_key(uid) for uid in user_ids])
+        results = pipe.execute()
+        seen = results[-1]
+        return {
+            uid: (bool(results[i]), float(seen[i]) if seen[i] is not None else None)
+            for i, uid in enumerate(user_ids)
+        }
+
+
+_memory_store = MemoryPresenceStore()
+_redis_store: RedisPresenceStore | None = None
+_redis_url: str | None = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis_store() -> RedisPresenceStore | None:
+    global _redis_store, _redis_url
+    url = (getattr(settings, "PRESENCE_REDIS_URL", "") or "").strip()
+    if not url:
+        return None
+    if _redis_store is None or _redis_url != url:
+        with _redis_lock:
+            if _redis_store is None or _redis_url != url:
+                try:
+                    _redis_store = RedisPresenceStore(url)
+                    _redis_url = url
+                except Exception:
+                    logger.warning("presence: redis unavailable, using in-process presence", exc_info=True)
+                    return None
+    return _redis_store
+
+
+def _call(method: str, *args):
+    store = _get_redis_store()
+    if store is not None:
+        try:
+            return getattr(store, method)(*args)
+        except Exception:
+            logger.warning("presence: redis error, using in-process presence", exc_info=True)
+    return getattr(_memory_store, method)(*args)
+
+
+def presence_connect(user_id: int, conn_id: str) -> bool:
+    """Register (or refresh, on ping) a socket of the user. Returns True when the user just came online."""
+    return _call("connect", int(user_id), conn_id, time.time(), _connection_ttl()) == 1
+
+
+def presence_heartbeat(user_id: int, conn_id: str) -> None:
+    """Extend a socket's expiry (pings / inbound frames)."""
+    _call("connect", int(user_id), conn_id, time.time(), _connection_ttl())
+
+
+def presence_disconnect(user_id: int, conn_id: str) -> bool:
+    """Drop a socket of the user. Returns True when it was the user's last one (now offline)."""
+    return _call("disconnect", int(user_id), conn_id, time.time()) == 0
+
+
+def _iso(ts: float | None) -> str | None:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def presence_snapshot(user_ids) -> dict[int, dict]:
+    """{user_id: {"online": bool, "last_seen": iso | None}}."""
+    ids = [int(uid) for uid in dict.fromkeys(user_ids) if uid]
+    if not ids:
+        return {}
+    states = _call("snapshot", ids, time.time())
+    return {uid: {"online": online, "last_seen": None if online else _iso(seen)} for uid, (online, seen) in states.items()}
+
+
+def reset_presence() -> None:
+    """Clear the in-process store and typing state (tests)."""
+    global _memory_store
+    _memory_store = MemoryPresenceStore()
+    typing_coalescer.reset()
+
+
+class TypingCoalescer:
+    """Per-process typing aggregation; one instance is shared by every ThreadConsumer."""
+
+    _SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending: dict[str, dict[int, bool]] = {}
+        self._sent: dict[str, dict[int, float]] = {}
+        self._last_flush: dict[str, float] = {}
+        self._scheduled: set[str] = set()
+        self._calls = 0
+
+    def _sweep(self, now: float) -> None:
+        # خيوط لم يعد فيها أحد يكتب لا يجب أن تبقى في الذاكرة
+        stale_before = now - max(60.0, self._refresh_seconds())
+        for group in list(self._sent):
+            sent = {uid: at for uid, at in self._sent[group].items() if at > stale_before}
+            if sent:
+                self._sent[group] = sent
+            else:
+                del self._sent[group]
+        for group in [g for g, at in self._last_flush.items() if at <= stale_before and g not in self._scheduled]:
+            del self._last_flush[group]
+
+    @staticmethod
+    def _interval() -> float:
+        return 1.0 / max(1, int(getattr(settings, "TYPING_BROADCASTS_PER_SECOND", 4)))
+
+    @staticmethod
+    def _refresh_seconds() -> float:
+        return float(getattr(settings, "TYPING_REFRESH_SECONDS", 3))
+
+    def submit(self, channel_layer, group: str, user_id: int, is_typing: bool) -> None:
+        now = time.monotonic()
+        self._calls += 1
+        if self._calls % self._SWEEP_EVERY == 0:
+            self._sweep(now)
+        sent = self._sent.setdefault(group, {})
+        pending = self._pending.setdefault(group, {})
+        sent_at = sent.get(user_id)
+        if user_id not in pending:
+            if is_typing and sent_at is not None and now - sent_at < self._refresh_seconds():
+                return
+            if not is_typing and sent_at is None:
+                return
+        pending[user_id] = is_typing
+
+        if group in self._scheduled:
+            return
+        self._scheduled.add(group)
+        delay = max(0.0, self._last_flush.get(group, 0.0) + self._interval() - now)
+        asyncio.get_running_loop().create_task(self._flush_later(channel_layer, group, delay))
+
+    async def _flush_later(self, channel_layer, group: str, delay: float) -> None:
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            self._scheduled.discard(group)
+        changes = self._pending.pop(group, {})
+        if not changes:
+            return
+        now = time.monotonic()
+        self._last_flush[group] = now
+        sent = self._sent.setdefault(group, {})
+        for user_id, is_typing in changes.items():
+            if is_typing:
+                sent[user_id] = now
+            else:
+                sent.pop(user_id, None)
+        if not sent:
+            self._sent.pop(group, None)
+        try:
+            await channel_layer.group_send(
+                group,
+                {
+                    "type": "broadcast.typing",
+                    "changes": [{"user_id": uid, "is_typing": typing} for uid, typing in changes.items()],
+                },
+            )
+        except Exception:
+            logger.warning("typing broadcast to %s failed", group, exc_info=True)
+
+
+typing_coalescer = TypingCoalescer()
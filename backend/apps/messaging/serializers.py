@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from .models import Message, Thread, ThreadUserState
+from .services import read_watermarks
 
 
 class ThreadSerializer(serializers.ModelSerializer):
@@ -64,10 +65,12 @@ class MessageListSerializer(serializers.ModelSerializer):
         )
 
     def get_read_by_ids(self, obj):
-        try:
-            return list(obj.reads.values_list("user_id", flat=True))
-        except Exception:
-            return []
+        # Derived from per-user read watermarks; views pass them in context
+        # ("read_watermarks") so a page costs one query instead of one per message.
+        watermarks = self.context.get("read_watermarks")
+        if watermarks is None:
+            watermarks = read_watermarks(obj.thread_id)
+        return [uid for uid, last_read in watermarks.items() if uid != obj.sender_id and last_read >= obj.id]
 
 
 class ThreadUserStateSerializer(serializers.ModelSerializer):
@@ -82,5 +85,7 @@ class ThreadUserStateSerializer(serializers.ModelSerializer):
             "is_blocked",
             "blocked_at",
             "archived_at",
+            "unread_count",
+            "last_read_message_id",
         )
         read_only_fields = fields
@@ -0,0 +1,262 @@
+"""
+Per-(thread, user) read state for the messaging app.
+
+Each participant has a ThreadUserState row holding a read watermark
+(last_read_message_id) and a denormalized unread_count. Reading a thread is a
+single watermark update instead of one MessageRead row per message, and every
+unread badge is served from these counters.
+"""
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from apps.notifications.realtime import push_inbox_unread
+
+from .models import Message, MessageTombstone, Thread, ThreadUserState
+
+
+def thread_participant_ids(thread: Thread) -> list[int]:
+	"""Participant user ids for direct and request threads (request.provider must be loadable)."""
+	if thread.is_direct:
+		return [pid for pid in (thread.participant_1_id, thread.participant_2_id) if pid]
+	if thread.request_id and thread.request:
+		ids = [thread.request.client_id]
+		provider = getattr(thread.request, "provider", None) if thread.request.provider_id else None
+		if provider is not None and provider.user_id:
+			ids.append(provider.user_id)
+		return [pid for pid in ids if pid]
+	return []
+
+
+def participant_modes(thread_ids) -> dict[int, dict[int, str]]:
+	"""
+	{thread_id: {user_id: mode}}: the account mode each participant sees the
+	thread in (same rule as thread_mode_q), used to tag ws/me/ inbox events.
+	"""
+	modes: dict[int, dict[int, str]] = {}
+	rows = Thread.objects.filter(id__in=list(thread_ids)).values_list(
+		"id",
+		"is_direct",
+		"context_mode",
+		"participant_1_id",
+		"participant_2_id",
+		"request__client_id",
+		"request__provider__user_id",
+	)
+	for thread_id, is_direct, context_mode, p1, p2, client_id, provider_user_id in rows:
+		if is_direct:
+			pairs = ((p1, context_mode), (p2, context_mode))
+		else:
+			pairs = ((client_id, Thread.ContextMode.CLIENT), (provider_user_id, Thread.ContextMode.PROVIDER))
+		modes[thread_id] = {uid: str(mode) for uid, mode in pairs if uid}
+	return modes
+
+
+def _push_unread(user_id: int, thread_id: int, *, previous: int, current: int) -> None:
+	if previous == current:
+		return
+	mode = participant_modes([thread_id]).get(thread_id, {}).get(user_id, Thread.ContextMode.SHARED)
+	push_inbox_unread(user_id, thread_id, previous=previous, current=current, mode=str(mode))
+
+
+def _unread_after(thread_id: int, user_id: int, watermark: int) -> int:
+	return (
+		Message.objects.filter(thread_id=thread_id, id__gt=watermark or 0)
+		.exclude(sender_id=user_id)
+		.count()
+	)
+
+
+def get_or_create_thread_state(thread_id: int, user_id: int):
+	"""
+	Like ThreadUserState.objects.get_or_create, but a freshly created row starts
+	with the correct unread_count instead of 0.
+	"""
+	state = ThreadUserState.objects.filter(thread_id=thread_id, user_id=user_id).first()
+	if state is not None:
+		return state, False
+	return ThreadUserState.objects.get_or_create(
+		thread_id=thread_id,
+		user_id=user_id,
+		defaults={"unread_count": _unread_after(thread_id, user_id, 0)},
+	)
+
+
+def record_message_created(message: Message) -> None:
+	"""Bump unread counters of every participant except the sender (called on Message create)."""
+	thread = (
+		Thread.objects.select_related("request", "request__provider")
+		.filter(id=message.thread_id)
+		.first()
+	)
+	if thread is None:
+		return
+	others = [pid for pid in thread_participant_ids(thread) if pid != message.sender_id]
+	if not others:
+		return
+
+	updated = ThreadUserState.objects.filter(thread_id=thread.id, user_id__in=others).update(
+		unread_count=F("unread_count") + 1,
+	)
+	if updated < len(others):
+		existing = set(
+			ThreadUserState.objects.filter(thread_id=thread.id, user_id__in=others).values_list("user_id", flat=True)
+		)
+		for uid in others:
+			if uid not in existing:
+				get_or_create_thread_state(thread.id, uid)
+
+
+def record_message_deleted(message: Message) -> None:
+	"""Undo the unread bump for participants that had not read the deleted message yet."""
+	with transaction.atomic():
+		states = list(
+			ThreadUserState.objects.select_for_update()
+			.filter(thread_id=message.thread_id, last_read_message_id__lt=message.id, unread_count__gt=0)
+			.exclude(user_id=message.sender_id)
+			.values_list("id", "user_id", "unread_count")
+		)
+		if not states:
+			return
+		ThreadUserState.objects.filter(id__in=[pk for pk, _, _ in states]).update(unread_count=F("unread_count") - 1)
+		modes = participant_modes([message.thread_id]).get(message.thread_id, {})
+		for _, user_id, unread in states:
+			push_inbox_unread(
+				user_id,
+				message.thread_id,
+				previous=unread,
+				current=unread - 1,
+				mode=str(modes.get(user_id, Thread.ContextMode.SHARED)),
+			)
+
+
+def mark_thread_read(thread_id: int, user_id: int) -> list[int]:
+	"""
+	Move the reader's watermark to the latest message and zero the counter.
+	Returns the ids of peer messages that became read (for API/WS payloads).
+	"""
+	with transaction.atomic():
+		state, _ = get_or_create_thread_state(thread_id, user_id)
+		state = ThreadUserState.objects.select_for_update().get(pk=state.pk)
+
+		latest_id = (
+			Message.objects.filter(thread_id=thread_id).order_by("-id").values_list("id", flat=True).first()
+		) or 0
+		newly_read = list(
+			Message.objects.filter(
+				thread_id=thread_id,
+				id__gt=state.last_read_message_id,
+				id__lte=latest_id,
+			)
+			.exclude(sender_id=user_id)
+			.order_by("id")
+			.values_list("id", flat=True)
+		)
+
+		previous_unread = state.unread_count
+		state.last_read_message_id = max(state.last_read_message_id, latest_id)
+		state.last_read_at = timezone.now()
+		state.unread_count = 0
+		state.save(update_fields=["last_read_message_id", "last_read_at", "unread_count", "updated_at"])
+		_push_unread(user_id, thread_id, previous=previous_unread, current=0)
+	return newly_read
+
+
+def mark_thread_unread(thread_id: int, user_id: int):
+	"""
+	Move the watermark back just before the last peer message so it shows as unread.
+	Returns (that message, whether it was read before), or (None, False) when
+	the peer never wrote in this thread.
+	"""
+	last_peer_message = (
+		Message.objects.filter(thread_id=thread_id)
+		.exclude(sender_id=user_id)
+		.order_by("-id")
+		.first()
+	)
+	if last_peer_message is None:
+		return None, False
+
+	with transaction.atomic():
+		state, _ = get_or_create_thread_state(thread_id, user_id)
+		state = ThreadUserState.objects.select_for_update().get(pk=state.pk)
+		previous_unread = state.unread_count
+		was_read = state.last_read_message_id >= last_peer_message.id
+		if was_read:
+			state.last_read_message_id = last_peer_message.id - 1
+		state.unread_count = _unread_after(thread_id, user_id, state.last_read_message_id)
+		state.save(update_fields=["last_read_message_id", "unread_count", "updated_at"])
+		_push_unread(user_id, thread_id, previous=previous_unread, current=state.unread_count)
+	return last_peer_message, was_read
+
+
+def read_watermarks(thread_id: int) -> dict[int, int]:
+	"""{user_id: last_read_message_id} for every participant state of a thread."""
+	return dict(
+		ThreadUserState.objects.filter(thread_id=thread_id).values_list("user_id", "last_read_message_id")
+	)
+
+
+def record_message_tombstone(message: Message, deleted_by_id: int | None = None) -> None:
+	"""Remember a deleted message id for incremental sync (message_changes)."""
+	MessageTombstone.objects.create(
+		thread_id=message.thread_id,
+		message_id=message.id,
+		deleted_by_id=deleted_by_id,
+	)
+
+
+def message_changes(thread_id: int, *, since_id: int, since_deleted_id: int = 0, limit: int = 100) -> dict:
+	"""
+	Everything a client holding messages up to ``since_id`` (and tombstones up
+	to ``since_deleted_id``) is missing: newer messages (oldest first, at most
+	``limit``), ids deleted since, and the participants' read watermarks.
+	"""
+	rows = list(
+		Message.objects.select_related("sender")
+		.filter(thread_id=thread_id, id__gt=since_id)
+		.order_by("id")[: limit + 1]
+	)
+	has_more = len(rows) > limit
+	rows = rows[:limit]
+	tombstones = list(
+		MessageTombstone.objects.filter(thread_id=thread_id, id__gt=since_deleted_id, message_id__lte=since_id)
+		.order_by("id")
+		.values_list("id", "message_id")
+	)
+	return {
+		"messages": rows,
+		"has_more": has_more,
+		"deleted_ids": [message_id for _, message_id in tombstones],
+		"since_id": rows[-1].id if rows else since_id,
+		"since_deleted_id": tombstones[-1][0] if tombstones else since_deleted_id,
+		"read_watermarks": read_watermarks(thread_id),
+	}
+
+
+def thread_mode_q(user, mode: str) -> Q:
+	"""Threads visible to ``user`` in the given account mode (client / provider / shared)."""
+	if mode in {"client", "provider"}:
+		q = (
+			(Q(is_direct=True, participant_1=user) | Q(is_direct=True, participant_2=user))
+			& Q(context_mode=mode)
+		)
+		if mode == "client":
+			q |= Q(request__client=user)
+		else:
+			q |= Q(request__provider__user=user)
+		return q
+	return (
+		Q(is_direct=True, participant_1=user)
+		| Q(is_direct=True, participant_2=user)
+		| Q(request__client=user)
+		| Q(request__provider__user=user)
+	)
+
+
+def total_unread_count(user, mode: str = "shared") -> int:
+	"""Sum of the user's unread counters across the threads visible in ``mode``."""
+	qs = ThreadUserState.objects.filter(user=user, unread_count__gt=0)
+	if mode in {"client", "provider"}:
+		qs = qs.filter(thread__in=Thread.objects.filter(thread_mode_q(user, mode)))
+	return int(qs.aggregate(total=Sum("unread_count"))["total"] or 0)
@@ -0,0 +1,35 @@
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Message, Thread
+from .services import record_message_created, record_message_deleted
+
+
+def refresh_thread_last_message(thread_id: int) -> None:
+    """Recompute the denormalized last-message pointer from the remaining messages."""
+    latest = Message.objects.filter(thread_id=OuterRef("pk")).order_by("-id")
+    Thread.objects.filter(pk=thread_id).update(
+        last_message_id=Subquery(latest.values("id")[:1]),
+        last_message_at=Coalesce(Subquery(latest.values("created_at")[:1]), F("created_at")),
+    )
+
+
+@receiver(post_save, sender=Message)
+def on_message_created(sender, instance: Message, created, **kwargs):
+    if not created:
+        return
+    # Last-message pointer only moves forward: a slower concurrent insert must not overwrite a newer pointer.
+    Thread.objects.filter(pk=instance.thread_id).filter(
+        Q(last_message_id__isnull=True) | Q(last_message_id__lt=instance.id)
+    ).update(last_message_id=instance.id, last_message_at=instance.created_at)
+    record_message_created(instance)
+
+
+@receiver(post_delete, sender=Message)
+def on_message_deleted(sender, instance: Message, **kwargs):
+    record_message_deleted(instance)
+    # on_delete=SET_NULL already cleared the pointer if this was the last message.
+    if Thread.objects.filter(pk=instance.thread_id, last_message_id__isnull=True).exists():
+        refresh_thread_last_message(instance.thread_id)
@@ -613,3 +613,175 @@ def test_mode_filters_direct_threads_and_thread_states_for_same_user():
     # Sanity: states exist in DB for both threads
     assert ThreadUserState.objects.filter(user=dual_user, thread_id=provider_thread_id).exists()
     assert ThreadUserState.objects.filter(user=dual_user, thread_id=client_thread_id).exists()
+
+
+@pytest.mark.django_db
+def test_direct_threads_inbox_is_constant_queries_and_cursor_paginated(django_assert_max_num_queries):
+    from apps.messaging.models import Message, Thread
+
+    me = User.objects.create_user(phone="0501000301", role_state=UserRole.PHONE_ONLY)
+    thread_ids = []
+    for i in range(5):
+        peer = User.objects.create_user(phone=f"05010004{i:02d}", role_state=UserRole.PROVIDER)
+        ProviderProfile.objects.create(
+            user=peer,
+            provider_type="individual",
+            display_name=f"مزود {i}",
+            bio="bio",
+            years_experience=1,
+            city="الرياض",
+        )
+        t = Thread.objects.create(is_direct=True, participant_1=me, participant_2=peer)
+        Message.objects.create(thread=t, sender=peer, body=f"أهلا {i}")
+        Message.objects.create(thread=t, sender=peer, body=f"آخر رسالة {i}")
+        thread_ids.append(t.id)
+
+    api = APIClient()
+    api.force_authenticate(user=me)
+
+    with django_assert_max_num_queries(6):
+        r = api.get("/api/messaging/direct/threads/")
+    assert r.status_code == 200
+    assert [row["thread_id"] for row in r.data] == list(reversed(thread_ids))
+    newest = r.data[0]
+    assert newest["last_message"] == "آخر رسالة 4"
+    assert newest["unread_count"] == 2
+    assert newest["peer_name"] == "مزود 4"
+
+    page1 = api.get("/api/messaging/direct/threads/", {"limit": 2})
+    assert page1.status_code == 200
+    assert [row["thread_id"] for row in page1.data["results"]] == [thread_ids[4], thread_ids[3]]
+    assert page1.data["next"]
+
+    page2 = api.get(page1.data["next"])
+    assert [row["thread_id"] for row in page2.data["results"]] == [thread_ids[2], thread_ids[1]]
+
+
+@pytest.mark.django_db
+def test_thread_last_message_pointer_follows_deletes():
+    from apps.messaging.models import Message, Thread
+
+    a = User.objects.create_user(phone="0501000311", role_state=UserRole.PHONE_ONLY)
+    b = User.objects.create_user(phone="0501000312", role_state=UserRole.PHONE_ONLY)
+    t = Thread.objects.create(is_direct=True, participant_1=a, participant_2=b)
+    m1 = Message.objects.create(thread=t, sender=a, body="1")
+    m2 = Message.objects.create(thread=t, sender=b, body="2")
+
+    t.refresh_from_db()
+    assert t.last_message_id == m2.id
+    assert t.last_message_at == m2.created_at
+
+    m2.delete()
+    t.refresh_from_db()
+    assert t.last_message_id == m1.id
+
+    m1.delete()
+    t.refresh_from_db()
+    assert t.last_message_id is None
+    assert t.last_message_at == t.created_at
+
+
+@pytest.mark.django_db
+def test_read_cursor_counters_and_total_unread_endpoint():
+    from apps.messaging.models import Message, MessageRead, Thread
+
+    a = User.objects.create_user(phone="0501000321", role_state=UserRole.PHONE_ONLY)
+    b = User.objects.create_user(phone="0501000322", role_state=UserRole.PHONE_ONLY)
+    c = User.objects.create_user(phone="0501000323", role_state=UserRole.PHONE_ONLY)
+    t1 = Thread.objects.create(is_direct=True, participant_1=a, participant_2=b)
+    t2 = Thread.objects.create(is_direct=True, participant_1=a, participant_2=c)
+    m1 = Message.objects.create(thread=t1, sender=b, body="1")
+    m2 = Message.objects.create(thread=t1, sender=b, body="2")
+    Message.objects.create(thread=t1, sender=a, body="mine")
+    Message.objects.create(thread=t2, sender=c, body="3")
+
+    assert ThreadUserState.objects.get(thread=t1, user=a).unread_count == 2
+    assert ThreadUserState.objects.get(thread=t1, user=b).unread_count == 1
+
+    api = APIClient()
+    api.force_authenticate(user=a)
+    r = api.get("/api/messaging/threads/unread-count/")
+    assert r.status_code == 200
+    assert r.data["unread_count"] == 3
+
+    r_read = api.post(f"/api/messaging/direct/thread/{t1.id}/messages/read/", {}, format="json")
+    assert r_read.status_code == 200
+    assert r_read.data["message_ids"] == [m1.id, m2.id]
+    assert not MessageRead.objects.exists()
+
+    state = ThreadUserState.objects.get(thread=t1, user=a)
+    assert state.unread_count == 0
+    assert state.last_read_message_id >= m2.id
+    assert api.get("/api/messaging/threads/unread-count/").data["unread_count"] == 1
+
+    msgs = api.get(f"/api/messaging/direct/thread/{t1.id}/messages/")
+    by_id = {row["id"]: row for row in msgs.data["results"]}
+    assert by_id[m2.id]["read_by_ids"] == [a.id]
+
+    r_unread = api.post(f"/api/messaging/thread/{t1.id}/unread/", {}, format="json")
+    assert r_unread.status_code == 200
+    assert r_unread.data["message_id"] == m2.id
+    assert r_unread.data["deleted"] == 1
+    assert ThreadUserState.objects.get(thread=t1, user=a).unread_count == 1
+    assert api.post(f"/api/messaging/thread/{t1.id}/unread/", {}, format="json").data["deleted"] == 0
+
+    m2.delete()
+    assert ThreadUserState.objects.get(thread=t1, user=a).unread_count == 0
+
+
+@pytest.mark.django_db
+def test_direct_history_keyset_pages_and_incremental_sync():
+    from apps.messaging.models import Message, Thread
+
+    user_a = User.objects.create_user(phone="0501000901", role_state=UserRole.PHONE_ONLY)
+    user_b = User.objects.create_user(phone="0501000902", role_state=UserRole.PHONE_ONLY)
+    thread = Thread.objects.create(is_direct=True, participant_1=user_a, participant_2=user_b)
+    ids = [Message.objects.create(thread=thread, sender=user_a, body=f"m{i}").id for i in range(5)]
+
+    api = APIClient()
+    api.force_authenticate(user=user_b)
+    url = f"/api/messaging/direct/thread/{thread.id}/messages/"
+
+    page1 = api.get(url, {"limit": 2})
+    assert page1.status_code == 200
+    assert [m["id"] for m in page1.data["results"]] == [ids[4], ids[3]]
+    assert page1.data["has_more"] is True
+    assert f"before_id={ids[3]}" in page1.data["next"]
+
+    page3 = api.get(url, {"limit": 2, "before_id": ids[1]})
+    assert [m["id"] for m in page3.data["results"]] == [ids[0]]
+    assert page3.data["has_more"] is False
+    assert page3.data["next"] is None
+
+    newer = api.get(url, {"after_id": ids[2]})
+    assert [m["id"] for m in newer.data["results"]] == [ids[3], ids[4]]
+
+    # legacy offset paging still answers with count/next/previous
+    legacy = api.get(url, {"limit": 2, "offset": 2})
+    assert legacy.data["count"] == 5
+    assert [m["id"] for m in legacy.data["results"]] == [ids[2], ids[1]]
+
+    # client holds everything up to ids[2]; then one new message, one delete and a read happen
+    new_id = Message.objects.create(thread=thread, sender=user_a, body="جديد").id
+    api.force_authenticate(user=user_a)
+    deleted = api.post(f"/api/messaging/thread/{thread.id}/messages/{ids[1]}/delete/", {}, format="json")
+    assert deleted.status_code == 200
+    api.force_authenticate(user=user_b)
+    api.post(f"/api/messaging/direct/thread/{thread.id}/messages/read/", {}, format="json")
+
+    sync = api.get(f"{url}sync/", {"since_id": ids[2]})
+    assert sync.status_code == 200
+    assert [m["id"] for m in sync.data["messages"]] == [ids[3], ids[4], new_id]
+    assert sync.data["deleted_ids"] == [ids[1]]
+    assert sync.data["read_watermarks"][str(user_b.id)] == new_id
+    assert sync.data["since_id"] == new_id
+
+    again = api.get(
+        f"{url}sync/",
+        {"since_id": sync.data["since_id"], "since_deleted_id": sync.data["since_deleted_id"]},
+    )
+    assert again.data["messages"] == []
+    assert again.data["deleted_ids"] == []
+
+    api.force_authenticate(user=User.objects.create_user(phone="0501000903", role_state=UserRole.PHONE_ONLY))
+    assert api.get(f"{url}sync/").status_code == 403
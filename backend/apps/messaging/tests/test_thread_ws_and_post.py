@@ -271,6 +271,48 @@ async def test_thread_ws_connect_denied_when_blocked_by_other(mocker):
     await communicator.disconnect()
 
 
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_thread_ws_frames_reuse_access_checked_on_connect(mocker):
+    user_a = await database_sync_to_async(User.objects.create_user)(phone="0522000301")
+    user_b = await database_sync_to_async(User.objects.create_user)(phone="0522000302")
+    thread = await database_sync_to_async(Thread.objects.create)(
+        is_direct=True, participant_1=user_a, participant_2=user_b
+    )
+
+    from apps.messaging import consumers, jwt_auth
+
+    mocker.patch.object(jwt_auth, "get_user_for_token", return_value=user_a)
+
+    communicator = WebsocketCommunicator(application, f"/ws/thread/{thread.id}/?token=fake")
+    connected, _ = await communicator.connect()
+    assert connected is True
+    assert (await communicator.receive_json_from())["type"] == "connected"
+
+    access_check = mocker.patch.object(consumers, "_assert_thread_access")
+
+    await communicator.send_json_to({"type": "typing", "is_typing": True})
+    assert (await communicator.receive_json_from())["type"] == "typing"
+    await communicator.send_json_to({"type": "message", "text": "أهلا"})
+    evt = await communicator.receive_json_from()
+    assert evt["type"] == "message"
+    assert evt["text"] == "أهلا"
+    access_check.assert_not_called()
+
+    # a block by the peer is applied from the group event, without a DB check
+    from channels.layers import get_channel_layer
+
+    await get_channel_layer().group_send(
+        f"thread_{thread.id}", {"type": "broadcast.blocked", "thread_id": thread.id, "blocked_by": user_b.id}
+    )
+    blocked = await communicator.receive_json_from()
+    assert blocked.get("code") == "blocked"
+    access_check.assert_not_called()
+
+    await communicator.disconnect()
+    assert await database_sync_to_async(Message.objects.filter(thread=thread).count)() == 1
+
+
 @pytest.mark.django_db
 def test_post_message_requires_auth_and_permissions():
     client_user = User.objects.create_user(phone="0530000001", role_state=UserRole.PHONE_ONLY)
@@ -324,3 +366,125 @@ def test_post_message_requires_auth_and_permissions():
     assert data["message"]["text"] == "مرحبا"
 
     assert Message.objects.filter(thread=thread).count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_rest_direct_send_is_pushed_to_thread_ws(mocker):
+    user_a = await database_sync_to_async(User.objects.create_user)(phone="0522000401", role_state=UserRole.PHONE_ONLY)
+    user_b = await database_sync_to_async(User.objects.create_user)(phone="0522000402", role_state=UserRole.PHONE_ONLY)
+    thread = await database_sync_to_async(Thread.objects.create)(
+        is_direct=True, participant_1=user_a, participant_2=user_b
+    )
+
+    from apps.messaging import jwt_auth
+
+    mocker.patch.object(jwt_auth, "get_user_for_token", return_value=user_b)
+
+    communicator = WebsocketCommunicator(application, f"/ws/thread/{thread.id}/?token=fake")
+    connected, _ = await communicator.connect()
+    assert connected is True
+    assert (await communicator.receive_json_from())["type"] == "connected"
+
+    def _post():
+        api = APIClient()
+        api.force_authenticate(user=user_a)
+        return api.post(f"/api/messaging/direct/thread/{thread.id}/messages/send/", {"body": "من REST"}, format="json")
+
+    res = await database_sync_to_async(_post)()
+    assert res.status_code == 201
+
+    evt = await asyncio.wait_for(communicator.receive_json_from(), timeout=2)
+    assert evt["type"] == "message"
+    assert evt["id"] == res.json()["message_id"]
+    assert evt["text"] == "من REST"
+    assert evt["sender_id"] == user_a.id
+    assert evt["attachment_url"] is None
+
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_thread_ws_presence_and_coalesced_typing(mocker):
+    user_a = await database_sync_to_async(User.objects.create_user)(phone="0522000501")
+    user_b = await database_sync_to_async(User.objects.create_user)(phone="0522000502")
+    thread = await database_sync_to_async(Thread.objects.create)(
+        is_direct=True, participant_1=user_a, participant_2=user_b
+    )
+
+    from apps.messaging import jwt_auth
+
+    mocker.patch.object(jwt_auth, "get_user_for_token", side_effect=lambda token: {"a": user_a, "b": user_b}[token])
+
+    comm_a = WebsocketCommunicator(application, f"/ws/thread/{thread.id}/?token=a&presence=1")
+    assert (await comm_a.connect())[0] is True
+    hello_a = await comm_a.receive_json_from()
+    assert hello_a["presence"][str(user_b.id)]["online"] is False
+
+    comm_b = WebsocketCommunicator(application, f"/ws/thread/{thread.id}/?token=b")
+    assert (await comm_b.connect())[0] is True
+    hello_b = await comm_b.receive_json_from()
+    assert hello_b["presence"][str(user_a.id)]["online"] is True
+
+    online = await asyncio.wait_for(comm_a.receive_json_from(), timeout=2)
+    assert online == {"type": "presence", "user_id": user_b.id, "online": True, "last_seen": None}
+
+    # three "still typing" frames → one broadcast
+    for _ in range(3):
+        await comm_a.send_json_to({"type": "typing", "is_typing": True})
+    await comm_a.send_json_to({"type": "message", "text": "تم"})
+    typing_evt = await asyncio.wait_for(comm_b.receive_json_from(), timeout=2)
+    assert typing_evt == {"type": "typing", "user_id": user_a.id, "is_typing": True}
+    msg_evt = await asyncio.wait_for(comm_b.receive_json_from(), timeout=2)
+    assert msg_evt["type"] == "message"
+
+    await comm_b.disconnect()
+    events = []
+    while not any(e["type"] == "presence" for e in events):
+        events.append(await asyncio.wait_for(comm_a.receive_json_from(), timeout=2))
+    offline = events[-1]
+    assert offline["user_id"] == user_b.id
+    assert offline["online"] is False
+    assert offline["last_seen"]
+
+    await comm_a.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_thread_ws_inbound_frames_refresh_presence(mocker):
+    user_a = await database_sync_to_async(User.objects.create_user)(phone="0522000511")
+    user_b = await database_sync_to_async(User.objects.create_user)(phone="0522000512")
+    thread = await database_sync_to_async(Thread.objects.create)(
+        is_direct=True, participant_1=user_a, participant_2=user_b
+    )
+
+    from apps.messaging import consumers, jwt_auth
+
+    mocker.patch.object(jwt_auth, "get_user_for_token", return_value=user_a)
+    heartbeat = mocker.patch.object(consumers, "_presence_heartbeat", new=mocker.AsyncMock())
+    clock = mocker.patch.object(consumers, "_monotonic", return_value=1000.0)
+
+    communicator = WebsocketCommunicator(application, f"/ws/thread/{thread.id}/?token=a")
+    assert (await communicator.connect())[0] is True
+    await communicator.receive_json_from()
+
+    # إطارات ضمن ثلث المهلة: لا تحديث
+    # (إطارات typing تُرتد للمرسل عبر المُجمِّع بتوقيت غير محدد، فيُكتفى بإطار presence)
+    await communicator.send_json_to({"type": "presence"})
+    assert (await asyncio.wait_for(communicator.receive_json_from(), timeout=2))["type"] == "presence"
+    heartbeat.assert_not_awaited()
+
+    # عميل لا يرسل ping لكنه يرسل إطارات أخرى: الاتصال يُمدَّد
+    clock.return_value = 1000.0 + consumers.presence_refresh_seconds()
+    await communicator.send_json_to({"type": "presence"})
+    assert (await asyncio.wait_for(communicator.receive_json_from(), timeout=2))["type"] == "presence"
+    await communicator.send_json_to({"type": "presence"})
+    assert (await asyncio.wait_for(communicator.receive_json_from(), timeout=2))["type"] == "presence"
+    heartbeat.assert_awaited_once()
+    assert heartbeat.await_args.args[0] == user_a.id
+
+    # ping يمدّد دائمًا
+    await communicator.send_json_to({"type": "ping"})
+    assert (await asyncio.wait_for(communicator.receive_json_from(), timeout=2)) == {"type": "pong"}
+    assert heartbeat.await_count == 2
+
+    await communicator.disconnect()
@@ -5,12 +5,15 @@ from .api import (
     MarkThreadReadView,
     SendMessageView,
     ThreadMessagesListView,
+    ThreadMessagesSyncView,
     DirectThreadGetOrCreateView,
     DirectThreadMessagesListView,
+    DirectThreadMessagesSyncView,
     DirectThreadSendMessageView,
     DirectThreadMarkReadView,
     MyDirectThreadsListView,
     MyThreadStatesListView,
+    MyUnreadCountView,
     ThreadStateDetailView,
     ThreadFavoriteView,
     ThreadArchiveView,
@@ -30,6 +33,7 @@ app_name = "messaging"
 urlpatterns = [
     path("requests/<int:request_id>/thread/", GetOrCreateThreadView.as_view(), name="thread_get_or_create"),
     path("requests/<int:request_id>/messages/", ThreadMessagesListView.as_view(), name="messages_list"),
+    path("requests/<int:request_id>/messages/sync/", ThreadMessagesSyncView.as_view(), name="messages_sync"),
     path("requests/<int:request_id>/messages/send/", SendMessageView.as_view(), name="message_send"),
     path("requests/<int:request_id>/messages/read/", MarkThreadReadView.as_view(), name="thread_mark_read"),
 
@@ -39,12 +43,14 @@ urlpatterns = [
     # Direct messaging (no request required)
     path("direct/thread/", DirectThreadGetOrCreateView.as_view(), name="direct_thread_get_or_create"),
     path("direct/thread/<int:thread_id>/messages/", DirectThreadMessagesListView.as_view(), name="direct_messages_list"),
+    path("direct/thread/<int:thread_id>/messages/sync/", DirectThreadMessagesSyncView.as_view(), name="direct_messages_sync"),
     path("direct/thread/<int:thread_id>/messages/send/", DirectThreadSendMessageView.as_view(), name="direct_message_send"),
     path("direct/thread/<int:thread_id>/messages/read/", DirectThreadMarkReadView.as_view(), name="direct_thread_mark_read"),
     path("direct/threads/", MyDirectThreadsListView.as_view(), name="direct_threads_list"),
 
     # Per-user thread state (favorite / block / archive)
     path("threads/states/", MyThreadStatesListView.as_view(), name="my_thread_states"),
+    path("threads/unread-count/", MyUnreadCountView.as_view(), name="my_unread_count"),
     path("thread/<int:thread_id>/state/", ThreadStateDetailView.as_view(), name="thread_state"),
     path("thread/<int:thread_id>/favorite/", ThreadFavoriteView.as_view(), name="thread_favorite"),
     path("thread/<int:thread_id>/archive/", ThreadArchiveView.as_view(), name="thread_archive"),
@@ -14,12 +14,12 @@ from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_POST
 from django.utils.html import strip_tags
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 
 from apps.accounts.permissions import ROLE_LEVELS, role_level
 from apps.marketplace.models import ServiceRequest
 
-from .models import Message, Thread, ThreadUserState
+from .delivery import deliver_message, message_event, sender_display_name
+from .models import Thread, ThreadUserState
 
 
 def _active_context_mode_from_request(request) -> str:
@@ -83,16 +83,6 @@ def _thread_participant_users(thread: Thread):
 	return []
 
 
-def _unarchive_for_participants(thread: Thread):
-	participants = _thread_participant_users(thread)
-	if not participants:
-		return
-	ThreadUserState.objects.filter(thread=thread, user__in=participants, is_archived=True).update(
-		is_archived=False,
-		archived_at=None,
-	)
-
-
 def _is_blocked_by_other(thread: Thread, sender_user_id: int) -> bool:
 	participants = _thread_participant_users(thread)
 	other_ids = [u.id for u in participants if u and u.id and u.id != sender_user_id]
@@ -155,26 +145,18 @@ def post_message(request, thread_id: int):
 		if len(text) > MAX_MESSAGE_LEN:
 			return JsonResponse({"ok": False, "error": "الرسالة طويلة جدًا"}, status=400)
 
-		msg = Message.objects.create(thread=thread, sender=user, body=text, created_at=timezone.now())
-		_unarchive_for_participants(thread)
-
-		get_full_name = getattr(user, "get_full_name", None)
-		if callable(get_full_name):
-			sender_name = get_full_name() or ""
-		else:
-			sender_name = ""
-		sender_name = sender_name or getattr(user, "phone", "") or str(user)
+		msg = deliver_message(
+			thread_id=thread.id,
+			sender=user,
+			body=text,
+			request_id=thread.request_id,
+			participant_ids=[u.id for u in _thread_participant_users(thread)],
+		)
 
 		return JsonResponse(
 			{
 				"ok": True,
-				"message": {
-					"id": msg.id,
-					"text": msg.body,
-					"sender_id": user.id,
-					"sender_name": sender_name,
-					"sent_at": msg.created_at.isoformat(),
-				},
+				"message": message_event(msg, sender_name=sender_display_name(user)),
 			},
 			status=200,
 		)
@@ -0,0 +1,120 @@
+"""
+Audience-mode resolution for notifications (client / provider / shared).
+
+Notifications are tagged once, at write time: explicit ``audience_mode`` wins,
+otherwise the kind and the deep-link URL (request / thread) decide which side
+of the account the notification belongs to. ``shared`` rows stay visible in
+both modes, so ``?mode=`` filtering is a plain ``audience_mode IN (mode, shared)``.
+
+resolve_audience_modes() works on many rows with one query per target type,
+for bulk inserts and for the backfill_notification_audience command.
+"""
+from __future__ import annotations
+
+import re
+
+from .models import Notification
+
+
+CLIENT = Notification.AudienceMode.CLIENT
+PROVIDER = Notification.AudienceMode.PROVIDER
+SHARED = Notification.AudienceMode.SHARED
+
+_REQUEST_URL_RE = re.compile(r"/requests/(?P<id>\d+)(?:/|$)")
+_THREAD_URL_RE = re.compile(r"/threads?/(?P<id>\d+)(?:/|$)")
+
+_CLIENT_ONLY_KINDS = {
+    "offer_created",
+    "review_reply",
+}
+_PROVIDER_ONLY_KINDS = {
+    "urgent_request",
+    "offer_selected",
+}
+# إشعارات عامة/نظامية تظهر في الوضعين
+_SHARED_KINDS = {"report_status_change", "info", "urgent"}
+
+
+def _kind_mode(kind: str) -> str | None:
+    kind = (kind or "").strip().lower()
+    if kind in _CLIENT_ONLY_KINDS:
+        return CLIENT
+    if kind in _PROVIDER_ONLY_KINDS:
+        return PROVIDER
+    if kind in _SHARED_KINDS:
+        return SHARED
+    return None
+
+
+def _url_target(url: str) -> tuple[str, int] | None:
+    url = (url or "").strip()
+    if not url:
+        return None
+    m_req = _REQUEST_URL_RE.search(url)
+    if m_req:
+        return "request", int(m_req.group("id"))
+    m_thread = _THREAD_URL_RE.search(url)
+    if m_thread:
+        return "thread", int(m_thread.group("id"))
+    return None
+
+
+def _side_mode(user_id: int, client_id, provider_user_id) -> str:
+    is_client = client_id == user_id
+    is_provider = bool(provider_user_id) and provider_user_id == user_id
+    if is_client and not is_provider:
+        return CLIENT
+    if is_provider and not is_client:
+        return PROVIDER
+    return SHARED
+
+
+def resolve_audience_modes(rows) -> dict:
+    """
+    rows: iterable of (key, user_id, kind, url) -> {key: audience_mode}.
+    Request and thread parties are loaded in at most two queries.
+    """
+    from apps.marketplace.models import ServiceRequest
+    from apps.messaging.models import Thread
+
+    pending = []
+    request_ids: set[int] = set()
+    thread_ids: set[int] = set()
+    resolved = {}
+    for key, user_id, kind, url in rows:
+        mode = _kind_mode(kind)
+        target = None if mode is not None else _url_target(url)
+        if target is None:
+            resolved[key] = mode or SHARED
+            continue
+        pending.append((key, user_id, target))
+        (request_ids if target[0] == "request" else thread_ids).add(target[1])
+
+    request_parties = {
+        rid: (client_id, provider_user_id)
+        for rid, client_id, provider_user_id in ServiceRequest.objects.filter(id__in=request_ids).values_list(
+            "id", "client_id", "provider__user_id"
+        )
+    } if request_ids else {}
+    thread_parties = {}
+    if thread_ids:
+        for tid, is_direct, client_id, provider_user_id in Thread.objects.filter(id__in=thread_ids).values_list(
+            "id", "is_direct", "request__client_id", "request__provider__user_id"
+        ):
+            # Direct threads are treated as client-context only for now because
+            # the current product flow creates them from client -> provider.
+            thread_parties[tid] = CLIENT if is_direct else (client_id, provider_user_id)
+
+    for key, user_id, (target_type, target_id) in pending:
+        parties = (request_parties if target_type == "request" else thread_parties).get(target_id)
+        if parties is None or parties == (None, None):
+            resolved[key] = SHARED
+        elif parties == CLIENT:
+            resolved[key] = CLIENT
+        else:
+            resolved[key] = _side_mode(user_id, *parties)
+    return resolved
+
+
+def resolve_audience_mode(*, user_id: int, kind: str, url: str) -> str:
+    return resolve_audience_modes([(None, user_id, kind, url)])[None]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from apps.messaging.presence import presence_connect, presence_disconnect, presence_heartbeat
+from apps.messaging.services import total_unread_count
+
+from .models import Notification
+from .realtime import user_group_name
+from .views import _filter_by_mode
+
+
+logger = logging.getLogger(__name__)
+
+
+@database_sync_to_async
+def _unread_snapshot(user, mode: str) -> dict:
+    notifications = _filter_by_mode(Notification.objects.filter(user=user, is_read=False), mode).count()
+    return {"notifications_unread": notifications, "chats_unread": total_unread_count(user, mode)}
+
+
+class MeConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/me/?token=<jwt>[&mode=client|provider]
+
+    Sends the unread snapshot on connect, then relays the user's group events
+    (apps.notifications.realtime) that fall in the socket's mode, so clients
+    can drop badge polling. The socket also counts for the user's presence
+    (apps.messaging.presence).
+    """
+
+    async def connect(self):
+        self.user = self.scope.get("user")
+        if not self.user or self.user.is_anonymous:
+            await self.close(code=4401)
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        mode = ((query.get("mode") or [""])[0] or "").strip().lower()
+        self.mode = mode if mode in {"client", "provider"} else "shared"
+        self.group_name = user_group_name(self.user.id)
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await sync_to_async(presence_connect, thread_sensitive=False)(self.user.id, self.channel_name)
+        # بعد الانضمام للمجموعة: أي حدث يصل بعد اللقطة يُطبَّق عليها كفرق
+        snapshot = await _unread_snapshot(self.user, self.mode)
+        await self.send_json({"type": "connected", "user_id": self.user.id, "mode": self.mode, **snapshot})
+
+    async def disconnect(self, close_code):
+        group_name = getattr(self, "group_name", None)
+        if not group_name:
+            return
+        try:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+            await sync_to_async(presence_disconnect, thread_sensitive=False)(self.user.id, self.channel_name)
+        except Exception:
+            logger.exception("WS disconnect error")
+
+    async def receive_json(self, content, **kwargs):
+        msg_type = (content or {}).get("type")
+        if msg_type == "ping":
+            await sync_to_async(presence_heartbeat, thread_sensitive=False)(self.user.id, self.channel_name)
+            await self.send_json({"type": "pong"})
+            return
+        if msg_type == "sync":
+            snapshot = await _unread_snapshot(self.user, self.mode)
+            await self.send_json({"type": "sync", **snapshot})
+            return
+        await self.send_json({"type": "error", "error": "نوع غير مدعوم"})
+
+    def _in_mode(self, event: dict) -> bool:
+        """Same visibility rules as the snapshot: a socket opened with ?mode= only gets its own deltas."""
+        if self.mode not in {"client", "provider"}:
+            return True
+        if "audience_mode" in event:
+            # الإشعار المشترك يُعدّ في الوضعين (views._filter_by_mode)
+            return event["audience_mode"] in {self.mode, Notification.AudienceMode.SHARED}
+        if "mode" in event:
+            # المحادثة تُعدّ في وضعها فقط (messaging.services.thread_mode_q)
+            return event["mode"] == self.mode
+        return True
+
+    async def user_event(self, event):
+        if self._in_mode(event["event"]):
+            await self.send_json(event["event"])
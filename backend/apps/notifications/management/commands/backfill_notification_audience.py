@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.notifications.audience import SHARED, resolve_audience_modes
+from apps.notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Resolve audience_mode (client/provider) for legacy 'shared' notifications in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Notifications per batch.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows would change.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, int(options.get("batch_size") or 1000))
+        dry_run = bool(options.get("dry_run"))
+
+        stats = {"scanned": 0, "client": 0, "provider": 0}
+        last_id = 0
+        while True:
+            rows = list(
+                Notification.objects.filter(audience_mode=SHARED, id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "user_id", "kind", "url")[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            stats["scanned"] += len(rows)
+
+            by_mode: dict[str, list[int]] = {}
+            for notif_id, mode in resolve_audience_modes(rows).items():
+                if mode != SHARED:
+                    by_mode.setdefault(mode, []).append(notif_id)
+
+            for mode, ids in by_mode.items():
+                stats[mode] += len(ids)
+            if dry_run:
+                continue
+            with transaction.atomic():
+                for mode, ids in by_mode.items():
+                    Notification.objects.filter(id__in=ids).update(audience_mode=mode)
+
+        prefix = "[DRY-RUN] " if dry_run else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}scanned={stats['scanned']} -> client={stats['client']} provider={stats['provider']}"
+            )
+        )
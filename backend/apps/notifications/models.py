@@ -64,6 +64,11 @@ class Notification(models.Model):
 
 	class Meta:
 		ordering = ("-id",)
+		indexes = [
+			# ?mode= على القائمة + عداد غير المقروء (notifications.audience)
+			models.Index(fields=["user", "audience_mode", "-id"], name="notif_user_mode_idx"),
+			models.Index(fields=["user", "is_read", "audience_mode"], name="notif_user_unread_mode_idx"),
+		]
 
 	def __str__(self):
 		return f"{self.user_id}: {self.title}"
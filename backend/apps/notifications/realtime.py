@@ -0,0 +1,158 @@
+"""
+Per-user realtime channel (ws/me/, apps.notifications.consumers.MeConsumer).
+
+Every user has a channel-layer group ``user_<id>``. Writers push small events
+to it after their transaction commits, so clients keep their badges and inbox
+up to date from deltas instead of polling the count endpoints:
+
+- ``notification.created``  new notification (serialized) + unread_delta 1
+- ``notification.read``     one notification read, unread_delta -1
+- ``notification.read_all`` every notification read (badge → 0)
+- ``inbox.message``         new chat message: thread_id, last message and the
+                            chat unread_delta (1 for recipients, 0 for the sender)
+- ``inbox.unread``          thread read / marked unread / message deleted: its
+                            new unread count and the chat unread_delta
+
+Notification events carry the row's ``audience_mode`` and inbox events the
+``mode`` the user sees the thread in, so a socket opened with ?mode= only
+applies the deltas its snapshot counted.
+
+Publishing is best-effort: a channel-layer outage never fails the write,
+clients resync from the snapshot sent on (re)connect.
+"""
+from __future__ import annotations
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .serializers import NotificationSerializer
+
+
+logger = logging.getLogger(__name__)
+
+USER_GROUP_PREFIX = "user_"
+
+
+def user_group_name(user_id: int) -> str:
+    return f"{USER_GROUP_PREFIX}{int(user_id)}"
+
+
+async def _group_send_all(channel_layer, groups) -> None:
+    for group, payload in groups:
+        try:
+            await channel_layer.group_send(group, payload)
+        except Exception:
+            logger.warning("realtime publish to %s failed", group, exc_info=True)
+
+
+def send_to_groups(groups: list[tuple[str, dict]]) -> None:
+    """group_send each (group, payload) now; one event-loop hop for the whole batch."""
+    if not groups:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(_group_send_all)(channel_layer, groups)
+    except Exception:
+        logger.warning("realtime publish failed", exc_info=True)
+
+
+def push_user_events(events) -> None:
+    """Send [(user_id, event_dict), ...] to the users' groups once the current transaction commits."""
+    groups = [
+        (user_group_name(user_id), {"type": "user.event", "event": event})
+        for user_id, event in events
+        if user_id
+    ]
+    if groups:
+        transaction.on_commit(lambda: send_to_groups(groups))
+
+
+def push_notifications_created(notifs) -> None:
+    push_user_events(
+        (
+            n.user_id,
+            {
+                "type": "notification.created",
+                "notification": NotificationSerializer(n).data,
+                "audience_mode": n.audience_mode,
+                "unread_delta": 1,
+            },
+        )
+        for n in notifs
+        if n is not None and n.pk
+    )
+
+
+def push_notification_read(user_id: int, notification_id: int, *, audience_mode: str) -> None:
+    push_user_events(
+        [
+            (
+                user_id,
+                {
+                    "type": "notification.read",
+                    "notification_id": notification_id,
+                    "audience_mode": audience_mode,
+                    "unread_delta": -1,
+                },
+            )
+        ]
+    )
+
+
+def push_notifications_read_all(user_id: int) -> None:
+    push_user_events([(user_id, {"type": "notification.read_all"})])
+
+
+def push_inbox_messages(messages, participants: dict[int, list[int]], modes: dict[int, dict[int, str]] | None = None) -> None:
+    """
+    ``participants`` = {thread_id: [user_id, ...]}; the sender gets the event too (other devices).
+    ``modes`` = {thread_id: {user_id: mode}} (messaging.services.participant_modes).
+    """
+    modes = modes or {}
+    events = []
+    for message in messages:
+        last_message = {
+            "id": message.id,
+            "text": (message.body or "")[:200],
+            "sender_id": message.sender_id,
+            "sent_at": message.created_at.isoformat(),
+            "attachment_type": message.attachment_type,
+        }
+        for user_id in dict.fromkeys(participants.get(message.thread_id) or ()):
+            events.append(
+                (
+                    user_id,
+                    {
+                        "type": "inbox.message",
+                        "thread_id": message.thread_id,
+                        "mode": modes.get(message.thread_id, {}).get(user_id, "shared"),
+                        "last_message": last_message,
+                        "unread_delta": 0 if user_id == message.sender_id else 1,
+                    },
+                )
+            )
+    push_user_events(events)
+
+
+def push_inbox_unread(user_id: int, thread_id: int, *, previous: int, current: int, mode: str) -> None:
+    """The user's unread counter of one thread changed (read / marked unread / message deleted)."""
+    if previous != current:
+        push_user_events(
+            [
+                (
+                    user_id,
+                    {
+                        "type": "inbox.unread",
+                        "thread_id": thread_id,
+                        "mode": mode,
+                        "unread": int(current),
+                        "unread_delta": int(current) - int(previous),
+                    },
+                )
+            ]
+        )
@@ -0,0 +1,7 @@
+from django.urls import re_path
+
+from .consumers import MeConsumer
+
+websocket_urlpatterns = [
+	re_path(r"ws/me/$", MeConsumer.as_asgi()),
+]
@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.utils import timezone
 
-from apps.subscriptions.models import Subscription, SubscriptionStatus
+from apps.core.caching import invalidate_keys, versioned_keys
 
+from .audience import resolve_audience_mode, resolve_audience_modes
+from .realtime import push_notifications_created
 from .models import (
     Notification,
     EventLog,
@@ -157,46 +162,28 @@ def _user_tier_level(user) -> int:
     """
     1=basic, 2=leading, 3=professional
     """
-    active = (
-        Subscription.objects.filter(
-            user=user,
-            status=SubscriptionStatus.ACTIVE,
-        )
-        .select_related("plan")
-        .order_by("-id")
-        .first()
-    )
-    if not active:
-        return 1
-
-    code = (active.plan.code or "").strip().upper()
-    title = (active.plan.title or "").strip()
-    features = set(active.plan.features or [])
-
-    if (
-        "PROFESSIONAL" in code
-        or "احتراف" in title
-        or "advanced_analytics" in features
-    ):
-        return 3
-    if "PRO" in code or "رائد" in title or "priority_support" in features:
-        return 2
-    return 1
-
-
-def _is_pref_locked(user, pref_key: str) -> bool:
+    from apps.features.entitlements import Entitlements
+
+    return Entitlements(user).tier_level
+
+
+def _tier_locks(tier: str, user_level: int) -> bool:
+    if tier == NotificationTier.LEADING:
+        return user_level < 2
+    if tier in {NotificationTier.PROFESSIONAL, NotificationTier.EXTRA}:
+        return user_level < 3
+    return False
+
+
+def _is_pref_locked(user, pref_key: str, *, tier_level: int | None = None) -> bool:
     config = NOTIFICATION_CATALOG.get(pref_key)
     if not config:
         return False
     tier = config["tier"]
     if tier == NotificationTier.BASIC:
         return False
-    user_level = _user_tier_level(user)
-    if tier == NotificationTier.LEADING:
-        return user_level < 2
-    if tier in {NotificationTier.PROFESSIONAL, NotificationTier.EXTRA}:
-        return user_level < 3
-    return False
+    user_level = tier_level if tier_level is not None else _user_tier_level(user)
+    return _tier_locks(tier, user_level)
 
 
 def get_or_create_notification_preferences(user):
@@ -221,23 +208,83 @@ def get_or_create_notification_preferences(user):
     return list(NotificationPreference.objects.filter(user=user).order_by("tier", "id"))
 
 
+# بت لكل مفتاح في الكتالوج (ترتيب الكتالوج ثابت) لتخزين تفضيلات المستخدم كرقم واحد
+NOTIFICATION_PREF_BITS = {key: 1 << idx for idx, key in enumerate(NOTIFICATION_CATALOG)}
+DEFAULT_PREF_BITS = sum(
+    bit for key, bit in NOTIFICATION_PREF_BITS.items() if NOTIFICATION_CATALOG[key].get("default_enabled", True)
+)
+NOTIFICATION_PROFILE_CACHE_NAMESPACE = "notif:profile"
+
+
+def get_notification_profiles(user_ids) -> dict[int, tuple[int, int]]:
+    """
+    {user_id: (tier_level, pref_bits)} من الكاش، والناقص يُحسب باستعلامين
+    (التفضيلات + مستويات الباقات) ثم يُخزن.
+    المفتاح بلا صف تفضيل يأخذ قيمة default_enabled من الكتالوج.
+    """
+    ids = list(dict.fromkeys(int(uid) for uid in user_ids if uid))
+    if not ids:
+        return {}
+    # دفعة من المستخدمين بقراءتين: إصدار الـ namespace مرة واحدة ثم get_many
+    keys = dict(zip(ids, versioned_keys(NOTIFICATION_PROFILE_CACHE_NAMESPACE, [(uid,) for uid in ids])))
+    cached = cache.get_many(list(keys.values()))
+
+    profiles: dict[int, tuple[int, int]] = {}
+    missing = []
+    for uid in ids:
+        value = cached.get(keys[uid])
+        if value is None:
+            missing.append(uid)
+        else:
+            profiles[uid] = tuple(value)
+    if not missing:
+        return profiles
+
+    from apps.features.entitlements import user_tier_levels
+
+    levels = user_tier_levels(missing)
+    bits = {uid: DEFAULT_PREF_BITS for uid in missing}
+    rows = NotificationPreference.objects.filter(user_id__in=missing).values_list("user_id", "key", "enabled")
+    for uid, key, enabled in rows:
+        bit = NOTIFICATION_PREF_BITS.get(key)
+        if not bit:
+            continue
+        bits[uid] = (bits[uid] | bit) if enabled else (bits[uid] & ~bit)
+
+    fresh = {uid: (levels.get(uid, 1), bits[uid]) for uid in missing}
+    timeout = int(getattr(settings, "NOTIFICATIONS_PROFILE_CACHE_SECONDS", 3600))
+    cache.set_many({keys[uid]: profile for uid, profile in fresh.items()}, timeout)
+    profiles.update(fresh)
+    return profiles
+
+
+def invalidate_notification_profile(user_id) -> None:
+    """
+    يُستدعى عند تغيّر تفضيلات أو اشتراك المستخدم.
+    الحذف يتكرر بعد الـ commit حتى لا تعيد قراءة متزامنة تخزين قيمة قديمة.
+    """
+    if not user_id:
+        return
+    invalidate_keys(NOTIFICATION_PROFILE_CACHE_NAMESPACE, (int(user_id),))
+
+
+def _profile_allows(profile: tuple[int, int], pref_key: str) -> bool:
+    tier_level, bits = profile
+    if _tier_locks(NOTIFICATION_CATALOG[pref_key]["tier"], tier_level):
+        return False
+    return bool(bits & NOTIFICATION_PREF_BITS[pref_key])
+
+
 def should_send_notification(*, user, pref_key: str | None) -> bool:
     if not pref_key:
         return True
     if pref_key not in NOTIFICATION_CATALOG:
         return True
-    if _is_pref_locked(user, pref_key):
+    user_id = getattr(user, "id", None)
+    if not user_id:
         return False
-    pref = NotificationPreference.objects.filter(user=user, key=pref_key).first()
-    if pref is None:
-        cfg = NOTIFICATION_CATALOG[pref_key]
-        pref = NotificationPreference.objects.create(
-            user=user,
-            key=pref_key,
-            enabled=bool(cfg.get("default_enabled", True)),
-            tier=cfg["tier"],
-        )
-    return bool(pref.enabled)
+    profile = get_notification_profiles([user_id])[user_id]
+    return _profile_allows(profile, pref_key)
 
 
 def create_notification(
@@ -262,6 +309,9 @@ def create_notification(
     if not should_send_notification(user=user, pref_key=derived_pref_key):
         return None
 
+    if audience_mode not in {"client", "provider"}:
+        audience_mode = resolve_audience_mode(user_id=user.id, kind=kind, url=url)
+
     with transaction.atomic():
         notif = Notification.objects.create(
             user=user,
@@ -269,7 +319,7 @@ def create_notification(
             body=body,
             kind=kind,
             url=url,
-            audience_mode=(audience_mode or "shared"),
+            audience_mode=audience_mode,
             is_urgent=bool(is_urgent or kind == "urgent"),
         )
         if event_type:
@@ -282,4 +332,92 @@ def create_notification(
                 message_id=message_id,
                 meta=meta,
             )
+        push_notifications_created([notif])
     return notif
+
+
+def filter_recipients_for_pref(user_ids, pref_key: str | None) -> list[int]:
+    """
+    نسخة جماعية من should_send_notification:
+    ملفات التفضيل من الكاش، والناقص منها بعدد ثابت من الاستعلامات.
+    """
+    ids = list(dict.fromkeys(int(uid) for uid in user_ids if uid))
+    if not ids or not pref_key or pref_key not in NOTIFICATION_CATALOG:
+        return ids
+    profiles = get_notification_profiles(ids)
+    return [uid for uid in ids if _profile_allows(profiles[uid], pref_key)]
+
+
+def create_notifications_bulk(
+    *,
+    user_ids,
+    title: str,
+    body: str,
+    kind: str = "info",
+    url: str = "",
+    actor_id: int | None = None,
+    event_type: str | None = None,
+    request_id: int | None = None,
+    offer_id: int | None = None,
+    message_id: int | None = None,
+    meta: dict | None = None,
+    is_urgent: bool = False,
+    pref_key: str | None = None,
+    audience_mode: str = "shared",
+    per_user: dict[int, dict] | None = None,
+) -> list[Notification]:
+    """
+    نفس create_notification لعدة مستلمين:
+    فلترة التفضيلات/الباقات جماعيًا ثم bulk_create للإشعارات وسجل الأحداث.
+    per_user = {user_id: {"url": ..., "message_id": ..., "meta": ...}} يخصص هذه الحقول لكل مستلم.
+    """
+    meta = meta or {}
+    per_user = per_user or {}
+    derived_pref_key = pref_key or EVENT_TO_PREF_KEY.get(event_type or "")
+    recipients = filter_recipients_for_pref(user_ids, derived_pref_key)
+    if not recipients:
+        return []
+
+    def _field(uid, name, default):
+        return per_user.get(uid, {}).get(name, default)
+
+    if audience_mode in {"client", "provider"}:
+        modes = dict.fromkeys(recipients, audience_mode)
+    else:
+        modes = resolve_audience_modes((uid, uid, kind, _field(uid, "url", url)) for uid in recipients)
+
+    now = timezone.now()
+    with transaction.atomic():
+        notifs = Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=uid,
+                    title=title,
+                    body=body,
+                    kind=kind,
+                    url=_field(uid, "url", url),
+                    audience_mode=modes[uid],
+                    is_urgent=bool(is_urgent or kind == "urgent"),
+                    created_at=now,
+                )
+                for uid in recipients
+            ]
+        )
+        if event_type:
+            EventLog.objects.bulk_create(
+                [
+                    EventLog(
+                        event_type=event_type,
+                        actor_id=actor_id,
+                        target_user_id=uid,
+                        request_id=request_id,
+                        offer_id=offer_id,
+                        message_id=_field(uid, "message_id", message_id),
+                        meta=_field(uid, "meta", meta),
+                        created_at=now,
+                    )
+                    for uid in recipients
+                ]
+            )
+        push_notifications_created(notifs)
+    return notifs
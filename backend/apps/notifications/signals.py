@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from apps.accounts.models import User
@@ -8,9 +8,10 @@ from apps.marketplace.models import (
     RequestStatusLog,
 )
 from apps.messaging.models import Message
+from apps.subscriptions.models import Subscription, SubscriptionPlan
 
-from .models import EventType
-from .services import create_notification
+from .models import EventType, NotificationPreference
+from .services import create_notification, invalidate_notification_profile
 
 
 def _status_label(raw: str) -> str:
@@ -179,3 +180,21 @@ def notify_request_status_changed(sender, instance: RequestStatusLog, created, *
         },
         audience_mode="provider" if sr.provider_id and target.id == sr.provider.user_id else "client",
     )
+
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_notification_profile_on_change(sender, instance, **kwargs):
+    invalidate_notification_profile(instance.user_id)
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+def invalidate_notification_profiles_on_plan_change(sender, instance: SubscriptionPlan, created, **kwargs):
+    # تعديل رمز/عنوان/ميزات الخطة قد يغيّر مستوى الباقة لكل مشتركيها
+    if created:
+        return
+    user_ids = Subscription.objects.filter(plan=instance).values_list("user_id", flat=True).distinct()
+    for user_id in user_ids:
+        invalidate_notification_profile(user_id)
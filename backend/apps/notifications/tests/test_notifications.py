@@ -219,3 +219,280 @@ def test_direct_message_creates_notification_for_other_participant():
     notif = Notification.objects.filter(user=provider_user, title="رسالة جديدة").first()
     assert notif is not None
     assert "/threads/" in (notif.url or "")
+
+
+@pytest.mark.django_db
+def test_bulk_notifications_respect_preferences_and_tiers(django_assert_max_num_queries):
+    from apps.notifications.models import EventLog, NotificationPreference
+    from apps.notifications.services import create_notifications_bulk
+
+    users = [User.objects.create_user(phone=f"05090001{i:02d}") for i in range(6)]
+    NotificationPreference.objects.create(user=users[0], key="urgent_request", enabled=False, tier="basic")
+
+    with django_assert_max_num_queries(6):
+        created = create_notifications_bulk(
+            user_ids=[u.id for u in users],
+            title="طلب عاجل",
+            body="body",
+            kind="urgent_request",
+            event_type="request_created",
+            pref_key="urgent_request",
+            request_id=1,
+            is_urgent=True,
+            audience_mode="provider",
+        )
+
+    assert len(created) == 5
+    assert not Notification.objects.filter(user=users[0]).exists()
+    assert Notification.objects.filter(user=users[1], is_urgent=True, audience_mode="provider").exists()
+    assert EventLog.objects.filter(event_type="request_created", request_id=1).count() == 5
+    # المفاتيح بلا صف تفضيل تأخذ القيمة الافتراضية دون إنشاء صفوف
+    assert NotificationPreference.objects.filter(key="urgent_request").count() == 1
+
+    # Leading-tier preference: locked for users without a qualifying plan.
+    assert create_notifications_bulk(user_ids=[u.id for u in users], title="t", body="b", pref_key="new_follow") == []
+
+
+@pytest.mark.django_db
+def test_notification_profiles_read_the_cache_version_once_per_batch(mocker):
+    from apps.core import caching
+    from apps.notifications.services import get_notification_profiles, invalidate_notification_profile
+
+    users = [User.objects.create_user(phone=f"05090002{i:02d}") for i in range(5)]
+    ids = [u.id for u in users]
+    get_notification_profiles(ids)
+
+    version_reads = mocker.spy(caching, "namespace_version")
+    get_many = mocker.spy(caching.cache, "get_many")
+    assert set(get_notification_profiles(ids)) == set(ids)
+    assert version_reads.call_count == 1
+    assert get_many.call_count == 1
+
+    version_reads.reset_mock()
+    invalidate_notification_profile(users[0].id)
+    assert version_reads.call_count == 1
+
+
+@pytest.mark.django_db
+def test_should_send_notification_uses_cached_profile(django_assert_num_queries):
+    from apps.notifications.models import NotificationPreference
+    from apps.notifications.services import should_send_notification
+    from apps.subscriptions.models import Subscription, SubscriptionPlan, SubscriptionStatus
+
+    user = User.objects.create_user(phone="0509000201")
+    pref = NotificationPreference.objects.create(user=user, key="new_chat_message", enabled=True, tier="basic")
+
+    assert should_send_notification(user=user, pref_key="new_chat_message") is True
+    with django_assert_num_queries(0):
+        assert should_send_notification(user=user, pref_key="new_chat_message") is True
+        assert should_send_notification(user=user, pref_key="service_reply") is True
+        assert should_send_notification(user=user, pref_key="new_follow") is False
+
+    # تعطيل التفضيل يُسقط الملف المخزن
+    pref.enabled = False
+    pref.save(update_fields=["enabled", "updated_at"])
+    assert should_send_notification(user=user, pref_key="new_chat_message") is False
+
+    # الترقية لباقة ريادية تفتح مفاتيح الباقة
+    plan = SubscriptionPlan.objects.create(code="PRO", title="الريادية", features=["priority_support"])
+    Subscription.objects.create(user=user, plan=plan, status=SubscriptionStatus.ACTIVE)
+    assert should_send_notification(user=user, pref_key="new_follow") is True
+
+
+@pytest.mark.django_db
+def test_backfill_resolves_legacy_shared_notifications_and_mode_filter_is_set_based(django_assert_max_num_queries):
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    user = User.objects.create_user(phone="0509000301", role_state=UserRole.CLIENT)
+    provider = ProviderProfile.objects.create(
+        user=user,
+        provider_type="individual",
+        display_name="مزود/عميل",
+        bio="bio",
+        city="الرياض",
+    )
+    other = User.objects.create_user(phone="0509000302", role_state=UserRole.CLIENT)
+    cat = Category.objects.create(name="نجارة")
+    sub = SubCategory.objects.create(category=cat, name="أبواب")
+    as_provider = ServiceRequest.objects.create(
+        client=other,
+        provider=provider,
+        subcategory=sub,
+        title="طلب كمزود",
+        description="وصف",
+        request_type=RequestType.NORMAL,
+        city="الرياض",
+    )
+    as_client = ServiceRequest.objects.create(
+        client=user,
+        subcategory=sub,
+        title="طلب كعميل",
+        description="وصف",
+        request_type=RequestType.COMPETITIVE,
+        city="الرياض",
+    )
+
+    def legacy(url, kind="request_status_change"):
+        return Notification.objects.create(user=user, title="t", body="b", kind=kind, url=url, audience_mode="shared")
+
+    n_provider = legacy(f"/requests/{as_provider.id}")
+    n_client = legacy(f"/requests/{as_client.id}/chat")
+    n_shared = legacy("", kind="info")
+
+    out = StringIO()
+    call_command("backfill_notification_audience", stdout=out)
+    assert "client=1 provider=1" in out.getvalue()
+    n_provider.refresh_from_db()
+    n_client.refresh_from_db()
+    n_shared.refresh_from_db()
+    assert (n_provider.audience_mode, n_client.audience_mode, n_shared.audience_mode) == (
+        "provider",
+        "client",
+        "shared",
+    )
+
+    api = APIClient()
+    api.force_authenticate(user=user)
+    r = api.get("/api/notifications/unread-count/", {"mode": "provider"})
+    assert r.data["unread"] == 2
+    with django_assert_max_num_queries(4):
+        r = api.get("/api/notifications/", {"mode": "client"})
+    assert {row["id"] for row in r.data["results"]} == {n_client.id, n_shared.id}
+
+    # الإشعارات الجديدة تُحسم عند الكتابة
+    from apps.notifications.services import create_notification
+
+    notif = create_notification(user=user, title="t", body="b", kind="request_status_change", url=f"/requests/{as_provider.id}")
+    assert notif.audience_mode == "provider"
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_me_ws_pushes_new_notifications_and_unread_deltas(mocker):
+    import asyncio
+
+    from channels.db import database_sync_to_async
+    from channels.testing import WebsocketCommunicator
+
+    from apps.messaging import jwt_auth
+    from apps.notifications.services import create_notification
+    from config.asgi import application
+
+    user = await database_sync_to_async(User.objects.create_user)(phone="0509000301")
+    peer = await database_sync_to_async(User.objects.create_user)(phone="0509000302")
+    await database_sync_to_async(Notification.objects.create)(user=user, title="قديم", body="b")
+    mocker.patch.object(jwt_auth, "get_user_for_token", return_value=user)
+
+    anonymous = WebsocketCommunicator(application, "/ws/me/")
+    connected, _ = await anonymous.connect()
+    assert connected is False
+
+    communicator = WebsocketCommunicator(application, "/ws/me/?token=fake")
+    connected, _ = await communicator.connect()
+    assert connected is True
+    hello = await communicator.receive_json_from()
+    assert hello["type"] == "connected"
+    assert hello["notifications_unread"] == 1
+    assert hello["chats_unread"] == 0
+
+    await database_sync_to_async(create_notification)(user=user, title="جديد", body="b", kind="info")
+    evt = await asyncio.wait_for(communicator.receive_json_from(), timeout=2)
+    assert evt["type"] == "notification.created"
+    assert evt["notification"]["title"] == "جديد"
+    assert evt["unread_delta"] == 1
+
+    thread = await database_sync_to_async(Thread.objects.create)(is_direct=True, participant_1=user, participant_2=peer)
+
+    def _send():
+        from apps.messaging.delivery import deliver_message
+
+        return deliver_message(thread_id=thread.id, sender=peer, body="مرحبا", participant_ids=[user.id, peer.id])
+
+    message = await database_sync_to_async(_send)()
+    events = {}
+    while "inbox.message" not in events:
+        evt = await asyncio.wait_for(communicator.receive_json_from(), timeout=2)
+        events[evt["type"]] = evt
+    assert events["inbox.message"]["thread_id"] == thread.id
+    assert events["inbox.message"]["last_message"]["id"] == message.id
+    assert events["inbox.message"]["unread_delta"] == 1
+
+    await communicator.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+async def test_me_ws_relays_only_the_sockets_mode(mocker):
+    import asyncio
+
+    from channels.db import database_sync_to_async
+    from channels.testing import WebsocketCommunicator
+
+    from apps.messaging import jwt_auth
+    from apps.messaging.services import mark_thread_read
+    from config.asgi import application
+
+    user = await database_sync_to_async(User.objects.create_user)(phone="0509000311")
+    peer = await database_sync_to_async(User.objects.create_user)(phone="0509000312")
+    mocker.patch.object(jwt_auth, "get_user_for_token", return_value=user)
+
+    communicator = WebsocketCommunicator(application, "/ws/me/?token=fake&mode=client")
+    connected, _ = await communicator.connect()
+    assert connected is True
+    hello = await communicator.receive_json_from()
+    assert hello["mode"] == "client"
+
+    def _create(audience_mode):
+        return Notification.objects.create(user=user, title=audience_mode, body="b", audience_mode=audience_mode)
+
+    def _push(notif):
+        from apps.notifications.realtime import push_notifications_created
+
+        push_notifications_created([notif])
+
+    for audience_mode in ("provider", "shared", "client"):
+        notif = await database_sync_to_async(_create)(audience_mode)
+        await database_sync_to_async(_push)(notif)
+    titles = []
+    for _ in range(2):
+        evt = await asyncio.wait_for(communicator.receive_json_from(), timeout=2)
+        assert evt["type"] == "notification.created"
+        titles.append(evt["notification"]["title"])
+    assert titles == ["shared", "client"]
+
+    provider_thread = await database_sync_to_async(Thread.objects.create)(
+        is_direct=True, participant_1=user, participant_2=peer, context_mode="provider"
+    )
+    client_thread = await database_sync_to_async(Thread.objects.create)(
+        is_direct=True, participant_1=user, participant_2=peer, context_mode="client"
+    )
+
+    def _send(thread):
+        from apps.messaging.delivery import deliver_message
+
+        return deliver_message(thread_id=thread.id, sender=peer, body="مرحبا", participant_ids=[user.id, peer.id])
+
+    async def _next_inbox_event():
+        # إشعارات "رسالة جديدة" قد تتخلل أحداث صندوق الوارد
+        while True:
+            evt = await asyncio.wait_for(communicator.receive_json_from(), timeout=2)
+            if evt["type"].startswith("inbox."):
+                return evt
+
+    await database_sync_to_async(_send)(provider_thread)
+    await database_sync_to_async(mark_thread_read)(provider_thread.id, user.id)
+    await database_sync_to_async(_send)(client_thread)
+    evt = await _next_inbox_event()
+    assert evt["type"] == "inbox.message"
+    assert evt["thread_id"] == client_thread.id
+    assert evt["mode"] == "client"
+
+    message = await database_sync_to_async(Message.objects.filter(thread=client_thread).get)()
+    await database_sync_to_async(message.delete)()
+    evt = await _next_inbox_event()
+    assert evt["type"] == "inbox.unread"
+    assert evt["thread_id"] == client_thread.id
+    assert evt["unread"] == 0
+    assert evt["unread_delta"] == -1
+
+    await communicator.disconnect()
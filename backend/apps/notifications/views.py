@@ -1,5 +1,4 @@
 from datetime import timedelta
-import re
 
 from django.conf import settings
 from django.db.models import Case, IntegerField, Value, When
@@ -10,6 +9,7 @@ from rest_framework.response import Response
 
 from .models import Notification, DeviceToken
 from .pagination import NotificationPagination
+from .realtime import push_notification_read, push_notifications_read_all
 from .serializers import (
     NotificationSerializer,
     DeviceTokenSerializer,
@@ -18,99 +18,18 @@ from .serializers import (
 from .services import NOTIFICATION_CATALOG, get_or_create_notification_preferences, _is_pref_locked
 
 from apps.accounts.permissions import IsAtLeastClient, IsAtLeastPhoneOnly
-from apps.marketplace.models import ServiceRequest
-from apps.messaging.models import Thread
+from apps.features.entitlements import Entitlements
 
 
-_REQUEST_URL_RE = re.compile(r"/requests/(?P<id>\d+)(?:/|$)")
-_THREAD_URL_RE = re.compile(r"/threads?/(?P<id>\d+)(?:/|$)")
-
-
-_CLIENT_ONLY_KINDS = {
-    "offer_created",
-    "review_reply",
-}
-_PROVIDER_ONLY_KINDS = {
-    "urgent_request",
-    "offer_selected",
-}
-
-
-def _notification_matches_mode(*, notif: Notification, user, mode: str) -> bool:
-    mode = (mode or "").strip().lower()
-    if mode not in {"client", "provider"}:
-        return True
-
-    audience_mode = (getattr(notif, "audience_mode", "") or "").strip().lower()
-    if audience_mode in {"client", "provider"}:
-        return audience_mode == mode
-    if audience_mode == "shared":
-        # Continue to heuristic fallback for legacy/shared notifications that may
-        # still carry request/thread URLs and can be isolated more accurately.
-        pass
-
-    kind = (notif.kind or "").strip().lower()
-    if kind in _CLIENT_ONLY_KINDS:
-        return mode == "client"
-    if kind in _PROVIDER_ONLY_KINDS:
-        return mode == "provider"
-
-    # Shared/system notifications remain visible in both modes.
-    if kind in {"report_status_change", "info", "urgent"}:
-        return True
-
-    url = (notif.url or "").strip()
-    if not url:
-        return True
-
-    m_req = _REQUEST_URL_RE.search(url)
-    if m_req:
-        request_id = int(m_req.group("id"))
-        sr = (
-            ServiceRequest.objects.select_related("provider__user")
-            .filter(id=request_id)
-            .first()
-        )
-        if sr is None:
-            return True
-        if mode == "client":
-            return sr.client_id == user.id
-        return bool(sr.provider_id and sr.provider.user_id == user.id)
-
-    m_thread = _THREAD_URL_RE.search(url)
-    if m_thread:
-        thread_id = int(m_thread.group("id"))
-        thread = (
-            Thread.objects.select_related("request", "request__provider__user")
-            .filter(id=thread_id)
-            .first()
-        )
-        if thread is None:
-            return True
-        if thread.is_direct:
-            # Direct threads are treated as client-context only for now because
-            # the current product flow creates them from client -> provider.
-            return mode == "client"
-        sr = thread.request
-        if sr is None:
-            return True
-        if mode == "client":
-            return sr.client_id == user.id
-        return bool(sr.provider_id and sr.provider.user_id == user.id)
-
-    return True
-
-
-def _filter_notification_ids_by_mode(*, qs, user, mode: str):
+def _filter_by_mode(qs, mode: str):
+    """
+    audience_mode is resolved at write time (notifications.audience), so a mode
+    filter is a single indexed WHERE; shared rows are visible in both modes.
+    """
     mode = (mode or "").strip().lower()
     if mode not in {"client", "provider"}:
-        return None
-    ids = []
-    for notif in qs.only("id", "kind", "url", "audience_mode").iterator():
-        # Include audience_mode when available (new schema).
-        if _notification_matches_mode(notif=notif, user=user, mode=mode):
-            ids.append(notif.id)
-    return ids
+        return qs
+    return qs.filter(audience_mode__in=[mode, Notification.AudienceMode.SHARED])
 
 
 class MyNotificationsView(generics.ListAPIView):
@@ -131,21 +50,15 @@ class MyNotificationsView(generics.ListAPIView):
             )
             .order_by("-_sort_priority", "-id")
         )
-        mode = (self.request.query_params.get("mode") or "").strip().lower()
-        ids = _filter_notification_ids_by_mode(qs=qs, user=self.request.user, mode=mode)
-        if ids is None:
-            return qs
-        return qs.filter(id__in=ids)
+        return _filter_by_mode(qs, self.request.query_params.get("mode") or "")
 
 
 class UnreadCountView(APIView):
     permission_classes = [IsAtLeastPhoneOnly]
 
     def get(self, request):
-        qs = Notification.objects.filter(user=request.user, is_read=False).order_by("-id")
-        mode = (request.query_params.get("mode") or "").strip().lower()
-        ids = _filter_notification_ids_by_mode(qs=qs, user=request.user, mode=mode)
-        count = qs.count() if ids is None else len(ids)
+        qs = Notification.objects.filter(user=request.user, is_read=False)
+        count = _filter_by_mode(qs, request.query_params.get("mode") or "").count()
         return Response({"unread": count}, status=status.HTTP_200_OK)
 
 
@@ -153,11 +66,13 @@ class MarkReadView(APIView):
     permission_classes = [IsAtLeastPhoneOnly]
 
     def post(self, request, notif_id):
-        updated = Notification.objects.filter(id=notif_id, user=request.user).update(
-            is_read=True
+        audience_mode = (
+            Notification.objects.filter(id=notif_id, user=request.user).values_list("audience_mode", flat=True).first()
         )
-        if not updated:
+        if audience_mode is None:
             return Response({"detail": "غير موجود"}, status=status.HTTP_404_NOT_FOUND)
+        if Notification.objects.filter(id=notif_id, user=request.user, is_read=False).update(is_read=True):
+            push_notification_read(request.user.id, notif_id, audience_mode=audience_mode)
         return Response({"ok": True}, status=status.HTTP_200_OK)
 
 
@@ -165,7 +80,8 @@ class MarkAllReadView(APIView):
     permission_classes = [IsAtLeastPhoneOnly]
 
     def post(self, request):
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        if Notification.objects.filter(user=request.user, is_read=False).update(is_read=True):
+            push_notifications_read_all(request.user.id)
         return Response({"ok": True}, status=status.HTTP_200_OK)
 
 
@@ -202,6 +118,7 @@ class NotificationPreferencesView(APIView):
 
     def get(self, request):
         prefs = get_or_create_notification_preferences(request.user)
+        tier_level = Entitlements.for_request(request).tier_level
         data = []
         for p in prefs:
             cfg = NOTIFICATION_CATALOG.get(p.key, {})
@@ -211,7 +128,7 @@ class NotificationPreferencesView(APIView):
                     "title": cfg.get("title", p.key),
                     "enabled": bool(p.enabled),
                     "tier": p.tier,
-                    "locked": bool(_is_pref_locked(request.user, p.key)),
+                    "locked": bool(_is_pref_locked(request.user, p.key, tier_level=tier_level)),
                     "updated_at": p.updated_at,
                 }
             )
@@ -220,6 +137,7 @@ class NotificationPreferencesView(APIView):
     def patch(self, request):
         prefs = get_or_create_notification_preferences(request.user)
         by_key = {p.key: p for p in prefs}
+        tier_level = Entitlements.for_request(request).tier_level
         updates = request.data.get("updates") or []
         if not isinstance(updates, list):
             return Response({"detail": "صيغة updates غير صحيحة"}, status=status.HTTP_400_BAD_REQUEST)
@@ -231,7 +149,7 @@ class NotificationPreferencesView(APIView):
             key = (raw.get("key") or "").strip()
             if not key or key not in by_key:
                 continue
-            if _is_pref_locked(request.user, key):
+            if _is_pref_locked(request.user, key, tier_level=tier_level):
                 continue
             enabled = raw.get("enabled")
             if not isinstance(enabled, bool):
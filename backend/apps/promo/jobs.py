@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from django.conf import settings
+
+from apps.core.jobs import register_job
+
+from .services import expire_due_promos
+
+
+@register_job(
+    "promo.expire_promo_requests",
+    interval_seconds=getattr(settings, "PROMO_EXPIRY_JOB_INTERVAL_SECONDS", 300),
+)
+def expire_promo_requests(now):
+    expire_due_promos(now=now)
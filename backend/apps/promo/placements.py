@@ -0,0 +1,91 @@
+"""
+Cache for the public promo placement endpoints (home banners / active promos).
+
+The ranked, serialized list is stored per (endpoint, ad_type, city, category,
+limit, host) with apps.core.caching.get_or_build in the PLACEMENTS_CACHE_NAMESPACE
+namespace, which is bumped whenever a PromoRequest or PromoAsset is saved or
+deleted (activation, expiry via expire_promo_requests, edits; see
+promo.signals), so a change invalidates every placement at once.
+
+Each entry expires by itself at the next start_at / end_at boundary of any
+active promo (capped by PROMO_PLACEMENTS_CACHE_SECONDS). A promo that
+starts or ends on schedule therefore shows up or drops out without a write.
+
+Responses carry ETag / Last-Modified and answer conditional requests with 304.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.core.caching import get_or_build
+
+from .models import PromoRequest, PromoRequestStatus
+
+
+PLACEMENTS_CACHE_NAMESPACE = "promo:placements"
+
+
+def _seconds_to_next_boundary(now) -> int:
+    max_ttl = int(getattr(settings, "PROMO_PLACEMENTS_CACHE_SECONDS", 300))
+    agg = PromoRequest.objects.filter(status=PromoRequestStatus.ACTIVE).aggregate(
+        next_start=Min("start_at", filter=Q(start_at__gt=now)),
+        next_end=Min("end_at", filter=Q(end_at__gte=now)),
+    )
+    boundaries = [b for b in (agg["next_start"], agg["next_end"]) if b is not None]
+    if not boundaries:
+        return max_ttl
+    # end_at is inclusive in the public filters: expire just after it
+    seconds = math.ceil((min(boundaries) - now).total_seconds()) + 1
+    return max(1, min(seconds, max_ttl))
+
+
+def _not_modified(request, etag: str, last_modified: int) -> bool:
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        tags = {t.strip() for t in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE") or "")
+    return since is not None and last_modified <= since
+
+
+def placement_response(request, *, namespace: str, params: dict, build) -> Response:
+    """
+    Serve ``build()`` (the serialized, ranked list) from the placement cache,
+    honouring If-None-Match / If-Modified-Since.
+    """
+
+    def build_entry() -> dict:
+        now = timezone.now()
+        data = build()
+        body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+        return {
+            "data": data,
+            "etag": quote_etag(hashlib.sha1(body.encode("utf-8")).hexdigest()),
+            "last_modified": int(now.timestamp()),
+        }
+
+    entry = get_or_build(
+        PLACEMENTS_CACHE_NAMESPACE,
+        (namespace, request.build_absolute_uri("/"), params),
+        build_entry,
+        timeout=lambda entry: _seconds_to_next_boundary(timezone.now()),
+    )
+
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": http_date(entry["last_modified"]),
+        "Cache-Control": "public, max-age=0, must-revalidate",
+    }
+    if _not_modified(request, entry["etag"], entry["last_modified"]):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry["data"], status=status.HTTP_200_OK, headers=headers)
@@ -108,12 +108,12 @@ class PromoRequestCreateSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "code"]
 
     def validate(self, attrs):
-        from apps.features.checks import has_feature
+        from apps.features.entitlements import Entitlements
 
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if user is not None and user.is_authenticated:
-            if not has_feature(user, "promo_ads"):
+            if not Entitlements.for_request(request).has("promo_ads"):
                 raise serializers.ValidationError("ميزة الإعلانات (Promo) غير متاحة في باقتك الحالية.")
 
         start_at = attrs.get("start_at")
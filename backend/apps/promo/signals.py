@@ -4,10 +4,16 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from apps.billing.models import Invoice
-from .models import PromoRequest
+from apps.core.caching import invalidate_on_change
+from .models import PromoAsset, PromoRequest
+from .placements import PLACEMENTS_CACHE_NAMESPACE
 from .services import activate_after_payment
 
 
+# تفعيل / انتهاء (expire_promo_requests) / تعديل / أصول جديدة
+invalidate_on_change(PLACEMENTS_CACHE_NAMESPACE, PromoRequest, PromoAsset)
+
+
 @receiver(post_save, sender=Invoice)
 def activate_promo_on_invoice_paid(sender, instance: Invoice, created, **kwargs):
     if instance.status != "paid":
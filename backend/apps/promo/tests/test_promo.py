@@ -459,3 +459,43 @@ def test_public_active_promos_returns_targeting_and_assets(api, user):
     item = next(x for x in r.data if x.get("id") == pr_active.id)
     assert item.get("target_provider_id") == pp.id
     assert isinstance(item.get("assets"), list)
+
+
+def test_public_active_promos_served_from_cache_with_etag(api, user, django_assert_num_queries):
+    now = timezone.now()
+    pr = PromoRequest.objects.create(
+        requester=user,
+        title="cached placement",
+        ad_type="featured_top5",
+        start_at=now - timedelta(days=1),
+        end_at=now + timedelta(days=1),
+        frequency="60s",
+        position="normal",
+        target_city="الرياض",
+        status=PromoRequestStatus.ACTIVE,
+        activated_at=now,
+    )
+
+    url = "/api/promo/active/?ad_type=featured_top5&city=الرياض"
+    r1 = api.get(url)
+    assert r1.status_code == 200
+    assert [item["id"] for item in r1.data] == [pr.id]
+    etag = r1["ETag"]
+    assert r1["Last-Modified"]
+
+    with django_assert_num_queries(0):
+        r2 = api.get(url)
+    assert r2.status_code == 200
+    assert r2.data == r1.data
+
+    with django_assert_num_queries(0):
+        r3 = api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert r3.status_code == 304
+
+    # أي تعديل على الإعلان يُبطل القوائم المخزنة
+    pr.status = PromoRequestStatus.EXPIRED
+    pr.save(update_fields=["status"])
+    r4 = api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert r4.status_code == 200
+    assert r4.data == []
+    assert r4["ETag"] != etag
@@ -21,9 +21,20 @@ from .serializers import (
     PromoActivePlacementSerializer,
 )
 from .permissions import IsOwnerOrBackofficePromo
+from .placements import placement_response
 from .services import quote_and_create_invoice, reject_request, _sync_promo_to_unified
 
 
+def _parse_limit(raw, default: int, maximum: int) -> int | None:
+    if raw in (None, ""):
+        return None
+    try:
+        limit = int(raw)
+    except Exception:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
 def _position_rank_case(field_name: str = "position"):
     return Case(
         When(**{field_name: "first"}, then=Value(0)),
@@ -66,17 +77,21 @@ class PublicHomeBannersView(generics.ListAPIView):
             .order_by("_position_rank", "-request__activated_at", "-uploaded_at", "-id")
         )
 
-        limit_raw = self.request.query_params.get("limit")
-        if limit_raw not in (None, ""):
-            try:
-                limit = int(limit_raw)
-            except Exception:
-                limit = 6
-            limit = max(1, min(limit, 20))
+        limit = _parse_limit(self.request.query_params.get("limit"), 6, 20)
+        if limit is not None:
             qs = qs[:limit]
 
         return qs
 
+    def list(self, request, *args, **kwargs):
+        params = {"limit": _parse_limit(request.query_params.get("limit"), 6, 20)}
+        return placement_response(
+            request,
+            namespace="banners_home",
+            params=params,
+            build=lambda: self.get_serializer(self.get_queryset(), many=True).data,
+        )
+
 
 class PublicActivePromosView(generics.ListAPIView):
     """Public list of active promo placements.
@@ -117,17 +132,26 @@ class PublicActivePromosView(generics.ListAPIView):
         if category:
             qs = qs.filter(Q(target_category__iexact=category) | Q(target_category=""))
 
-        limit_raw = self.request.query_params.get("limit")
-        if limit_raw not in (None, ""):
-            try:
-                limit = int(limit_raw)
-            except Exception:
-                limit = 20
-            limit = max(1, min(limit, 50))
+        limit = _parse_limit(self.request.query_params.get("limit"), 20, 50)
+        if limit is not None:
             qs = qs[:limit]
 
         return qs
 
+    def list(self, request, *args, **kwargs):
+        params = {
+            "ad_type": (request.query_params.get("ad_type") or "").strip(),
+            "city": (request.query_params.get("city") or "").strip().lower(),
+            "category": (request.query_params.get("category") or "").strip().lower(),
+            "limit": _parse_limit(request.query_params.get("limit"), 20, 50),
+        }
+        return placement_response(
+            request,
+            namespace="active",
+            params=params,
+            build=lambda: self.get_serializer(self.get_queryset(), many=True).data,
+        )
+
 
 # ---------- Client ----------
 
@@ -177,13 +201,14 @@ class PromoAddAssetView(generics.CreateAPIView):
             return Response({"detail": "file مطلوب"}, status=status.HTTP_400_BAD_REQUEST)
 
         from django.core.exceptions import ValidationError as DjangoValidationError
+        from apps.features.entitlements import Entitlements
         from apps.features.upload_limits import user_max_upload_mb
         from apps.uploads.validators import validate_user_file_size
         from .validators import validate_extension
 
         try:
             validate_extension(file_obj)
-            validate_user_file_size(file_obj, user_max_upload_mb(request.user))
+            validate_user_file_size(file_obj, user_max_upload_mb(request.user, entitlements=Entitlements.for_request(request)))
         except DjangoValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -0,0 +1,29 @@
+"""
+Public category tree (categories with their subcategories) for the app.
+
+The serialized list is the same for every visitor, so it is cached with
+apps.core.caching in CATEGORIES_CACHE_NAMESPACE; providers.signals bumps the
+namespace whenever a Category or SubCategory is saved or deleted.
+"""
+from __future__ import annotations
+
+from apps.core.caching import get_or_build
+
+from .models import Category
+
+
+CATEGORIES_CACHE_NAMESPACE = "providers:categories"
+
+
+def active_categories_queryset():
+    return Category.objects.filter(is_active=True).prefetch_related("subcategories")
+
+
+def public_categories_payload() -> list:
+    return get_or_build(CATEGORIES_CACHE_NAMESPACE, ("list",), _build_public_categories_payload)
+
+
+def _build_public_categories_payload() -> list:
+    from .serializers import CategorySerializer
+
+    return list(CategorySerializer(active_categories_queryset(), many=True).data)
@@ -0,0 +1,136 @@
+"""
+Spatial bucketing for "nearby" provider lookups.
+
+Providers store a geohash of their lat/lng (ProviderProfile.geohash, indexed).
+A radius query is answered by:
+1. covering the circle's bounding box with at most ``max_cells`` geohash cells
+   of the finest precision that fits, and filtering ``geohash`` by those prefixes
+   (index range scans) plus the lat/lng bounding box;
+2. computing exact great-circle distances for the few surviving rows in Python.
+"""
+from __future__ import annotations
+
+import math
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_for(lat, lng) -> str:
+    """Geohash for a (possibly Decimal / None) coordinate pair; empty when unknown."""
+    if lat is None or lng is None:
+        return ""
+    return encode_geohash(float(lat), float(lng))
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return (
+        max(-90.0, lat - dlat),
+        min(90.0, lat + dlat),
+        max(-180.0, lng - dlng),
+        min(180.0, lng + dlng),
+    )
+
+
+def covering_cells(lat: float, lng: float, radius_km: float, *, max_cells: int = 32) -> list[str]:
+    """Geohash cells (finest precision with at most ``max_cells`` cells) covering the radius bbox."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_bits = (5 * precision) // 2
+        lng_bits = 5 * precision - lat_bits
+        cell_h = 180.0 / (1 << lat_bits)
+        cell_w = 360.0 / (1 << lng_bits)
+        i0 = int((min_lat + 90.0) // cell_h)
+        i1 = min(int((max_lat + 90.0) // cell_h), (1 << lat_bits) - 1)
+        j0 = int((min_lng + 180.0) // cell_w)
+        j1 = min(int((max_lng + 180.0) // cell_w), (1 << lng_bits) - 1)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > max_cells and precision > 1:
+            continue
+        return sorted(
+            {
+                encode_geohash(-90.0 + (i + 0.5) * cell_h, -180.0 + (j + 0.5) * cell_w, precision)
+                for i in range(i0, i1 + 1)
+                for j in range(j0, j1 + 1)
+            }
+        )
+    return []
+
+
+def nearby_q(lat: float, lng: float, radius_km: float, *, prefix: str = "") -> Q:
+    """Index-friendly pre-filter: geohash cell prefixes AND the lat/lng bounding box."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    cells = covering_cells(lat, lng, radius_km)
+    cell_q = reduce(or_, (Q(**{f"{prefix}geohash__startswith": cell}) for cell in cells))
+    return cell_q & Q(
+        **{
+            f"{prefix}lat__gte": min_lat,
+            f"{prefix}lat__lte": max_lat,
+            f"{prefix}lng__gte": min_lng,
+            f"{prefix}lng__lte": max_lng,
+        }
+    )
+
+
+def nearest_providers(qs, *, lat: float, lng: float, radius_km: float, limit: int | None = None) -> list:
+    """
+    Providers from ``qs`` within ``radius_km``, closest first, each carrying ``distance_km``.
+    """
+    results = []
+    for provider in qs.filter(nearby_q(lat, lng, radius_km)):
+        distance = haversine_km(lat, lng, float(provider.lat), float(provider.lng))
+        if distance <= radius_km:
+            provider.distance_km = round(distance, 2)
+            results.append(provider)
+    results.sort(key=lambda p: (p.distance_km, -p.id))
+    return results[:limit] if limit else results
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from apps.core.jobs import register_job
+
+from .media_pipeline import process_pending_media
+
+
+@register_job("providers.process_pending_media", interval_seconds=60, lock_seconds=900)
+def process_stale_pending_media(now):
+    # عناصر بقيت pending (إعادة تشغيل العامل قبل تنفيذ الطابور) — دفعة محدودة كل دورة
+    process_pending_media(created_before=now - timedelta(minutes=2), limit=20)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.providers.media_pipeline import process_pending_media
+from apps.providers.models import MediaProcessingStatus
+
+
+class Command(BaseCommand):
+    help = "Process portfolio/spotlight media (thumbnails, dimensions) for pending or failed items."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status",
+            action="append",
+            choices=[c.value for c in MediaProcessingStatus],
+            help="Statuses to process (repeatable). Default: pending.",
+        )
+        parser.add_argument("--limit", type=int, default=None, help="Max items to process.")
+
+    def handle(self, *args, **options):
+        statuses = options.get("status") or [MediaProcessingStatus.PENDING]
+        # processing/ready لا تُلتقط بدون force (عناصر عالقة أو إعادة توليد المقاسات)
+        force = any(s not in (MediaProcessingStatus.PENDING, MediaProcessingStatus.FAILED) for s in statuses)
+        done = process_pending_media(statuses=statuses, limit=options.get("limit"), force=force)
+        self.stdout.write(self.style.SUCCESS(f"Processed media items: {done}"))
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.providers.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuild the normalized ProviderSearchDocument rows for all providers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Providers per batch.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only create documents for providers that have none (rows inserted without signals).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, int(options.get("batch_size") or 500))
+        total = rebuild_search_documents(batch_size=batch_size, missing_only=options["missing"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search documents for {total} provider(s)."))
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.providers.models import ProviderProfile
+from apps.providers.stats import STAT_FIELDS, find_stat_drift
+
+
+class Command(BaseCommand):
+    help = "Reconcile stored ProviderProfile counters (followers, likes, following, completed requests) with real counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Apply corrections. Without this flag, command runs in dry-run mode.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per read chunk and per bulk update.",
+        )
+
+    def handle(self, *args, **options):
+        apply_changes = bool(options.get("apply"))
+        batch_size = max(1, int(options.get("batch_size") or 1000))
+
+        drifted = list(find_stat_drift(batch_size=batch_size))
+
+        mode = "APPLY" if apply_changes else "DRY-RUN"
+        self.stdout.write(f"[{mode}] providers with drifted counters: {len(drifted)}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All provider counters are in sync."))
+            return
+
+        preview_limit = 10
+        for provider_id, diff in drifted[:preview_limit]:
+            details = ", ".join(f"{field}: {stored} -> {actual}" for field, (stored, actual) in diff.items())
+            self.stdout.write(f" - provider={provider_id} {details}")
+        if len(drifted) > preview_limit:
+            self.stdout.write(f" ... and {len(drifted) - preview_limit} more providers")
+
+        if not apply_changes:
+            self.stdout.write(
+                self.style.WARNING("Dry-run only. Re-run with --apply to write corrected counters.")
+            )
+            return
+
+        with transaction.atomic():
+            for field in STAT_FIELDS:
+                batch = [
+                    ProviderProfile(id=provider_id, **{field: diff[field][1]})
+                    for provider_id, diff in drifted
+                    if field in diff
+                ]
+                if batch:
+                    ProviderProfile.objects.bulk_update(batch, [field], batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters for {len(drifted)} provider(s)."))
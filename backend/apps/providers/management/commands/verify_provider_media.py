@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.providers.media_pipeline import MEDIA_ITEM_MODELS, find_media_drift
+
+
+class Command(BaseCommand):
+    help = "Check portfolio/spotlight files against storage and fix stored availability flags and thumbnail variants."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Apply corrections. Without this flag, command runs in dry-run mode.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows per read chunk.",
+        )
+
+    def handle(self, *args, **options):
+        apply_changes = bool(options.get("apply"))
+        batch_size = max(1, int(options.get("batch_size") or 500))
+        mode = "APPLY" if apply_changes else "DRY-RUN"
+
+        total = 0
+        for label in MEDIA_ITEM_MODELS:
+            model = apps.get_model(label)
+            drifted = list(find_media_drift(model, batch_size=batch_size))
+            total += len(drifted)
+            self.stdout.write(f"[{mode}] {label}: items with drifted media state: {len(drifted)}")
+
+            preview_limit = 10
+            for pk, changes in drifted[:preview_limit]:
+                details = ", ".join(sorted(changes))
+                self.stdout.write(f" - id={pk} {details}")
+            if len(drifted) > preview_limit:
+                self.stdout.write(f" ... and {len(drifted) - preview_limit} more items")
+
+            if apply_changes and drifted:
+                with transaction.atomic():
+                    for pk, changes in drifted:
+                        model.objects.filter(pk=pk).update(**changes)
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("All provider media flags are in sync with storage."))
+        elif not apply_changes:
+            self.stdout.write(self.style.WARNING("Dry-run only. Re-run with --apply to write corrected flags."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Corrected media state for {total} item(s)."))
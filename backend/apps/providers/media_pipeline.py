@@ -0,0 +1,304 @@
+"""
+Queued processing for provider portfolio / spotlight uploads.
+
+The upload request only stores the original file and queues the item on the
+"media" background pool (sized to the CPU count, see BACKGROUND_TASK_POOLS).
+The worker then:
+- records width/height (and duration for videos, via ffprobe when available),
+- extracts a video poster (ffmpeg, or the generated fallback poster),
+- writes resized thumbnails in PROVIDER_MEDIA_THUMBNAIL_WIDTHS as WebP + JPEG,
+- sets processing_status so clients can poll the item until it is "ready".
+
+Items left pending (worker restart, lost queue) are picked up by the
+providers.process_pending_media job and the process_provider_media command.
+
+Serializers never stat storage: file_available / thumbnail_available are set
+here and on delete, and verify_provider_media reconciles them offline.
+"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from apps.core.background import run_after_commit_in
+
+from .media_thumbnails import (
+    _build_fallback_video_poster,
+    _thumbnail_storage_name,
+    _try_extract_frame_with_ffmpeg,
+)
+from .models import MediaProcessingStatus
+
+
+logger = logging.getLogger(__name__)
+
+MEDIA_POOL = "media"
+MEDIA_ITEM_MODELS = ("providers.ProviderPortfolioItem", "providers.ProviderSpotlightItem")
+
+
+def thumbnail_widths() -> tuple[int, ...]:
+    widths = getattr(settings, "PROVIDER_MEDIA_THUMBNAIL_WIDTHS", (320, 640, 1080))
+    return tuple(sorted({int(w) for w in widths if int(w) > 0})) or (320,)
+
+
+def enqueue_media_processing(item) -> None:
+    """Queue ``item`` for processing once the current transaction commits."""
+    run_after_commit_in(MEDIA_POOL, process_media_item, item._meta.label, item.pk)
+
+
+@contextmanager
+def _local_source(field_file):
+    """Local filesystem path for ``field_file`` (copied to a temp file for remote storages)."""
+    try:
+        path = field_file.path
+    except Exception:
+        path = None
+    if path and os.path.exists(path):
+        yield path
+        return
+
+    suffix = posixpath.splitext(field_file.name or "")[1]
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with field_file.storage.open(field_file.name, "rb") as src:
+            shutil.copyfileobj(src, tmp)
+        tmp.close()
+        yield tmp.name
+    finally:
+        tmp.close()
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+
+
+def _probe_video(path: str) -> dict:
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return {}
+    try:
+        proc = subprocess.run(
+            [
+                ffprobe,
+                "-v",
+                "error",
+                "-select_streams",
+                "v:0",
+                "-show_entries",
+                "stream=width,height:format=duration",
+                "-of",
+                "json",
+                path,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False,
+            timeout=30,
+        )
+        if proc.returncode != 0:
+            return {}
+        data = json.loads(proc.stdout or b"{}")
+    except Exception:
+        return {}
+
+    stream = (data.get("streams") or [{}])[0]
+    meta = {}
+    if stream.get("width") and stream.get("height"):
+        meta["width"] = int(stream["width"])
+        meta["height"] = int(stream["height"])
+    try:
+        meta["duration_seconds"] = round(float((data.get("format") or {})["duration"]), 3)
+    except (KeyError, TypeError, ValueError):
+        pass
+    return meta
+
+
+def _variant_name(original_name: str, width: int, ext: str) -> str:
+    thumb = _thumbnail_storage_name(original_name)
+    return f"{posixpath.splitext(thumb)[0][: -len('_thumb')]}_{width}.{ext}"
+
+
+def _save_variants(storage, original_name: str, image: Image.Image) -> dict:
+    """Resize ``image`` to each configured width (never upscaling) and store WebP + JPEG."""
+    src_w, src_h = image.size
+    widths = [w for w in thumbnail_widths() if w <= src_w] or [src_w]
+
+    if image.mode in ("RGBA", "LA", "P"):
+        rgba = image.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+    else:
+        rgba = None
+        flat = image.convert("RGB")
+
+    variants = {}
+    for width in widths:
+        height = max(1, round(src_h * width / src_w))
+        resized = flat.resize((width, height), Image.LANCZOS)
+        jpeg = io.BytesIO()
+        resized.save(jpeg, format="JPEG", quality=82, optimize=True, progressive=True)
+        webp = io.BytesIO()
+        (rgba.resize((width, height), Image.LANCZOS) if rgba is not None else resized).save(
+            webp, format="WEBP", quality=80, method=4
+        )
+        variants[str(width)] = {
+            "webp": storage.save(_variant_name(original_name, width, "webp"), ContentFile(webp.getvalue())),
+            "jpeg": storage.save(_variant_name(original_name, width, "jpg"), ContentFile(jpeg.getvalue())),
+        }
+    return variants
+
+
+def delete_media_variants(storage, variants: dict) -> None:
+    for formats in (variants or {}).values():
+        for name in (formats or {}).values():
+            if not name:
+                continue
+            try:
+                storage.delete(name)
+            except Exception:
+                pass
+
+
+def _process(item) -> dict:
+    storage = item.file.storage
+    original_name = item.file.name
+    fields: dict = {"width": None, "height": None, "duration_seconds": None}
+
+    with _local_source(item.file) as path:
+        if item.file_type == "video":
+            fields.update(_probe_video(path))
+            frame = _try_extract_frame_with_ffmpeg(path)
+            poster_bytes = frame or _build_fallback_video_poster()
+            poster = Image.open(io.BytesIO(poster_bytes))
+            poster.load()
+            if frame and not fields["width"]:
+                fields["width"], fields["height"] = poster.size
+            fields["thumbnail"] = storage.save(_thumbnail_storage_name(original_name), ContentFile(poster_bytes))
+            fields["thumbnail_variants"] = _save_variants(storage, original_name, poster)
+        else:
+            with Image.open(path) as opened:
+                image = ImageOps.exif_transpose(opened)
+                image.load()
+            fields["width"], fields["height"] = image.size
+            fields["thumbnail_variants"] = _save_variants(storage, original_name, image)
+            # المصغرة القديمة (thumbnail) = أوسط مقاس JPEG للتوافق مع العملاء الحاليين
+            sizes = sorted(fields["thumbnail_variants"], key=int)
+            fields["thumbnail"] = fields["thumbnail_variants"][sizes[len(sizes) // 2]]["jpeg"]
+    return fields
+
+
+def process_media_item(model_label: str, pk: int, *, force: bool = False) -> bool:
+    """
+    Process one portfolio/spotlight item. Safe to call from several workers:
+    the item is claimed with a conditional UPDATE. Never raises.
+    """
+    model = apps.get_model(model_label)
+    claimable = [MediaProcessingStatus.PENDING, MediaProcessingStatus.FAILED]
+    qs = model.objects.filter(pk=pk)
+    if not force:
+        qs = qs.filter(processing_status__in=claimable)
+    if not qs.update(processing_status=MediaProcessingStatus.PROCESSING, processing_error=""):
+        return False
+
+    item = model.objects.filter(pk=pk).first()
+    if item is None:
+        return False
+    old_thumbnail = item.thumbnail.name if item.thumbnail else ""
+    old_variants = item.thumbnail_variants or {}
+
+    try:
+        if not item.file:
+            raise FileNotFoundError("missing file")
+        fields = _process(item)
+    except Exception as exc:
+        logger.exception("media processing failed for %s #%s", model_label, pk)
+        failed = {"processing_status": MediaProcessingStatus.FAILED, "processing_error": str(exc)[:255]}
+        if isinstance(exc, FileNotFoundError):
+            failed["file_available"] = False
+        model.objects.filter(pk=pk).update(**failed)
+        return False
+    fields.update(file_available=True, thumbnail_available=True)
+
+    updated = model.objects.filter(pk=pk).update(
+        processing_status=MediaProcessingStatus.READY,
+        processing_error="",
+        **fields,
+    )
+    storage = item.file.storage
+    if not updated:
+        # حُذف العنصر أثناء المعالجة
+        delete_media_variants(storage, {"": {"thumbnail": fields.get("thumbnail")}, **fields["thumbnail_variants"]})
+        return False
+
+    if old_thumbnail and old_thumbnail != fields.get("thumbnail"):
+        old_variants = {**old_variants, "": {"thumbnail": old_thumbnail}}
+    delete_media_variants(storage, old_variants)
+    return True
+
+
+def delete_item_media(storage, file_name: str, thumbnail_name: str, variants: dict) -> None:
+    """Remove an item's original, thumbnail and variants from storage (best effort)."""
+    delete_media_variants(storage, {**(variants or {}), "": {"file": file_name, "thumbnail": thumbnail_name}})
+
+
+def _storage_has(storage, name: str) -> bool:
+    try:
+        return bool(name) and storage.exists(name)
+    except Exception:
+        return False
+
+
+def find_media_drift(model, *, batch_size: int = 500):
+    """
+    Yield ``(pk, changes)`` for items whose stored availability flags or
+    thumbnail_variants disagree with what actually exists in storage.
+    This is the only place (besides processing) that touches storage per item.
+    """
+    qs = model.objects.only("id", "file", "thumbnail", "thumbnail_variants", "file_available", "thumbnail_available")
+    for item in qs.order_by("id").iterator(chunk_size=batch_size):
+        storage = item.file.storage
+        changes = {}
+        file_ok = _storage_has(storage, item.file.name)
+        thumb_ok = _storage_has(storage, item.thumbnail.name if item.thumbnail else "")
+        if file_ok != item.file_available:
+            changes["file_available"] = file_ok
+        if bool(item.thumbnail) and thumb_ok != item.thumbnail_available:
+            changes["thumbnail_available"] = thumb_ok
+
+        variants = {}
+        for width, formats in (item.thumbnail_variants or {}).items():
+            kept = {fmt: name for fmt, name in (formats or {}).items() if _storage_has(storage, name)}
+            if kept:
+                variants[width] = kept
+        if variants != (item.thumbnail_variants or {}):
+            changes["thumbnail_variants"] = variants
+
+        if changes:
+            yield item.pk, changes
+
+
+def process_pending_media(*, statuses=(MediaProcessingStatus.PENDING,), created_before=None, limit=None, force=False) -> int:
+    """Process items in ``statuses`` (oldest first) synchronously. Returns how many became ready."""
+    done = 0
+    for label in MEDIA_ITEM_MODELS:
+        qs = apps.get_model(label).objects.filter(processing_status__in=list(statuses))
+        if created_before is not None:
+            qs = qs.filter(created_at__lt=created_before)
+        ids = qs.order_by("id").values_list("id", flat=True)
+        if limit is not None:
+            ids = ids[: max(0, limit - done)]
+        for pk in list(ids):
+            done += int(process_media_item(label, pk, force=force))
+    return done
@@ -6,8 +6,6 @@ import subprocess
 import tempfile
 from typing import Optional
 
-from django.core.files.base import ContentFile
-
 from PIL import Image, ImageDraw
 
 
@@ -98,44 +96,3 @@ def _build_fallback_video_poster() -> bytes:
     out = io.BytesIO()
     image.save(out, format="JPEG", quality=88, optimize=True)
     return out.getvalue()
-
-
-def ensure_video_thumbnail(instance, *, force: bool = False) -> bool:
-    """Best-effort thumbnail generation for ProviderPortfolio/Spotlight video items.
-
-    Returns True when a thumbnail is saved, otherwise False.
-    Never raises to avoid breaking upload flows.
-    """
-    try:
-        if getattr(instance, "file_type", None) != "video":
-            return False
-        if not getattr(instance, "file", None):
-            return False
-        thumb_field = getattr(instance, "thumbnail", None)
-        if thumb_field is None:
-            return False
-        if getattr(thumb_field, "name", "") and not force:
-            return False
-
-        src_path = None
-        try:
-            src_path = instance.file.path
-        except Exception:
-            src_path = None
-
-        payload = _try_extract_frame_with_ffmpeg(src_path) or _build_fallback_video_poster()
-        if not payload:
-            return False
-
-        storage_name = _thumbnail_storage_name(getattr(instance.file, "name", ""))
-        if getattr(thumb_field, "name", "") and thumb_field.name != storage_name:
-            try:
-                thumb_field.delete(save=False)
-            except Exception:
-                pass
-        thumb_field.save(storage_name, ContentFile(payload), save=False)
-        instance.save(update_fields=["thumbnail"])
-        return True
-    except Exception:
-        return False
-
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(qs, group_field):
+    counted = qs.order_by().values(group_field).annotate(c=Count("id")).values("c")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    ProviderProfile = apps.get_model("providers", "ProviderProfile")
+    ProviderFollow = apps.get_model("providers", "ProviderFollow")
+    ProviderLike = apps.get_model("providers", "ProviderLike")
+    ServiceRequest = apps.get_model("marketplace", "ServiceRequest")
+
+    ProviderProfile.objects.update(
+        followers_count=_count(ProviderFollow.objects.filter(provider_id=OuterRef("pk")), "provider_id"),
+        likes_count=_count(ProviderLike.objects.filter(provider_id=OuterRef("pk")), "provider_id"),
+        following_count=_count(ProviderFollow.objects.filter(user_id=OuterRef("user_id")), "user_id"),
+        completed_requests_count=_count(
+            ServiceRequest.objects.filter(provider_id=OuterRef("pk"), status="completed"),
+            "provider_id",
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("providers", "0012_providerspotlightlike"),
+        ("marketplace", "0009_unify_lifecycle_and_quote_deadline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="providerprofile",
+            name="followers_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="providerprofile",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="providerprofile",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="providerprofile",
+            name="completed_requests_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
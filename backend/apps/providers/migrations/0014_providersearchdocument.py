@@ -0,0 +1,128 @@
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+TRGM_INDEXES = (
+    ("providers_search_doc_trgm", "document"),
+    ("providers_search_city_trgm", "city"),
+)
+
+
+# نسخة مجمّدة من apps.providers.search وقت كتابة الترحيل: تعديل المُطبِّع لاحقًا
+# لا يغيّر ما يفعله هذا الترحيل (الوثائق تُعاد بناؤها بـ rebuild_provider_search)
+_DIACRITICS_RE = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+_FOLD = str.maketrans(
+    {
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        "ى": "ي",
+        "ئ": "ي",
+        "ؤ": "و",
+        "ة": "ه",
+        **{chr(0x0660 + d): str(d) for d in range(10)},
+        **{chr(0x06F0 + d): str(d) for d in range(10)},
+    }
+)
+
+
+def normalize_search_text(text):
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _DIACRITICS_RE.sub("", text).translate(_FOLD).lower()
+    text = _NON_WORD_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def build_document_text(*, name, city, bio, service_titles):
+    parts = [name, city, bio, *service_titles]
+    return " ".join(p for p in (normalize_search_text(part) for part in parts) if p)
+
+
+def backfill_search_documents(apps, schema_editor):
+    ProviderProfile = apps.get_model("providers", "ProviderProfile")
+    ProviderService = apps.get_model("providers", "ProviderService")
+    ProviderSearchDocument = apps.get_model("providers", "ProviderSearchDocument")
+
+    titles = {}
+    for provider_id, title in (
+        ProviderService.objects.filter(is_active=True).order_by("provider_id", "id").values_list("provider_id", "title")
+    ):
+        titles.setdefault(provider_id, []).append(title)
+
+    now = timezone.now()
+    batch = []
+    for p in ProviderProfile.objects.order_by("id").values("id", "display_name", "city", "bio").iterator():
+        batch.append(
+            ProviderSearchDocument(
+                provider_id=p["id"],
+                name=normalize_search_text(p["display_name"])[:150],
+                city=normalize_search_text(p["city"])[:100],
+                document=build_document_text(
+                    name=p["display_name"],
+                    city=p["city"],
+                    bio=p["bio"],
+                    service_titles=titles.get(p["id"], []),
+                ),
+                updated_at=now,
+            )
+        )
+        if len(batch) >= 500:
+            ProviderSearchDocument.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ProviderSearchDocument.objects.bulk_create(batch)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = "providers_providersearchdocument"
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in TRGM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("providers", "0013_providerprofile_stat_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProviderSearchDocument",
+            fields=[
+                (
+                    "provider",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_doc",
+                        serialize=False,
+                        to="providers.providerprofile",
+                    ),
+                ),
+                ("name", models.CharField(blank=True, default="", max_length=150)),
+                ("city", models.CharField(blank=True, default="", max_length=100)),
+                ("document", models.TextField(blank=True, default="")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
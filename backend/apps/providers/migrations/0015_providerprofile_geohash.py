@@ -0,0 +1,75 @@
+from django.db import migrations, models
+
+
+# نسخة مجمّدة من apps.providers.geo وقت كتابة الترحيل: تعديل المُرمِّز لاحقًا
+# لا يغيّر ما يفعله هذا الترحيل
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat, lng, precision=9):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_for(lat, lng):
+    if lat is None or lng is None:
+        return ""
+    return encode_geohash(float(lat), float(lng))
+
+
+def backfill_geohash(apps, schema_editor):
+    ProviderProfile = apps.get_model("providers", "ProviderProfile")
+    batch = []
+    qs = ProviderProfile.objects.exclude(lat__isnull=True).exclude(lng__isnull=True).only("id", "lat", "lng")
+    for profile in qs.iterator():
+        profile.geohash = geohash_for(profile.lat, profile.lng)
+        batch.append(profile)
+        if len(batch) >= 500:
+            ProviderProfile.objects.bulk_update(batch, ["geohash"])
+            batch = []
+    if batch:
+        ProviderProfile.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("providers", "0014_providersearchdocument"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="providerprofile",
+            name="geohash",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
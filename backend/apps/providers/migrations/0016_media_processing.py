@@ -0,0 +1,78 @@
+from django.db import migrations, models
+
+
+def mark_existing_items_ready(apps, schema_editor):
+    # المكتبة القائمة عُرضت من قبل بمصغّراتها الحالية: لا تُعرض "بانتظار المعالجة" ولا يُعاد توليدها
+    for model_name in ("ProviderPortfolioItem", "ProviderSpotlightItem"):
+        apps.get_model("providers", model_name).objects.update(processing_status="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("providers", "0015_providerprofile_geohash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="processing_status",
+            field=models.CharField(choices=[("pending", "بانتظار المعالجة"), ("processing", "قيد المعالجة"), ("ready", "جاهز"), ("failed", "فشلت المعالجة")], default="pending", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="processing_error",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="duration_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="thumbnail_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="processing_status",
+            field=models.CharField(choices=[("pending", "بانتظار المعالجة"), ("processing", "قيد المعالجة"), ("ready", "جاهز"), ("failed", "فشلت المعالجة")], default="pending", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="processing_error",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="width",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="height",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="duration_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="thumbnail_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(mark_existing_items_ready, migrations.RunPython.noop),
+    ]
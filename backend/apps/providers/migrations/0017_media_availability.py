@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("providers", "0016_media_processing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="file_available",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="thumbnail_available",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="file_available",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="thumbnail_available",
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(qs, group_field):
+    counted = qs.order_by().values(group_field).annotate(c=Count("id")).values("c")
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    for item_model, like_model, save_model in (
+        ("ProviderPortfolioItem", "ProviderPortfolioLike", "ProviderPortfolioSave"),
+        ("ProviderSpotlightItem", "ProviderSpotlightLike", "ProviderSpotlightSave"),
+    ):
+        Item = apps.get_model("providers", item_model)
+        Like = apps.get_model("providers", like_model)
+        Save = apps.get_model("providers", save_model)
+        Item.objects.update(
+            likes_count=_count(Like.objects.filter(item_id=OuterRef("pk")), "item_id"),
+            saves_count=_count(Save.objects.filter(item_id=OuterRef("pk")), "item_id"),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("providers", "0017_media_availability"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="providerportfolioitem",
+            name="saves_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="providerspotlightitem",
+            name="saves_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,9 @@ from django.utils import timezone
 
 from apps.accounts.models import User
 
+from .geo import geohash_for
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
@@ -55,6 +58,8 @@ class ProviderProfile(models.Model):
     lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     coverage_radius_km = models.PositiveIntegerField(default=10)
+    # خلية geohash لموقع المزود (بحث "بالقرب مني" وتوزيع الطلبات العاجلة)، تُحسب في save()
+    geohash = models.CharField(max_length=12, blank=True, default="", db_index=True)
 
     about_details = models.TextField(blank=True, default="")
     qualifications = models.JSONField(default=list, blank=True)
@@ -76,13 +81,33 @@ class ProviderProfile(models.Model):
     )
     rating_count = models.PositiveIntegerField(default=0)
 
+    # عدادات مخزنة (تُحدّث من signals، وتُصحح عبر reconcile_provider_stats)
+    followers_count = models.PositiveIntegerField(default=0)
+    likes_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    completed_requests_count = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.lat, self.lng)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"lat", "lng"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return self.display_name
 
 
+class MediaProcessingStatus(models.TextChoices):
+    PENDING = "pending", "بانتظار المعالجة"
+    PROCESSING = "processing", "قيد المعالجة"
+    READY = "ready", "جاهز"
+    FAILED = "failed", "فشلت المعالجة"
+
+
 class ProviderPortfolioItem(models.Model):
     FILE_TYPE_CHOICES = (
         ("image", "صورة"),
@@ -98,6 +123,25 @@ class ProviderPortfolioItem(models.Model):
     file = models.FileField(upload_to="providers/portfolio/%Y/%m/")
     thumbnail = models.ImageField(upload_to="providers/portfolio/%Y/%m/thumbs/", null=True, blank=True)
     caption = models.CharField(max_length=200, blank=True, default="")
+    # خط معالجة الوسائط (providers.media_pipeline): الحالة + الأبعاد/المدة + مصغرات بعدة مقاسات
+    processing_status = models.CharField(
+        max_length=20,
+        choices=MediaProcessingStatus.choices,
+        default=MediaProcessingStatus.PENDING,
+    )
+    processing_error = models.CharField(max_length=255, blank=True, default="")
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    # {"320": {"webp": "<name>", "jpeg": "<name>"}, ...}
+    thumbnail_variants = models.JSONField(default=dict, blank=True)
+    # سجل توفر الملفات في التخزين: يحدّثه الرفع/المعالجة/الحذف وأمر verify_provider_media
+    # حتى لا يستدعي التسلسل storage.exists() لكل عنصر
+    file_available = models.BooleanField(default=True)
+    thumbnail_available = models.BooleanField(default=True)
+    # عدادات مخزنة تُحدَّث بإشارات الإعجاب/الحفظ (providers.signals)
+    likes_count = models.PositiveIntegerField(default=0)
+    saves_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self) -> str:
@@ -119,6 +163,25 @@ class ProviderSpotlightItem(models.Model):
     file = models.FileField(upload_to="providers/spotlights/%Y/%m/")
     thumbnail = models.ImageField(upload_to="providers/spotlights/%Y/%m/thumbs/", null=True, blank=True)
     caption = models.CharField(max_length=200, blank=True, default="")
+    # خط معالجة الوسائط (providers.media_pipeline): الحالة + الأبعاد/المدة + مصغرات بعدة مقاسات
+    processing_status = models.CharField(
+        max_length=20,
+        choices=MediaProcessingStatus.choices,
+        default=MediaProcessingStatus.PENDING,
+    )
+    processing_error = models.CharField(max_length=255, blank=True, default="")
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    # {"320": {"webp": "<name>", "jpeg": "<name>"}, ...}
+    thumbnail_variants = models.JSONField(default=dict, blank=True)
+    # سجل توفر الملفات في التخزين: يحدّثه الرفع/المعالجة/الحذف وأمر verify_provider_media
+    # حتى لا يستدعي التسلسل storage.exists() لكل عنصر
+    file_available = models.BooleanField(default=True)
+    thumbnail_available = models.BooleanField(default=True)
+    # عدادات مخزنة تُحدَّث بإشارات الإعجاب/الحفظ (providers.signals)
+    likes_count = models.PositiveIntegerField(default=0)
+    saves_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self) -> str:
@@ -291,3 +354,25 @@ class ProviderLike(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "provider"], name="uniq_like_user_provider"),
         ]
+
+
+class ProviderSearchDocument(models.Model):
+    """
+    نص بحث مُطبّع (عربي) لكل مزود: الاسم + المدينة + النبذة + عناوين الخدمات.
+    يُحدّث من providers.signals ويُبنى بالكامل عبر rebuild_provider_search.
+    على PostgreSQL يوجد فهرس trigram (GIN) على document و city.
+    """
+
+    provider = models.OneToOneField(
+        ProviderProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_doc",
+    )
+    name = models.CharField(max_length=150, blank=True, default="")
+    city = models.CharField(max_length=100, blank=True, default="")
+    document = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.provider_id} - {self.name}"
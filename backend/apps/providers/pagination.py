@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProviderSearchCursorPagination(CursorPagination):
+    """Keyset pagination over the unique ``search_key`` annotated by providers.search."""
+
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+    ordering = ("-search_key",)
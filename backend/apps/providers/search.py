@@ -0,0 +1,170 @@
+"""
+Provider discovery search.
+
+Every provider has a ProviderSearchDocument holding Arabic-normalized text
+(diacritics and tatweel stripped, alef / ya / ta-marbuta folded, lower-cased)
+built from name, city, bio and active service titles. Queries are normalized
+the same way and matched token by token with ``contains``; on PostgreSQL that
+LIKE is served by a pg_trgm GIN index, on SQLite it is a plain scan over one
+narrow table.
+
+Results are ranked (name prefix > name > city > rest of the document) and
+carry a unique ``search_key`` so the list can be keyset-paginated.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from django.db.models import BigIntegerField, Case, ExpressionWrapper, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import ProviderProfile, ProviderSearchDocument, ProviderService
+
+
+# حركات التشكيل + علامات قرآنية + التطويل
+_DIACRITICS_RE = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+_FOLD = str.maketrans(
+    {
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        "ى": "ي",
+        "ئ": "ي",
+        "ؤ": "و",
+        "ة": "ه",
+        **{chr(0x0660 + d): str(d) for d in range(10)},
+        **{chr(0x06F0 + d): str(d) for d in range(10)},
+    }
+)
+
+# rank * RANK_STRIDE + id: مفتاح فريد ومرتب للترقيم بالمؤشر
+RANK_STRIDE = 10**12
+
+
+def normalize_search_text(text: str | None) -> str:
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _DIACRITICS_RE.sub("", text).translate(_FOLD).lower()
+    text = _NON_WORD_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def build_document_text(*, name: str, city: str, bio: str, service_titles) -> str:
+    parts = [name, city, bio, *service_titles]
+    return " ".join(p for p in (normalize_search_text(part) for part in parts) if p)
+
+
+def refresh_search_document(provider_id: int, *, create: bool = True) -> None:
+    """
+    Rebuild one provider's document. ``create=False`` only updates an existing
+    row (used from delete cascades, where the provider itself may be going away).
+    """
+    row = (
+        ProviderProfile.objects.filter(id=provider_id)
+        .values("display_name", "city", "bio")
+        .first()
+    )
+    if row is None:
+        return
+    titles = list(
+        ProviderService.objects.filter(provider_id=provider_id, is_active=True)
+        .order_by("id")
+        .values_list("title", flat=True)
+    )
+    values = {
+        "name": normalize_search_text(row["display_name"])[:150],
+        "city": normalize_search_text(row["city"])[:100],
+        "document": build_document_text(
+            name=row["display_name"], city=row["city"], bio=row["bio"], service_titles=titles
+        ),
+    }
+    if create:
+        ProviderSearchDocument.objects.update_or_create(provider_id=provider_id, defaults=values)
+    else:
+        ProviderSearchDocument.objects.filter(provider_id=provider_id).update(**values)
+
+
+def rebuild_search_documents(*, batch_size: int = 500, missing_only: bool = False) -> int:
+    """
+    Rebuild every provider document in batches (bulk create + bulk update);
+    ``missing_only`` only creates the documents of profiles that have none.
+    """
+    total = 0
+    last_id = 0
+    base = ProviderProfile.objects.filter(search_doc__isnull=True) if missing_only else ProviderProfile.objects.all()
+    while True:
+        profiles = list(
+            base.filter(id__gt=last_id)
+            .order_by("id")
+            .values("id", "display_name", "city", "bio")[:batch_size]
+        )
+        if not profiles:
+            return total
+        last_id = profiles[-1]["id"]
+        ids = [p["id"] for p in profiles]
+
+        titles: dict[int, list[str]] = {pid: [] for pid in ids}
+        for pid, title in (
+            ProviderService.objects.filter(provider_id__in=ids, is_active=True)
+            .order_by("provider_id", "id")
+            .values_list("provider_id", "title")
+        ):
+            titles[pid].append(title)
+
+        now = timezone.now()
+        docs = [
+            ProviderSearchDocument(
+                provider_id=p["id"],
+                name=normalize_search_text(p["display_name"])[:150],
+                city=normalize_search_text(p["city"])[:100],
+                document=build_document_text(
+                    name=p["display_name"], city=p["city"], bio=p["bio"], service_titles=titles[p["id"]]
+                ),
+                updated_at=now,
+            )
+            for p in profiles
+        ]
+        existing = set(
+            ProviderSearchDocument.objects.filter(provider_id__in=ids).values_list("provider_id", flat=True)
+        )
+        ProviderSearchDocument.objects.bulk_create([d for d in docs if d.provider_id not in existing])
+        ProviderSearchDocument.objects.bulk_update(
+            [d for d in docs if d.provider_id in existing],
+            ["name", "city", "document", "updated_at"],
+        )
+        total += len(docs)
+
+
+def apply_provider_search(qs, *, q: str = "", city: str = ""):
+    """
+    Filter a ProviderProfile queryset by the normalized query/city and annotate
+    ``search_rank`` and the unique keyset ``search_key`` (``id`` when there is no query).
+    """
+    tokens = normalize_search_text(q).split()
+    city_norm = normalize_search_text(city)
+    # على وثيقة البحث وحدها حتى يخدمها فهرس pg_trgm؛ كل ملف له وثيقة
+    # (ترحيل 0014 + signal الحفظ + rebuild_provider_search --missing لما أُدرج دون signals)
+    for token in tokens:
+        qs = qs.filter(search_doc__document__contains=token)
+    if city_norm:
+        qs = qs.filter(search_doc__city__contains=city_norm)
+
+    if not tokens:
+        return qs.annotate(search_rank=Value(0, output_field=IntegerField()), search_key=F("id"))
+
+    phrase = " ".join(tokens)
+    rank = Case(
+        When(search_doc__name__startswith=phrase, then=Value(3)),
+        When(search_doc__name__contains=phrase, then=Value(2)),
+        When(search_doc__city__contains=phrase, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return qs.annotate(search_rank=rank).annotate(
+        search_key=ExpressionWrapper(
+            F("search_rank") * Value(RANK_STRIDE) + F("id"),
+            output_field=BigIntegerField(),
+        )
+    )
@@ -1,3 +1,5 @@
+from django.db import models
+from django.db.models import CharField, Value
 from rest_framework import serializers
 
 from apps.accounts.models import User
@@ -12,6 +14,69 @@ from .models import (
 )
 
 
+def media_variant_urls(obj) -> dict:
+    """{width: {"webp": url, "jpeg": url}} from the stored thumbnail_variants (no storage I/O)."""
+    variants = getattr(obj, "thumbnail_variants", None) or {}
+    storage = obj.file.storage
+    out = {}
+    for width, formats in variants.items():
+        try:
+            out[width] = {fmt: storage.url(name) for fmt, name in (formats or {}).items() if name}
+        except Exception:
+            continue
+    return out
+
+
+def viewer_reactions(items, request) -> dict:
+    """
+    {"likes": {item_id}, "saves": {item_id}} for the requesting user over ``items``
+    (portfolio or spotlight), resolved with a single UNION query.
+    """
+    reactions = {"likes": set(), "saves": set()}
+    user = getattr(request, "user", None)
+    if not items or not getattr(user, "is_authenticated", False):
+        return reactions
+
+    model = type(items[0])
+    ids = [item.pk for item in items]
+    rows = (
+        model.likes.field.model.objects.filter(user_id=user.id, item_id__in=ids)
+        .annotate(kind=Value("likes", output_field=CharField()))
+        .values_list("item_id", "kind")
+        .union(
+            model.saves.field.model.objects.filter(user_id=user.id, item_id__in=ids)
+            .annotate(kind=Value("saves", output_field=CharField()))
+            .values_list("item_id", "kind")
+        )
+    )
+    for item_id, kind in rows:
+        reactions[kind].add(item_id)
+    return reactions
+
+
+class MediaItemListSerializer(serializers.ListSerializer):
+    """Resolves liked_by_me / saved_by_me for the whole page at once."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child._viewer_reactions = viewer_reactions(items, self.context.get("request"))
+        return super().to_representation(items)
+
+
+class MediaItemReactionsMixin:
+    def _reacted(self, obj, kind: str) -> bool:
+        reactions = getattr(self, "_viewer_reactions", None)
+        if reactions is None:
+            reactions = self._viewer_reactions = viewer_reactions([obj], self.context.get("request"))
+        return obj.pk in reactions[kind]
+
+    def get_liked_by_me(self, obj):
+        return self._reacted(obj, "likes")
+
+    def get_saved_by_me(self, obj):
+        return self._reacted(obj, "saves")
+
+
 class SubCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = SubCategory
@@ -37,7 +102,15 @@ class ProviderProfileSerializer(serializers.ModelSerializer):
 	class Meta:
 		model = ProviderProfile
 		fields = "__all__"
-		read_only_fields = ("user", "is_verified_blue", "is_verified_green")
+		read_only_fields = (
+			"user",
+			"is_verified_blue",
+			"is_verified_green",
+			"followers_count",
+			"likes_count",
+			"following_count",
+			"completed_requests_count",
+		)
 
 	def create(self, validated_data):
 		subcategory_ids = validated_data.pop("subcategory_ids", [])
@@ -108,10 +181,9 @@ class ProviderProfileMeSerializer(serializers.ModelSerializer):
 
 
 class ProviderPublicSerializer(serializers.ModelSerializer):
-    followers_count = serializers.IntegerField(read_only=True)
-    likes_count = serializers.IntegerField(read_only=True)
-    completed_requests = serializers.IntegerField(read_only=True, required=False)
-    following_count = serializers.SerializerMethodField()
+    completed_requests = serializers.IntegerField(source="completed_requests_count", read_only=True)
+    # يظهر فقط في وضع "بالقرب مني" (providers.geo.nearest_providers)
+    distance_km = serializers.FloatField(read_only=True)
     phone = serializers.CharField(source="user.phone", read_only=True)
 
     class Meta:
@@ -138,24 +210,20 @@ class ProviderPublicSerializer(serializers.ModelSerializer):
             "likes_count",
             "following_count",
             "completed_requests",
+            "distance_km",
         )
-
-    def get_following_count(self, obj):
-        # Count providers this provider's user follows (if any)
-        try:
-            return obj.user.provider_follows.count()
-        except Exception:
-            return 0
+        read_only_fields = ("followers_count", "likes_count", "following_count")
 
 
-class ProviderPortfolioItemSerializer(serializers.ModelSerializer):
+class ProviderPortfolioItemSerializer(MediaItemReactionsMixin, serializers.ModelSerializer):
     provider_id = serializers.IntegerField(source="provider.id", read_only=True)
     provider_display_name = serializers.CharField(source="provider.display_name", read_only=True)
     provider_username = serializers.CharField(source="provider.user.username", read_only=True)
     file_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    saves_count = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
+    saved_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = ProviderPortfolioItem
@@ -167,43 +235,42 @@ class ProviderPortfolioItemSerializer(serializers.ModelSerializer):
             "file_type",
             "file_url",
             "thumbnail_url",
+            "thumbnails",
+            "processing_status",
+            "width",
+            "height",
+            "duration_seconds",
             "caption",
             "likes_count",
             "saves_count",
+            "liked_by_me",
+            "saved_by_me",
             "created_at",
         )
+        read_only_fields = ("likes_count", "saves_count")
+        list_serializer_class = MediaItemListSerializer
 
     @staticmethod
-    def _safe_file_url(field_file):
-        if not field_file:
+    def _safe_file_url(field_file, available=True):
+        # التوفر من الأعلام المخزنة (file_available/thumbnail_available) بدل storage.exists()
+        if not field_file or not available:
             return ""
         try:
             name = (field_file.name or "").strip()
             if not name:
                 return ""
-            if not field_file.storage.exists(name):
-                return ""
             return field_file.url
         except Exception:
             return ""
 
     def get_file_url(self, obj):
-        return self._safe_file_url(getattr(obj, "file", None))
+        return self._safe_file_url(getattr(obj, "file", None), getattr(obj, "file_available", True))
 
     def get_thumbnail_url(self, obj):
-        return self._safe_file_url(getattr(obj, "thumbnail", None))
-
-    def get_likes_count(self, obj):
-        try:
-            return int(getattr(obj, "likes_count", None) or obj.likes.count())
-        except Exception:
-            return 0
+        return self._safe_file_url(getattr(obj, "thumbnail", None), getattr(obj, "thumbnail_available", True))
 
-    def get_saves_count(self, obj):
-        try:
-            return int(getattr(obj, "saves_count", None) or obj.saves.count())
-        except Exception:
-            return 0
+    def get_thumbnails(self, obj):
+        return media_variant_urls(obj)
 
 
 class ProviderPortfolioItemCreateSerializer(serializers.ModelSerializer):
@@ -214,19 +281,21 @@ class ProviderPortfolioItemCreateSerializer(serializers.ModelSerializer):
             "file_type",
             "file",
             "caption",
+            "processing_status",
             "created_at",
         )
-        read_only_fields = ("id", "created_at")
+        read_only_fields = ("id", "processing_status", "created_at")
 
 
-class ProviderSpotlightItemSerializer(serializers.ModelSerializer):
+class ProviderSpotlightItemSerializer(MediaItemReactionsMixin, serializers.ModelSerializer):
     provider_id = serializers.IntegerField(source="provider.id", read_only=True)
     provider_display_name = serializers.CharField(source="provider.display_name", read_only=True)
     provider_username = serializers.CharField(source="provider.user.username", read_only=True)
     file_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    saves_count = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
+    saved_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = ProviderSpotlightItem
@@ -238,43 +307,42 @@ class ProviderSpotlightItemSerializer(serializers.ModelSerializer):
             "file_type",
             "file_url",
             "thumbnail_url",
+            "thumbnails",
+            "processing_status",
+            "width",
+            "height",
+            "duration_seconds",
             "caption",
             "likes_count",
             "saves_count",
+            "liked_by_me",
+            "saved_by_me",
             "created_at",
         )
+        read_only_fields = ("likes_count", "saves_count")
+        list_serializer_class = MediaItemListSerializer
 
     @staticmethod
-    def _safe_file_url(field_file):
-        if not field_file:
+    def _safe_file_url(field_file, available=True):
+        # التوفر من الأعلام المخزنة (file_available/thumbnail_available) بدل storage.exists()
+        if not field_file or not available:
             return ""
         try:
             name = (field_file.name or "").strip()
             if not name:
                 return ""
-            if not field_file.storage.exists(name):
-                return ""
             return field_file.url
         except Exception:
             return ""
 
     def get_file_url(self, obj):
-        return self._safe_file_url(getattr(obj, "file", None))
+        return self._safe_file_url(getattr(obj, "file", None), getattr(obj, "file_available", True))
 
     def get_thumbnail_url(self, obj):
-        return self._safe_file_url(getattr(obj, "thumbnail", None))
-
-    def get_likes_count(self, obj):
-        try:
-            return int(getattr(obj, "likes_count", None) or obj.likes.count())
-        except Exception:
-            return 0
+        return self._safe_file_url(getattr(obj, "thumbnail", None), getattr(obj, "thumbnail_available", True))
 
-    def get_saves_count(self, obj):
-        try:
-            return int(getattr(obj, "saves_count", None) or obj.saves.count())
-        except Exception:
-            return 0
+    def get_thumbnails(self, obj):
+        return media_variant_urls(obj)
 
 
 class ProviderSpotlightItemCreateSerializer(serializers.ModelSerializer):
@@ -285,9 +353,10 @@ class ProviderSpotlightItemCreateSerializer(serializers.ModelSerializer):
             "file_type",
             "file",
             "caption",
+            "processing_status",
             "created_at",
         )
-        read_only_fields = ("id", "created_at")
+        read_only_fields = ("id", "processing_status", "created_at")
 
 
 class UserPublicSerializer(serializers.ModelSerializer):
@@ -0,0 +1,181 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.accounts.me_counters import invalidate_me_counters
+from apps.core.caching import invalidate_on_change
+from apps.marketplace.models import ServiceRequest
+
+from .categories import CATEGORIES_CACHE_NAMESPACE
+from .media_pipeline import delete_item_media
+from .models import (
+    Category,
+    ProviderFollow,
+    ProviderLike,
+    ProviderPortfolioItem,
+    ProviderPortfolioLike,
+    ProviderPortfolioSave,
+    ProviderProfile,
+    ProviderService,
+    ProviderSpotlightItem,
+    ProviderSpotlightLike,
+    ProviderSpotlightSave,
+    SubCategory,
+)
+from .search import refresh_search_document
+from .stats import refresh_provider_stats
+
+
+invalidate_on_change(CATEGORIES_CACHE_NAMESPACE, Category, SubCategory)
+
+
+def _bump(qs, field: str, delta: int) -> None:
+    if delta > 0:
+        qs.update(**{field: F(field) + delta})
+    else:
+        qs.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def _invalidate_me(user_id, provider_id=None) -> None:
+    # /me يعرض عدادات الفاعل وعدادات صاحب ملف المزود المستهدف
+    owner_id = None
+    if provider_id:
+        owner_id = ProviderProfile.objects.filter(id=provider_id).values_list("user_id", flat=True).first()
+    invalidate_me_counters(user_id, owner_id)
+
+
+@receiver(post_save, sender=ProviderFollow)
+def provider_follow_created(sender, instance: ProviderFollow, created, **kwargs):
+    if not created:
+        return
+    _bump(ProviderProfile.objects.filter(id=instance.provider_id), "followers_count", 1)
+    _bump(ProviderProfile.objects.filter(user_id=instance.user_id), "following_count", 1)
+    _invalidate_me(instance.user_id, instance.provider_id)
+
+
+@receiver(post_delete, sender=ProviderFollow)
+def provider_follow_deleted(sender, instance: ProviderFollow, **kwargs):
+    _bump(ProviderProfile.objects.filter(id=instance.provider_id), "followers_count", -1)
+    _bump(ProviderProfile.objects.filter(user_id=instance.user_id), "following_count", -1)
+    _invalidate_me(instance.user_id, instance.provider_id)
+
+
+@receiver(post_save, sender=ProviderLike)
+def provider_like_created(sender, instance: ProviderLike, created, **kwargs):
+    if not created:
+        return
+    _bump(ProviderProfile.objects.filter(id=instance.provider_id), "likes_count", 1)
+    _invalidate_me(instance.user_id, instance.provider_id)
+
+
+@receiver(post_delete, sender=ProviderLike)
+def provider_like_deleted(sender, instance: ProviderLike, **kwargs):
+    _bump(ProviderProfile.objects.filter(id=instance.provider_id), "likes_count", -1)
+    _invalidate_me(instance.user_id, instance.provider_id)
+
+
+_MEDIA_ITEM_COUNTERS = {
+    ProviderPortfolioLike: (ProviderPortfolioItem, "likes_count"),
+    ProviderPortfolioSave: (ProviderPortfolioItem, "saves_count"),
+    ProviderSpotlightLike: (ProviderSpotlightItem, "likes_count"),
+    ProviderSpotlightSave: (ProviderSpotlightItem, "saves_count"),
+}
+
+
+@receiver(post_save, sender=ProviderPortfolioLike)
+@receiver(post_save, sender=ProviderPortfolioSave)
+@receiver(post_save, sender=ProviderSpotlightLike)
+@receiver(post_save, sender=ProviderSpotlightSave)
+def media_item_reaction_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    item_model, field = _MEDIA_ITEM_COUNTERS[sender]
+    _bump(item_model.objects.filter(id=instance.item_id), field, 1)
+    if sender is ProviderPortfolioLike:
+        invalidate_me_counters(instance.user_id)
+
+
+@receiver(post_delete, sender=ProviderPortfolioLike)
+@receiver(post_delete, sender=ProviderPortfolioSave)
+@receiver(post_delete, sender=ProviderSpotlightLike)
+@receiver(post_delete, sender=ProviderSpotlightSave)
+def media_item_reaction_deleted(sender, instance, **kwargs):
+    item_model, field = _MEDIA_ITEM_COUNTERS[sender]
+    _bump(item_model.objects.filter(id=instance.item_id), field, -1)
+    if sender is ProviderPortfolioLike:
+        invalidate_me_counters(instance.user_id)
+
+
+@receiver(post_save, sender=ProviderProfile)
+def provider_profile_created(sender, instance: ProviderProfile, created, **kwargs):
+    # المستخدم قد يتابع مزودين قبل أن يصبح مزودًا
+    if created:
+        refresh_provider_stats([instance.id], fields=("following_count",))
+    invalidate_me_counters(instance.user_id)
+
+
+@receiver(post_delete, sender=ProviderProfile)
+def provider_profile_deleted(sender, instance: ProviderProfile, **kwargs):
+    invalidate_me_counters(instance.user_id)
+
+
+_SEARCH_SOURCE_FIELDS = {"display_name", "city", "bio"}
+
+
+@receiver(post_save, sender=ProviderProfile)
+def provider_profile_search_document(sender, instance: ProviderProfile, created, update_fields=None, **kwargs):
+    if update_fields is not None and not (_SEARCH_SOURCE_FIELDS & set(update_fields)):
+        return
+    refresh_search_document(instance.id)
+
+
+@receiver(post_save, sender=ProviderService)
+def provider_service_saved(sender, instance: ProviderService, **kwargs):
+    refresh_search_document(instance.provider_id)
+
+
+@receiver(post_delete, sender=ProviderService)
+def provider_service_deleted(sender, instance: ProviderService, **kwargs):
+    refresh_search_document(instance.provider_id, create=False)
+
+
+_REQUEST_STATS_FIELDS = {"status", "provider", "provider_id"}
+
+
+@receiver(post_init, sender=ServiceRequest)
+def service_request_track_provider(sender, instance: ServiceRequest, **kwargs):
+    # المزود كما حُمّل من القاعدة: عند نقل الطلب لمزود آخر يُعاد حساب عداد السابق أيضًا
+    # (__dict__ حتى لا يُجلب حقل مؤجَّل باستعلام)
+    instance._loaded_provider_id = instance.__dict__.get("provider_id")
+
+
+@receiver(post_save, sender=ServiceRequest)
+def service_request_saved(sender, instance: ServiceRequest, update_fields=None, **kwargs):
+    if update_fields is not None and not (_REQUEST_STATS_FIELDS & set(update_fields)):
+        return
+    previous_provider_id = None
+    if update_fields is None or {"provider", "provider_id"} & set(update_fields):
+        previous_provider_id = getattr(instance, "_loaded_provider_id", None)
+        instance._loaded_provider_id = instance.provider_id
+    provider_ids = {instance.provider_id, previous_provider_id} - {None}
+    if provider_ids:
+        refresh_provider_stats(sorted(provider_ids), fields=("completed_requests_count",))
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def service_request_deleted(sender, instance: ServiceRequest, **kwargs):
+    if instance.provider_id:
+        refresh_provider_stats([instance.provider_id], fields=("completed_requests_count",))
+
+
+@receiver(post_delete, sender=ProviderPortfolioItem)
+@receiver(post_delete, sender=ProviderSpotlightItem)
+def provider_media_item_deleted(sender, instance, **kwargs):
+    # الملفات تُحذف بعد نجاح المعاملة فقط؛ الصفوف الباقية لا تشير إلى ملف محذوف
+    storage = instance.file.storage
+    file_name = instance.file.name or ""
+    thumbnail_name = instance.thumbnail.name if instance.thumbnail else ""
+    variants = dict(instance.thumbnail_variants or {})
+    transaction.on_commit(lambda: delete_item_media(storage, file_name, thumbnail_name, variants))
@@ -0,0 +1,77 @@
+"""
+Stored provider counters (followers / likes / following / completed requests).
+
+The columns on ProviderProfile are bumped by signals on every follow, like and
+request status change; the expressions below compute the true values and are
+used both for single-provider refreshes and bulk drift reconciliation.
+"""
+from __future__ import annotations
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import ProviderFollow, ProviderLike, ProviderProfile
+
+
+STAT_FIELDS = ("followers_count", "likes_count", "following_count", "completed_requests_count")
+
+
+def _count_subquery(qs, group_field: str):
+    counted = (
+        qs.order_by()
+        .values(group_field)
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def provider_stat_expressions() -> dict:
+    """{field: expression} for the true value of each stored counter (per ProviderProfile row)."""
+    from apps.marketplace.models import RequestStatus, ServiceRequest
+
+    return {
+        "followers_count": _count_subquery(
+            ProviderFollow.objects.filter(provider_id=OuterRef("pk")), "provider_id"
+        ),
+        "likes_count": _count_subquery(
+            ProviderLike.objects.filter(provider_id=OuterRef("pk")), "provider_id"
+        ),
+        "following_count": _count_subquery(
+            ProviderFollow.objects.filter(user_id=OuterRef("user_id")), "user_id"
+        ),
+        "completed_requests_count": _count_subquery(
+            ServiceRequest.objects.filter(provider_id=OuterRef("pk"), status=RequestStatus.COMPLETED),
+            "provider_id",
+        ),
+    }
+
+
+def refresh_provider_stats(provider_ids, fields=STAT_FIELDS) -> int:
+    """Recompute the given counters in a single UPDATE for the given providers."""
+    ids = [pid for pid in provider_ids if pid]
+    if not ids:
+        return 0
+    exprs = provider_stat_expressions()
+    return ProviderProfile.objects.filter(id__in=ids).update(**{f: exprs[f] for f in fields})
+
+
+def find_stat_drift(*, batch_size: int = 1000):
+    """
+    Yield (provider_id, {field: (stored, actual)}) for every provider whose stored
+    counters differ from the real counts.
+    """
+    exprs = provider_stat_expressions()
+    qs = (
+        ProviderProfile.objects.annotate(**{f"actual_{f}": expr for f, expr in exprs.items()})
+        .order_by("id")
+        .values("id", *STAT_FIELDS, *(f"actual_{f}" for f in STAT_FIELDS))
+    )
+    for row in qs.iterator(chunk_size=batch_size):
+        diff = {
+            f: (row[f], row[f"actual_{f}"])
+            for f in STAT_FIELDS
+            if row[f] != row[f"actual_{f}"]
+        }
+        if diff:
+            yield row["id"], diff
@@ -299,3 +299,198 @@ def test_provider_can_upload_profile_and_cover_images(settings, tmp_path):
     profile = ProviderProfile.objects.get(user__phone="0500000099")
     assert bool(profile.profile_image)
     assert bool(profile.cover_image)
+
+
+@pytest.mark.django_db
+def test_provider_stat_counters_follow_like_complete_and_reconcile():
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from apps.accounts.models import User, UserRole
+    from apps.marketplace.models import RequestStatus, RequestType, ServiceRequest
+    from apps.providers.models import ProviderFollow
+
+    cat = Category.objects.create(name="تصميم", is_active=True)
+    sub = SubCategory.objects.create(category=cat, name="شعار", is_active=True)
+
+    fan = User.objects.create(phone="0504444441", username="fan_user", role_state=UserRole.CLIENT)
+    p_user = User.objects.create(phone="0504444442", username="provider_stats")
+    provider = ProviderProfile.objects.create(
+        user=p_user,
+        provider_type="individual",
+        display_name="مزود الإحصاءات",
+        bio="bio",
+        city="الرياض",
+    )
+    other_user = User.objects.create(phone="0504444443", username="provider_other")
+    other = ProviderProfile.objects.create(
+        user=other_user,
+        provider_type="individual",
+        display_name="مزود آخر",
+        bio="bio",
+        city="الرياض",
+    )
+
+    api = APIClient()
+    api.force_authenticate(user=fan)
+    assert api.post(f"/api/providers/{provider.id}/follow/").status_code == 200
+    assert api.post(f"/api/providers/{provider.id}/follow/").status_code == 200
+    assert api.post(f"/api/providers/{provider.id}/like/").status_code == 200
+    ProviderFollow.objects.create(user=p_user, provider=other)
+
+    sr = ServiceRequest.objects.create(
+        client=fan,
+        provider=provider,
+        subcategory=sub,
+        title="طلب",
+        description="وصف",
+        request_type=RequestType.NORMAL,
+        status=RequestStatus.IN_PROGRESS,
+        city="الرياض",
+    )
+    sr.complete()
+
+    provider.refresh_from_db()
+    assert (provider.followers_count, provider.likes_count, provider.following_count) == (1, 1, 1)
+    assert provider.completed_requests_count == 1
+
+    stats = APIClient().get(f"/api/providers/{provider.id}/stats/").json()
+    assert stats["followers_count"] == 1
+    assert stats["following_count"] == 1
+    assert stats["completed_requests"] == 1
+
+    detail = APIClient().get(f"/api/providers/{provider.id}/").json()
+    assert detail["likes_count"] == 1
+    assert detail["completed_requests"] == 1
+
+    assert api.post(f"/api/providers/{provider.id}/unfollow/").status_code == 200
+    provider.refresh_from_db()
+    assert provider.followers_count == 0
+
+    # انحراف من تحديث جماعي لا يطلق signals
+    ProviderProfile.objects.filter(id=provider.id).update(likes_count=7, completed_requests_count=0)
+    call_command("reconcile_provider_stats", stdout=StringIO())
+    provider.refresh_from_db()
+    assert provider.likes_count == 7
+
+    out = StringIO()
+    call_command("reconcile_provider_stats", "--apply", stdout=out)
+    provider.refresh_from_db()
+    assert (provider.likes_count, provider.completed_requests_count) == (1, 1)
+    assert "Reconciled counters for 1 provider(s)." in out.getvalue()
+
+    # نقل الطلب المكتمل لمزود آخر يعيد حساب الطرفين
+    sr.provider = other
+    sr.save(update_fields=["provider"])
+    provider.refresh_from_db()
+    other.refresh_from_db()
+    assert (provider.completed_requests_count, other.completed_requests_count) == (0, 1)
+
+
+@pytest.mark.django_db
+def test_provider_search_is_arabic_normalized_ranked_and_keyset_paginated():
+    from apps.accounts.models import User
+    from apps.providers.models import ProviderService
+    from apps.providers.search import normalize_search_text
+
+    assert normalize_search_text("مُؤسَّسة  الإبْداع ـــ") == "موسسه الابداع"
+    assert normalize_search_text("مكة المكرمة ٢٠") == "مكه المكرمه 20"
+
+    cat = Category.objects.create(name="تصميم", is_active=True)
+    sub = SubCategory.objects.create(category=cat, name="شعار", is_active=True)
+
+    def make(idx, name, city, bio="نبذة"):
+        user = User.objects.create(phone=f"05055555{idx:02d}", username=f"search_{idx}")
+        return ProviderProfile.objects.create(
+            user=user,
+            provider_type="individual",
+            display_name=name,
+            bio=bio,
+            city=city,
+        )
+
+    by_name = make(1, "أحمد للتصميم", "جدة")
+    by_city = make(2, "استوديو", "أحمدية")
+    by_service = make(3, "مزود", "الرياض")
+    make(4, "غير مطابق", "الدمام")
+    ProviderService.objects.create(provider=by_service, subcategory=sub, title="تصميم شعار احمد")
+
+    client = APIClient()
+    res = client.get("/api/providers/list/", {"q": "احمد"})
+    assert res.status_code == 200
+    assert [p["id"] for p in res.json()] == [by_name.id, by_city.id, by_service.id]
+
+    res = client.get("/api/providers/list/", {"city": "جده"})
+    assert [p["id"] for p in res.json()] == [by_name.id]
+
+    page1 = client.get("/api/providers/list/", {"q": "احمد", "limit": 2}).json()
+    assert [p["id"] for p in page1["results"]] == [by_name.id, by_city.id]
+    page2 = client.get(page1["next"]).json()
+    assert [p["id"] for p in page2["results"]] == [by_service.id]
+    assert page2["next"] is None
+
+    # تعديل الاسم يعيد بناء مستند البحث
+    by_name.display_name = "سارة"
+    by_name.save(update_fields=["display_name"])
+    res = client.get("/api/providers/list/", {"q": "احمد"})
+    assert [p["id"] for p in res.json()] == [by_city.id, by_service.id]
+
+    # ملف بلا وثيقة بحث (إدراج لا يطلق signals): rebuild_provider_search --missing يعيده للنتائج
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from apps.providers.models import ProviderSearchDocument
+
+    orphan = make(5, "مختبر الضوء", "تبوك")
+    ProviderSearchDocument.objects.filter(provider=orphan).delete()
+    assert client.get("/api/providers/list/", {"q": "الضوء"}).json() == []
+    call_command("rebuild_provider_search", "--missing", stdout=StringIO())
+    assert ProviderSearchDocument.objects.count() == ProviderProfile.objects.count()
+    assert [p["id"] for p in client.get("/api/providers/list/", {"q": "الضوء"}).json()] == [orphan.id]
+    assert [p["id"] for p in client.get("/api/providers/list/", {"city": "تبوك"}).json()] == [orphan.id]
+
+
+@pytest.mark.django_db
+def test_provider_list_nearby_mode_orders_by_distance_within_radius():
+    from apps.accounts.models import User
+    from apps.providers.geo import covering_cells, encode_geohash
+
+    def make(idx, lat, lng, urgent=True):
+        user = User.objects.create(phone=f"05066666{idx:02d}", username=f"geo_{idx}")
+        return ProviderProfile.objects.create(
+            user=user,
+            provider_type="individual",
+            display_name=f"مزود {idx}",
+            bio="bio",
+            city="الرياض",
+            accepts_urgent=urgent,
+            lat=lat,
+            lng=lng,
+        )
+
+    origin = (24.7136, 46.6753)
+    close = make(1, "24.715000", "46.676000")
+    mid = make(2, "24.760000", "46.700000")
+    make(3, "24.400000", "46.600000")
+    make(4, "24.714000", "46.676000", urgent=False)
+    make(5, None, None)
+
+    assert close.geohash == encode_geohash(24.715, 46.676)
+    assert any(close.geohash.startswith(cell) for cell in covering_cells(*origin, 10))
+
+    res = APIClient().get(
+        "/api/providers/list/",
+        {"lat": origin[0], "lng": origin[1], "radius_km": 10, "accepts_urgent": "1"},
+    )
+    assert res.status_code == 200
+    payload = res.json()
+    assert [p["id"] for p in payload] == [close.id, mid.id]
+    assert payload[0]["distance_km"] < payload[1]["distance_km"] <= 10
+
+    # تحديث الموقع يعيد حساب الخلية
+    close.lat, close.lng = "24.400000", "46.600000"
+    close.save(update_fields=["lat", "lng"])
+    close.refresh_from_db()
+    assert close.geohash == encode_geohash(24.4, 46.6)
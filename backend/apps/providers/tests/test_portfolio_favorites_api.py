@@ -324,3 +324,125 @@ def test_spotlight_like_and_count_are_exposed(settings, tmp_path):
     assert public_spotlights.status_code == 200
     public_item = next(x for x in public_spotlights.json() if x["id"] == spotlight_id)
     assert public_item.get("likes_count") == 1
+
+
+@pytest.mark.django_db
+def test_portfolio_image_upload_is_processed_into_thumbnail_variants(settings, tmp_path):
+    import io
+
+    from PIL import Image
+
+    settings.MEDIA_ROOT = tmp_path
+    settings.PROVIDER_MEDIA_THUMBNAIL_WIDTHS = (320, 640, 1080)
+
+    provider_api = APIClient()
+    provider_phone = "0500000750"
+    provider_access = _login_via_otp(provider_api, provider_phone)
+    _complete_registration(provider_api, provider_access, provider_phone)
+    provider_profile = _register_provider(provider_api)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 400), (200, 100, 50)).save(buf, format="PNG")
+    upload = SimpleUploadedFile("photo.png", buf.getvalue(), content_type="image/png")
+
+    created = provider_api.post(
+        "/api/providers/me/portfolio/",
+        {"file_type": "image", "caption": "photo", "file": upload},
+        format="multipart",
+    )
+    assert created.status_code == 201
+    item_id = created.json()["id"]
+
+    item = ProviderPortfolioItem.objects.get(id=item_id)
+    assert item.processing_status == "ready"
+    assert (item.width, item.height) == (800, 400)
+    # 1080 أكبر من الأصل فلا تكبير
+    assert sorted(item.thumbnail_variants, key=int) == ["320", "640"]
+    assert item.thumbnail
+
+    listed = provider_api.get(f"/api/providers/{provider_profile.id}/portfolio/")
+    assert listed.status_code == 200
+    row = next(x for x in listed.json() if x["id"] == item_id)
+    assert row["processing_status"] == "ready"
+    assert set(row["thumbnails"]["320"]) == {"webp", "jpeg"}
+
+
+@pytest.mark.django_db
+def test_missing_portfolio_file_is_flagged_by_verify_command(settings, tmp_path):
+    from django.core.management import call_command
+
+    settings.MEDIA_ROOT = tmp_path
+
+    provider_api = APIClient()
+    provider_phone = "0500000751"
+    provider_access = _login_via_otp(provider_api, provider_phone)
+    _complete_registration(provider_api, provider_access, provider_phone)
+    provider_profile = _register_provider(provider_api)
+
+    video_bytes = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+    upload = SimpleUploadedFile("gone.mp4", video_bytes, content_type="video/mp4")
+    created = provider_api.post(
+        "/api/providers/me/portfolio/",
+        {"file_type": "video", "caption": "gone", "file": upload},
+        format="multipart",
+    )
+    assert created.status_code == 201
+    item = ProviderPortfolioItem.objects.get(id=created.json()["id"])
+    assert item.file_available is True
+    item.file.storage.delete(item.file.name)
+
+    call_command("verify_provider_media", "--apply")
+
+    item.refresh_from_db()
+    assert item.file_available is False
+    assert item.thumbnail_available is True
+    listed = provider_api.get(f"/api/providers/{provider_profile.id}/portfolio/")
+    row = next(x for x in listed.json() if x["id"] == item.id)
+    assert row["file_url"] == ""
+    assert row["thumbnail_url"]
+
+
+@pytest.mark.django_db
+def test_portfolio_counters_and_viewer_flags_follow_like_and_save(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+    provider_api = APIClient()
+    provider_phone = "0500000752"
+    provider_access = _login_via_otp(provider_api, provider_phone)
+    _complete_registration(provider_api, provider_access, provider_phone)
+    provider_profile = _register_provider(provider_api)
+
+    ids = []
+    for name in ("a.mp4", "b.mp4"):
+        upload = SimpleUploadedFile(name, b"\x00\x00\x00\x18ftypmp42", content_type="video/mp4")
+        created = provider_api.post(
+            "/api/providers/me/portfolio/",
+            {"file_type": "video", "caption": name, "file": upload},
+            format="multipart",
+        )
+        assert created.status_code == 201
+        ids.append(created.json()["id"])
+
+    client_api = APIClient()
+    client_phone = "0500000753"
+    client_access = _login_via_otp(client_api, client_phone)
+    _complete_registration(client_api, client_access, client_phone)
+
+    assert client_api.post(f"/api/providers/portfolio/{ids[0]}/like/").status_code == 200
+    assert client_api.post(f"/api/providers/portfolio/{ids[0]}/like/").status_code == 200
+    assert client_api.post(f"/api/providers/portfolio/{ids[0]}/save/").status_code == 200
+
+    item = ProviderPortfolioItem.objects.get(id=ids[0])
+    assert (item.likes_count, item.saves_count) == (1, 1)
+
+    listed = client_api.get(f"/api/providers/{provider_profile.id}/portfolio/")
+    rows = {x["id"]: x for x in listed.json()}
+    assert rows[ids[0]]["liked_by_me"] is True
+    assert rows[ids[0]]["saved_by_me"] is True
+    assert rows[ids[1]]["liked_by_me"] is False
+    assert rows[ids[1]]["likes_count"] == 0
+
+    assert client_api.post(f"/api/providers/portfolio/{ids[0]}/unlike/").status_code == 200
+    assert client_api.post(f"/api/providers/portfolio/{ids[0]}/unsave/").status_code == 200
+    item.refresh_from_db()
+    assert (item.likes_count, item.saves_count) == (0, 0)
@@ -2,7 +2,7 @@ from rest_framework import generics, permissions, status
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Count, F, Max, Q
+from django.db.models import Exists, F, Max, OuterRef
 from django.db.models.functions import Coalesce
 from django.db import transaction
 
@@ -12,7 +12,7 @@ from apps.accounts.models import UserRole
 from apps.accounts.permissions import IsAtLeastClient, IsAtLeastPhoneOnly, IsAtLeastProvider
 
 from .models import (
-	Category,
+	MediaProcessingStatus,
 	ProviderFollow,
 	ProviderLike,
 	ProviderCategory,
@@ -41,7 +41,11 @@ from .serializers import (
 	ProviderSpotlightItemSerializer,
 	UserPublicSerializer,
 )
-from .media_thumbnails import ensure_video_thumbnail
+from .geo import nearest_providers
+from .categories import active_categories_queryset, public_categories_payload
+from .media_pipeline import enqueue_media_processing
+from .pagination import ProviderSearchCursorPagination
+from .search import apply_provider_search
 
 
 class MyProviderProfileView(generics.RetrieveUpdateAPIView):
@@ -169,10 +173,14 @@ class ProviderSubcategoriesPublicListView(generics.ListAPIView):
 
 
 class CategoryListView(generics.ListAPIView):
-	queryset = Category.objects.filter(is_active=True)
+	queryset = active_categories_queryset()
 	serializer_class = CategorySerializer
 	permission_classes = [permissions.AllowAny]
 
+	def list(self, request, *args, **kwargs):
+		# القائمة نفسها لكل الزوار؛ تُلغى عند تعديل أي تصنيف (providers.categories)
+		return Response(public_categories_payload())
+
 
 class ProviderCreateView(generics.CreateAPIView):
 	serializer_class = ProviderProfileSerializer
@@ -191,28 +199,71 @@ class ProviderCreateView(generics.CreateAPIView):
 
 
 class ProviderListView(generics.ListAPIView):
-	"""Public provider list/search (visitor allowed)."""
+	"""
+	Public provider list/search (visitor allowed).
+
+	``q`` / ``city`` are matched against the Arabic-normalized search documents
+	(see providers.search) and results are ranked. Pass ``cursor`` or ``limit``
+	to get a keyset-paginated envelope (``next`` / ``previous`` / ``results``);
+	without them the legacy flat list is returned for older app builds.
+
+	Nearby mode: ``lat`` + ``lng`` (+ ``radius_km``, default 10, max 100) returns
+	up to ``limit`` providers within the radius, closest first, with ``distance_km``
+	(geohash-cell lookup, see providers.geo). Other filters still apply.
+	"""
 	serializer_class = ProviderPublicSerializer
 	permission_classes = [permissions.AllowAny]
 
+	NEARBY_DEFAULT_RADIUS_KM = 10
+	NEARBY_MAX_RADIUS_KM = 100
+	NEARBY_DEFAULT_LIMIT = 50
+	NEARBY_MAX_LIMIT = 100
+
+	def _nearby_params(self):
+		params = self.request.query_params
+		if not params.get("lat") or not params.get("lng"):
+			return None
+		try:
+			lat = float(params.get("lat"))
+			lng = float(params.get("lng"))
+			radius = float(params.get("radius_km") or self.NEARBY_DEFAULT_RADIUS_KM)
+			limit = int(params.get("limit") or self.NEARBY_DEFAULT_LIMIT)
+		except (TypeError, ValueError):
+			return None
+		if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+			return None
+		return lat, lng, min(radius, self.NEARBY_MAX_RADIUS_KM), max(1, min(limit, self.NEARBY_MAX_LIMIT))
+
+	def list(self, request, *args, **kwargs):
+		nearby = self._nearby_params()
+		if nearby is None:
+			return super().list(request, *args, **kwargs)
+		lat, lng, radius, limit = nearby
+		providers = nearest_providers(
+			self.filter_queryset(self.get_queryset()),
+			lat=lat,
+			lng=lng,
+			radius_km=radius,
+			limit=limit,
+		)
+		return Response(self.get_serializer(providers, many=True).data)
+
+	@property
+	def paginator(self):
+		if not hasattr(self, "_paginator"):
+			params = self.request.query_params
+			paginate = ("cursor" in params or "limit" in params) and self._nearby_params() is None
+			self._paginator = ProviderSearchCursorPagination() if paginate else None
+		return self._paginator
+
 	def get_queryset(self):
-		from apps.marketplace.models import RequestStatus
 		# Public list must include only real active provider accounts.
+		# Counters come from stored columns (see providers.stats), no per-row joins.
 		qs = (
 			ProviderProfile.objects.select_related("user")
 			.filter(
 				user__is_active=True,
 			)
-			.annotate(
-				followers_count=Count("followers", distinct=True),
-				likes_count=Count("likes", distinct=True),
-				completed_requests=Count(
-					"assigned_requests",
-					filter=Q(assigned_requests__status=RequestStatus.COMPLETED),
-					distinct=True,
-				),
-			)
-			.order_by("-id")
 		)
 
 		q = (self.request.query_params.get("q") or "").strip()
@@ -221,20 +272,18 @@ class ProviderListView(generics.ListAPIView):
 		accepts_urgent = (self.request.query_params.get("accepts_urgent") or "").strip().lower()
 		category_id = (self.request.query_params.get("category_id") or "").strip()
 		subcategory_id = (self.request.query_params.get("subcategory_id") or "").strip()
-		if q:
-			qs = qs.filter(display_name__icontains=q)
-		if city:
-			qs = qs.filter(city__icontains=city)
 		if has_location in {"1", "true", "yes"}:
 			qs = qs.exclude(lat__isnull=True).exclude(lng__isnull=True)
 		if accepts_urgent in {"1", "true", "yes"}:
 			qs = qs.filter(accepts_urgent=True)
 
-		# Optional service taxonomy filters via ProviderCategory
+		# Optional service taxonomy filters via ProviderCategory (EXISTS, no join fan-out)
 		if subcategory_id:
 			try:
 				sid = int(subcategory_id)
-				qs = qs.filter(providercategory__subcategory_id=sid)
+				qs = qs.filter(
+					Exists(ProviderCategory.objects.filter(provider=OuterRef("pk"), subcategory_id=sid))
+				)
 			except ValueError:
 				pass
 		elif category_id:
@@ -244,10 +293,14 @@ class ProviderListView(generics.ListAPIView):
 					SubCategory.objects.filter(category_id=cid, is_active=True).values_list("id", flat=True)
 				)
 				if sub_ids:
-					qs = qs.filter(providercategory__subcategory_id__in=sub_ids)
+					qs = qs.filter(
+						Exists(
+							ProviderCategory.objects.filter(provider=OuterRef("pk"), subcategory_id__in=sub_ids)
+						)
+					)
 			except ValueError:
 				pass
-		return qs.distinct()
+		return apply_provider_search(qs, q=q, city=city).order_by("-search_key")
 
 
 class ProviderDetailView(generics.RetrieveAPIView):
@@ -255,21 +308,11 @@ class ProviderDetailView(generics.RetrieveAPIView):
 	permission_classes = [permissions.AllowAny]
 
 	def get_queryset(self):
-		from apps.marketplace.models import RequestStatus
 		return (
 			ProviderProfile.objects.select_related("user")
 			.filter(
 				user__is_active=True,
 			)
-			.annotate(
-				followers_count=Count("followers", distinct=True),
-				likes_count=Count("likes", distinct=True),
-				completed_requests=Count(
-					"assigned_requests",
-					filter=Q(assigned_requests__status=RequestStatus.COMPLETED),
-					distinct=True,
-				),
-			)
 		)
 
 
@@ -280,10 +323,9 @@ class MyFollowingProvidersView(generics.ListAPIView):
 
 	def get_queryset(self):
 		return (
-			ProviderProfile.objects.filter(followers__user=self.request.user)
+			ProviderProfile.objects.select_related("user")
+			.filter(followers__user=self.request.user)
 			.annotate(
-				followers_count=Count("followers"),
-				likes_count=Count("likes"),
 				activity_at=Coalesce(
 					Max("portfolio_items__created_at"),
 					F("updated_at"),
@@ -305,8 +347,6 @@ class ProviderPortfolioListView(generics.ListAPIView):
 		provider_id = self.kwargs.get("provider_id")
 		return (
 			ProviderPortfolioItem.objects.filter(provider_id=provider_id)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.order_by("-created_at", "-id")
 		)
 
@@ -322,8 +362,6 @@ class MyProviderPortfolioListCreateView(generics.ListCreateAPIView):
 			return ProviderPortfolioItem.objects.none()
 		return (
 			ProviderPortfolioItem.objects.filter(provider=pp)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.order_by("-created_at", "-id")
 		)
 
@@ -336,8 +374,8 @@ class MyProviderPortfolioListCreateView(generics.ListCreateAPIView):
 		pp = getattr(self.request.user, "provider_profile", None)
 		if not pp:
 			raise NotFound("provider_profile_not_found")
-		item = serializer.save(provider=pp)
-		ensure_video_thumbnail(item)
+		item = serializer.save(provider=pp, processing_status=MediaProcessingStatus.PENDING)
+		enqueue_media_processing(item)
 
 
 class MyProviderPortfolioDetailView(generics.RetrieveDestroyAPIView):
@@ -352,8 +390,6 @@ class MyProviderPortfolioDetailView(generics.RetrieveDestroyAPIView):
 			return ProviderPortfolioItem.objects.none()
 		return (
 			ProviderPortfolioItem.objects.filter(provider=pp)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.order_by("-created_at", "-id")
 		)
 
@@ -368,8 +404,6 @@ class ProviderSpotlightListView(generics.ListAPIView):
 		provider_id = self.kwargs.get("provider_id")
 		return (
 			ProviderSpotlightItem.objects.filter(provider_id=provider_id)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.order_by("-created_at", "-id")
 		)
 
@@ -385,8 +419,6 @@ class MyProviderSpotlightListCreateView(generics.ListCreateAPIView):
 			return ProviderSpotlightItem.objects.none()
 		return (
 			ProviderSpotlightItem.objects.filter(provider=pp)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.order_by("-created_at", "-id")
 		)
 
@@ -399,8 +431,8 @@ class MyProviderSpotlightListCreateView(generics.ListCreateAPIView):
 		pp = getattr(self.request.user, "provider_profile", None)
 		if not pp:
 			raise NotFound("provider_profile_not_found")
-		item = serializer.save(provider=pp)
-		ensure_video_thumbnail(item)
+		item = serializer.save(provider=pp, processing_status=MediaProcessingStatus.PENDING)
+		enqueue_media_processing(item)
 
 
 class MyProviderSpotlightDetailView(generics.RetrieveDestroyAPIView):
@@ -415,8 +447,6 @@ class MyProviderSpotlightDetailView(generics.RetrieveDestroyAPIView):
 			return ProviderSpotlightItem.objects.none()
 		return (
 			ProviderSpotlightItem.objects.filter(provider=pp)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.order_by("-created_at", "-id")
 		)
 
@@ -430,8 +460,6 @@ class MyLikedPortfolioItemsView(generics.ListAPIView):
 	def get_queryset(self):
 		return (
 			ProviderPortfolioItem.objects.filter(likes__user=self.request.user)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.select_related("provider", "provider__user")
 			.distinct()
 			.order_by("-created_at", "-id")
@@ -447,8 +475,6 @@ class MySavedPortfolioItemsView(generics.ListAPIView):
 	def get_queryset(self):
 		return (
 			ProviderPortfolioItem.objects.filter(saves__user=self.request.user)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.select_related("provider", "provider__user")
 			.distinct()
 			.order_by("-created_at", "-id")
@@ -464,8 +490,6 @@ class MyLikedSpotlightItemsView(generics.ListAPIView):
 	def get_queryset(self):
 		return (
 			ProviderSpotlightItem.objects.filter(likes__user=self.request.user)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.select_related("provider", "provider__user")
 			.distinct()
 			.order_by("-created_at", "-id")
@@ -481,8 +505,6 @@ class MySavedSpotlightItemsView(generics.ListAPIView):
 	def get_queryset(self):
 		return (
 			ProviderSpotlightItem.objects.filter(saves__user=self.request.user)
-			.annotate(likes_count=Count("likes", distinct=True))
-			.annotate(saves_count=Count("saves", distinct=True))
 			.select_related("provider", "provider__user")
 			.distinct()
 			.order_by("-created_at", "-id")
@@ -564,8 +586,8 @@ class MyLikedProvidersView(generics.ListAPIView):
 
 	def get_queryset(self):
 		return (
-			ProviderProfile.objects.filter(likes__user=self.request.user)
-			.annotate(followers_count=Count("followers"), likes_count=Count("likes"))
+			ProviderProfile.objects.select_related("user")
+			.filter(likes__user=self.request.user)
 			.distinct()
 			.order_by("-id")
 		)
@@ -639,11 +661,8 @@ class ProviderFollowingView(generics.ListAPIView):
 			provider = ProviderProfile.objects.get(id=provider_id)
 			user = provider.user
 			return (
-				ProviderProfile.objects.filter(followers__user=user)
-				.annotate(
-					followers_count=Count("followers"),
-					likes_count=Count("likes"),
-				)
+				ProviderProfile.objects.select_related("user")
+				.filter(followers__user=user)
 				.distinct()
 				.order_by("-id")
 			)
@@ -664,39 +683,13 @@ class ProviderPublicStatsView(APIView):
 		if not provider:
 			raise NotFound("provider_not_found")
 
-		# Import locally to avoid hard coupling at import time.
-		from apps.marketplace.models import ServiceRequest, RequestStatus
-
-		completed_requests = ServiceRequest.objects.filter(
-			provider_id=provider_id,
-			status=RequestStatus.COMPLETED,
-		).count()
-		followers_count = (
-			ProviderFollow.objects.filter(provider_id=provider_id)
-			.values("user_id")
-			.distinct()
-			.count()
-		)
-		following_count = (
-			ProviderFollow.objects.filter(user=provider.user)
-			.values("provider_id")
-			.distinct()
-			.count()
-		)
-		likes_count = (
-			ProviderLike.objects.filter(provider_id=provider_id)
-			.values("user_id")
-			.distinct()
-			.count()
-		)
-
 		return Response(
 			{
 				"provider_id": provider_id,
-				"completed_requests": completed_requests,
-				"followers_count": followers_count,
-				"following_count": following_count,
-				"likes_count": likes_count,
+				"completed_requests": provider.completed_requests_count,
+				"followers_count": provider.followers_count,
+				"following_count": provider.following_count,
+				"likes_count": provider.likes_count,
 				"rating_avg": getattr(provider, "rating_avg", 0) or 0,
 				"rating_count": getattr(provider, "rating_count", 0) or 0,
 			},
@@ -8,6 +8,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from apps.billing.models import Invoice, InvoiceStatus
+from apps.core.caching import get_or_build, invalidate_keys
 
 from .models import Subscription, SubscriptionPlan, SubscriptionStatus
 
@@ -152,6 +153,94 @@ def refresh_subscription_status(*, sub: Subscription) -> Subscription:
     return sub
 
 
+SUBSCRIPTION_STATE_CACHE_NAMESPACE = "subs:state"
+
+
+def _subscription_state_max_ttl() -> int:
+    return max(1, int(getattr(settings, "SUBS_STATE_CACHE_SECONDS", 300)))
+
+
+def _ts(value):
+    return value.timestamp() if value else None
+
+
+def _next_transition_ts(state: dict):
+    """
+    موعد الانتقال القادم للحالة (ACTIVE -> GRACE -> EXPIRED) كـ timestamp.
+    """
+    status = state.get("status")
+    if status == SubscriptionStatus.ACTIVE:
+        return state.get("end_at") or state.get("grace_end_at")
+    if status == SubscriptionStatus.GRACE:
+        return state.get("grace_end_at")
+    return None
+
+
+def subscription_transition_due(state: dict | None, *, now=None) -> bool:
+    """
+    هل حان موعد انتقال حالة الاشتراك المخزنة؟ (بدون أي استعلام)
+    """
+    if not state:
+        return False
+    at = _next_transition_ts(state)
+    if at is None:
+        return False
+    now_ts = (now or timezone.now()).timestamp()
+    return now_ts > at
+
+
+def get_subscription_state(user) -> dict | None:
+    """
+    لقطة مخزنة مؤقتًا لآخر اشتراك للمستخدم:
+    id / status / features / end_at / grace_end_at (timestamps)
+
+    مدة التخزين لا تتجاوز موعد الانتقال القادم، لذا لا يُلمس الـ DB إلا عند
+    انتهاء التخزين أو عند الإلغاء الصريح عبر invalidate_subscription_state.
+    """
+    user_id = getattr(user, "id", None)
+    if not user_id:
+        return None
+
+    state = get_or_build(
+        SUBSCRIPTION_STATE_CACHE_NAMESPACE,
+        (int(user_id),),
+        lambda: _load_subscription_state(user_id),
+        timeout=_subscription_state_ttl,
+    )
+    return state or None
+
+
+def _load_subscription_state(user_id) -> dict:
+    sub = Subscription.objects.filter(user_id=user_id).select_related("plan").order_by("-id").first()
+    if not sub:
+        return {}
+    return {
+        "id": sub.id,
+        "status": sub.status,
+        "features": list(getattr(sub.plan, "features", None) or []),
+        "end_at": _ts(sub.end_at),
+        "grace_end_at": _ts(sub.grace_end_at),
+    }
+
+
+def _subscription_state_ttl(state: dict) -> int:
+    ttl = _subscription_state_max_ttl()
+    at = _next_transition_ts(state) if state else None
+    if at is not None:
+        ttl = min(ttl, max(1, int(at - timezone.now().timestamp()) + 1))
+    return ttl
+
+
+def invalidate_subscription_state(user_id) -> None:
+    """
+    حذف اللقطة فورًا، ومرة أخرى بعد الـ commit حتى لا يعيد طلب متزامن
+    تخزين بيانات ما قبل الحفظ.
+    """
+    if not user_id:
+        return
+    invalidate_keys(SUBSCRIPTION_STATE_CACHE_NAMESPACE, (int(user_id),))
+
+
 def user_has_feature(user, key: str) -> bool:
     """
     هل المستخدم لديه ميزة ضمن اشتراكه النشط؟
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from apps.billing.models import Invoice
 from .models import Subscription
-from .services import activate_subscription_after_payment
+from .services import activate_subscription_after_payment, invalidate_subscription_state
 
 
 @receiver(post_save, sender=Invoice)
@@ -30,3 +30,10 @@ def activate_subscription_on_paid(sender, instance: Invoice, created, **kwargs):
         activate_subscription_after_payment(sub=sub)
     except Exception:
         pass
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_state_on_change(sender, instance: Subscription, **kwargs):
+    # تفعيل/إلغاء/ترقية/انتقال حالة: أي حفظ يُسقط لقطة الاشتراك المخزنة
+    invalidate_subscription_state(instance.user_id)
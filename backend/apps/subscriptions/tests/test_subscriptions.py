@@ -81,3 +81,56 @@ def test_subscription_activation_and_refresh_syncs_unified(user):
     assert sub.status == "grace"
     assert ur.status == "in_progress"
     assert ur.metadata_record.payload.get("subscription_status") == "grace"
+
+
+def test_subscription_state_is_cached_until_invalidated(user, django_assert_num_queries):
+    from apps.subscriptions.services import get_subscription_state
+
+    plan = SubscriptionPlan.objects.create(code="CACHED", title="Cached", period=PlanPeriod.MONTH, price=Decimal("10.00"), features=["promo_ads"])
+    sub = Subscription.objects.create(user=user, plan=plan, status=SubscriptionStatus.PENDING_PAYMENT)
+
+    state = get_subscription_state(user)
+    assert state["id"] == sub.id
+    assert state["status"] == "pending_payment"
+    assert state["features"] == ["promo_ads"]
+
+    with django_assert_num_queries(0):
+        assert get_subscription_state(user)["status"] == "pending_payment"
+
+    sub.status = SubscriptionStatus.CANCELLED
+    sub.save(update_fields=["status", "updated_at"])
+    assert get_subscription_state(user)["status"] == "cancelled"
+
+
+def test_subscription_middleware_skips_db_until_transition_due(user, django_assert_num_queries):
+    from django.test import RequestFactory
+    from django.utils import timezone
+
+    from apps.features.middleware import SubscriptionRefreshMiddleware
+
+    plan = SubscriptionPlan.objects.create(code="MW", title="MW", period=PlanPeriod.MONTH, price=Decimal("10.00"))
+    now = timezone.now()
+    sub = Subscription.objects.create(
+        user=user,
+        plan=plan,
+        status=SubscriptionStatus.ACTIVE,
+        start_at=now - timedelta(days=30),
+        end_at=now + timedelta(days=1),
+        grace_end_at=now + timedelta(days=8),
+    )
+
+    mw = SubscriptionRefreshMiddleware(lambda request: None)
+    request = RequestFactory().get("/")
+    request.user = user
+
+    mw(request)
+    with django_assert_num_queries(0):
+        mw(request)
+
+    Subscription.objects.filter(pk=sub.pk).update(end_at=now - timedelta(seconds=1))
+    from apps.subscriptions.services import invalidate_subscription_state
+
+    invalidate_subscription_state(user.id)
+    mw(request)
+    sub.refresh_from_db()
+    assert sub.status == SubscriptionStatus.GRACE
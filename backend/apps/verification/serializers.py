@@ -95,7 +95,9 @@ class VerificationRequestCreateSerializer(serializers.ModelSerializer):
         from .services import _sync_verification_to_unified
         from .services import resolve_requirement_def
 
-        from apps.features.checks import has_feature
+        from apps.features.entitlements import Entitlements
+
+        ent = Entitlements.for_request(self.context["request"])
 
         requirements = validated_data.pop("requirements", []) or []
 
@@ -110,9 +112,9 @@ class VerificationRequestCreateSerializer(serializers.ModelSerializer):
         # Feature gating per requirement badge type.
         has_blue = any(r["badge_type"] == VerificationBadgeType.BLUE for r in requirements)
         has_green = any(r["badge_type"] == VerificationBadgeType.GREEN for r in requirements)
-        if has_blue and not has_feature(user, "verify_blue"):
+        if has_blue and not ent.has("verify_blue"):
             raise serializers.ValidationError("توثيق الشارة الزرقاء غير متاح في باقتك الحالية.")
-        if has_green and not has_feature(user, "verify_green"):
+        if has_green and not ent.has("verify_green"):
             raise serializers.ValidationError("توثيق الشارة الخضراء غير متاح في باقتك الحالية.")
 
         # Prevent multiple active/pending requests for the same badge type.
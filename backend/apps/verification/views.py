@@ -79,13 +79,14 @@ class VerificationAddDocumentView(generics.CreateAPIView):
             return Response({"detail": "file مطلوب"}, status=status.HTTP_400_BAD_REQUEST)
 
         from django.core.exceptions import ValidationError as DjangoValidationError
+        from apps.features.entitlements import Entitlements
         from apps.features.upload_limits import user_max_upload_mb
         from apps.uploads.validators import validate_user_file_size
         from .validators import validate_extension
 
         try:
             validate_extension(file_obj)
-            validate_user_file_size(file_obj, user_max_upload_mb(request.user))
+            validate_user_file_size(file_obj, user_max_upload_mb(request.user, entitlements=Entitlements.for_request(request)))
         except DjangoValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -131,13 +132,14 @@ class VerificationAddRequirementAttachmentView(generics.CreateAPIView):
             return Response({"detail": "file مطلوب"}, status=status.HTTP_400_BAD_REQUEST)
 
         from django.core.exceptions import ValidationError as DjangoValidationError
+        from apps.features.entitlements import Entitlements
         from apps.features.upload_limits import user_max_upload_mb
         from apps.uploads.validators import validate_user_file_size
         from .validators import validate_extension
 
         try:
             validate_extension(file_obj)
-            validate_user_file_size(file_obj, user_max_upload_mb(request.user))
+            validate_user_file_size(file_obj, user_max_upload_mb(request.user, entitlements=Entitlements.for_request(request)))
         except DjangoValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -17,13 +17,17 @@ http_app = get_asgi_application()
 # Import websocket components only after Django is initialized.
 from apps.messaging.jwt_auth import JwtAuthMiddleware  # noqa: E402
 import apps.messaging.routing  # noqa: E402
+import apps.notifications.routing  # noqa: E402
 
 application = ProtocolTypeRouter(
 	{
 		"http": http_app,
 		"websocket": JwtAuthMiddleware(
 			AuthMiddlewareStack(
-				URLRouter(apps.messaging.routing.websocket_urlpatterns)
+				URLRouter(
+					apps.messaging.routing.websocket_urlpatterns
+					+ apps.notifications.routing.websocket_urlpatterns
+				)
 			)
 		),
 	}
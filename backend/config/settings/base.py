@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     "channels",
 
     # Local apps (سنضيفها بعد قليل)
+    "apps.core",
     "apps.accounts",
     "apps.providers",
     "apps.marketplace",
@@ -107,6 +108,28 @@ else:
     # محلي بدون Redis (غير مفضل للإنتاج)
     CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
 
+# ✅ Cache (apps.core.caching)
+# Redis مشترك بين العمليات في الإنتاج، وذاكرة محلية لكل عملية بدونه
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", REDIS_URL)
+CACHE_DEFAULT_TIMEOUT_SECONDS = int(os.getenv("CACHE_DEFAULT_TIMEOUT_SECONDS", "300"))
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+            "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "nawafeth"),
+            "TIMEOUT": CACHE_DEFAULT_TIMEOUT_SECONDS,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "nawafeth-default",
+            "TIMEOUT": CACHE_DEFAULT_TIMEOUT_SECONDS,
+        }
+    }
+
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 if DATABASE_URL:
@@ -193,12 +216,22 @@ CORS_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "")
 
 # ✅ Marketplace
 URGENT_REQUEST_EXPIRY_MINUTES = int(os.getenv("URGENT_REQUEST_EXPIRY_MINUTES", "15"))
+# نصف قطر توزيع الطلب العاجل على المزودين عندما يحمل الطلب إحداثيات
+URGENT_DISPATCH_RADIUS_KM = float(os.getenv("URGENT_DISPATCH_RADIUS_KM", "25"))
 
 # VAT
 DEFAULT_VAT_PERCENT = 15  # السعودية 15%
 
 # Settings للباقات (اختياري الآن)
 SUBS_GRACE_DAYS = 7  # فترة سماح بعد الانتهاء
+# أقصى مدة لتخزين لقطة حالة الاشتراك (تُقصَّر تلقائيًا حتى موعد الانتقال القادم)
+SUBS_STATE_CACHE_SECONDS = int(os.getenv("SUBS_STATE_CACHE_SECONDS", "300"))
+
+# ملف تفضيلات الإشعارات (bitmap + مستوى الباقة) المخزن لكل مستخدم
+NOTIFICATIONS_PROFILE_CACHE_SECONDS = int(os.getenv("NOTIFICATIONS_PROFILE_CACHE_SECONDS", "3600"))
+
+# عدادات /me (متابعات/إعجابات/ملف المزود) المخزنة لكل مستخدم؛ تُلغى عند المتابعة/الإعجاب
+ME_COUNTERS_CACHE_SECONDS = int(os.getenv("ME_COUNTERS_CACHE_SECONDS", "60"))
 
 # إعدادات افتراضية للإضافات (اختياري الآن)
 EXTRAS_GRACE_DAYS = 0
@@ -214,6 +247,9 @@ EXTRA_SKUS = {
 # إعدادات تسعير افتراضية (اختياري الآن)
 PROMO_VAT_PERCENT = 15
 
+# أقصى مدة لتخزين قوائم الإعلانات العامة (تُقصَّر تلقائيًا حتى أقرب start_at/end_at)
+PROMO_PLACEMENTS_CACHE_SECONDS = int(os.getenv("PROMO_PLACEMENTS_CACHE_SECONDS", "300"))
+
 # تسعير مبدئي (SAR) حسب نوع الإعلان
 PROMO_BASE_PRICES = {
     "banner_home": 400,
@@ -244,6 +280,31 @@ PROMO_FREQUENCY_MULTIPLIER = {
     "60s": 1.0,
 }
 
+# ✅ Background tasks (apps.core.background)
+# Work queued with run_after_commit runs on an in-process thread pool after commit.
+# EAGER=1 runs it inline (tests / debugging).
+BACKGROUND_TASKS_EAGER = os.getenv("BACKGROUND_TASKS_EAGER", "0") == "1"
+BACKGROUND_TASKS_WORKERS = int(os.getenv("BACKGROUND_TASKS_WORKERS", "4"))
+# Named pools for run_after_commit_in(); media processing is CPU-bound -> one worker per core.
+BACKGROUND_TASK_POOLS = {
+    "media": int(os.getenv("MEDIA_PROCESSING_WORKERS", "0")) or (os.cpu_count() or 1),
+}
+
+# ✅ Provider media pipeline (apps.providers.media_pipeline)
+PROVIDER_MEDIA_THUMBNAIL_WIDTHS = (320, 640, 1080)
+
+# ✅ Scheduled jobs (apps.core.jobs, python manage.py run_jobs)
+# أقصى فاصل بين دورتي إنهاء الطلبات العاجلة (يُقدَّم تلقائيًا إلى أقرب expires_at)
+URGENT_EXPIRY_JOB_INTERVAL_SECONDS = int(os.getenv("URGENT_EXPIRY_JOB_INTERVAL_SECONDS", "30"))
+PROMO_EXPIRY_JOB_INTERVAL_SECONDS = int(os.getenv("PROMO_EXPIRY_JOB_INTERVAL_SECONDS", "300"))
+EXTRAS_PORTAL_BROADCAST_JOB_INTERVAL_SECONDS = int(os.getenv("EXTRAS_PORTAL_BROADCAST_JOB_INTERVAL_SECONDS", "60"))
+
+# ✅ Extras portal bulk messaging (apps.extras_portal.broadcast)
+# عدد المستلمين في كل دفعة (معاملة واحدة لكل دفعة)
+EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE = int(os.getenv("EXTRAS_PORTAL_BROADCAST_CHUNK_SIZE", "200"))
+# بعد خطأ في دفعة: إعادة المحاولة بمهلة مضاعفة (دقيقة، دقيقتان، ... حتى ساعة) ثم FAILED
+EXTRAS_PORTAL_BROADCAST_MAX_ATTEMPTS = int(os.getenv("EXTRAS_PORTAL_BROADCAST_MAX_ATTEMPTS", "5"))
+
 # ✅ Notifications
 NOTIFICATIONS_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_RETENTION_DAYS", "90"))
 
@@ -274,3 +335,15 @@ OTP_COOLDOWN_SECONDS = int(os.getenv("OTP_COOLDOWN_SECONDS", "60"))
 OTP_PHONE_HOURLY_LIMIT = int(os.getenv("OTP_PHONE_HOURLY_LIMIT", "5"))
 OTP_PHONE_DAILY_LIMIT = int(os.getenv("OTP_PHONE_DAILY_LIMIT", "10"))
 OTP_IP_HOURLY_LIMIT = int(os.getenv("OTP_IP_HOURLY_LIMIT", "50"))
+# سقف عام لكل الأرقام (حماية من ضخ الرسائل)؛ 0 = معطل
+OTP_GLOBAL_PER_MINUTE_LIMIT = int(os.getenv("OTP_GLOBAL_PER_MINUTE_LIMIT", "0"))
+# العدادات في Redis (نوافذ منزلقة)؛ بدونه تُحسب داخل العملية
+OTP_RATE_LIMIT_REDIS_URL = os.getenv("OTP_RATE_LIMIT_REDIS_URL", REDIS_URL)
+
+# ✅ Realtime presence / typing (apps.messaging.presence)
+# اتصالات كل مستخدم وآخر ظهور في Redis؛ بدونه تُحفظ داخل العملية
+PRESENCE_REDIS_URL = os.getenv("PRESENCE_REDIS_URL", REDIS_URL)
+# مهلة الاتصال بلا ping قبل اعتباره منقطعًا
+PRESENCE_CONNECTION_TTL_SECONDS = int(os.getenv("PRESENCE_CONNECTION_TTL_SECONDS", "90"))
+TYPING_BROADCASTS_PER_SECOND = int(os.getenv("TYPING_BROADCASTS_PER_SECOND", "4"))
+TYPING_REFRESH_SECONDS = int(os.getenv("TYPING_REFRESH_SECONDS", "3"))
@@ -0,0 +1,37 @@
+import pytest
+from django.core.cache import cache
+
+from apps.accounts.otp_throttle import reset_otp_rate_limits
+from apps.messaging.presence import reset_presence
+
+
+@pytest.fixture(autouse=True)
+def _eager_background_tasks(settings):
+    # Test transactions never commit; run deferred work inline so it is observable.
+    settings.BACKGROUND_TASKS_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # IDs are reused between rolled-back tests; never let cached state leak across them.
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _otp_rate_limits(settings):
+    # OTP budgets lived in the (rolled-back) OTP table before; keep them per-test and in-process.
+    settings.OTP_RATE_LIMIT_REDIS_URL = ""
+    reset_otp_rate_limits()
+    yield
+    reset_otp_rate_limits()
+
+
+@pytest.fixture(autouse=True)
+def _presence(settings):
+    # Connection sets and typing debounce state live in-process; never carry them across tests.
+    settings.PRESENCE_REDIS_URL = ""
+    reset_presence()
+    yield
+    reset_presence()
@@ -3,6 +3,26 @@ set -euo pipefail
 
 python manage.py migrate --noinput
 
+# Scheduled jobs (apps/<app>/jobs.py) run next to the web server and are
+# restarted if the loop exits. Media left pending by a restart is picked up by
+# the providers.process_pending_media job in small batches, after the port is
+# bound. With the optional job worker (commented out in render.yaml, paid
+# plan) set RUN_JOBS_WORKER=media: this container then keeps only the media
+# sweep, which needs the files on this service's disk. RUN_JOBS_WORKER=0
+# disables the loop.
+run_jobs_forever() {
+	while true; do
+		python manage.py run_jobs "$@" || echo "run_jobs exited with $?, restarting" >&2
+		sleep 5
+	done
+}
+
+case "${RUN_JOBS_WORKER:-1}" in
+	0) ;;
+	media) run_jobs_forever --only providers.process_pending_media & ;;
+	*) run_jobs_forever & ;;
+esac
+
 PORT_VALUE="${PORT:-8000}"
 WEB_CONCURRENCY_VALUE="${WEB_CONCURRENCY:-2}"
 LOG_LEVEL_VALUE="${GUNICORN_LOG_LEVEL:-info}"